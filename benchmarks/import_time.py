@@ -0,0 +1,93 @@
+# Время импорта при старте дашборда и при первом открытии каждого раздела.
+#
+# Каждый замер — отдельный свежий интерпретатор (модули не закэшированы в
+# sys.modules), берётся медиана по нескольким запускам. Для сравнения
+# выводится и «жадный» старт, когда все модули process_* импортируются сразу.
+#
+# Запуск из корня репозитория:
+#
+#     python benchmarks/import_time.py [--repeat 5]
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARD = os.path.join(ROOT, "main_dashboard.py")
+
+
+def _imported(nodes):
+    modules = []
+    for node in nodes:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def _dashboard_tree():
+    with open(DASHBOARD, encoding="utf-8") as file:
+        return ast.parse(file.read())
+
+
+# Модули, которые main_dashboard импортирует на верхнем уровне
+def startup_modules():
+    return _imported(_dashboard_tree().body)
+
+
+# Модули, которые main_dashboard импортирует внутри веток (при первом использовании)
+def deferred_modules():
+    tree = _dashboard_tree()
+    nested = [node for statement in tree.body if not isinstance(statement, (ast.Import, ast.ImportFrom))
+              for node in ast.walk(statement)]
+    return _imported(nested)
+
+
+def view_modules():
+    names = sorted(name[:-3] for name in os.listdir(os.path.join(ROOT, "modules")) if name.startswith("process_"))
+    return [f"modules.{name}" for name in names]
+
+
+# Секунды на импорт modules в свежем процессе после уже импортированных preload
+def measure(modules, preload=(), repeat=5):
+    code = "\n".join(
+        [f"import {name}" for name in preload]
+        + ["import time", "start = time.perf_counter()"]
+        + [f"import {name}" for name in modules]
+        + ["print(time.perf_counter() - start)"]
+    )
+    samples = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=ROOT, check=True, capture_output=True, text=True
+        ).stdout
+        samples.append(float(output.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Время импорта дашборда и разделов")
+    parser.add_argument("--repeat", type=int, default=5, help="запусков на замер (медиана)")
+    args = parser.parse_args()
+
+    startup = startup_modules()
+    deferred = deferred_modules()
+    views = view_modules()
+
+    lazy = measure(startup, repeat=args.repeat)
+    eager = measure(startup + deferred + views, repeat=args.repeat)
+    print(f"{'Старт (ленивые импорты)':<40}{lazy * 1000:>10.0f} мс")
+    print(f"{'Старт (всё сразу)':<40}{eager * 1000:>10.0f} мс")
+    print(f"{'Выигрыш при старте':<40}{(eager - lazy) * 1000:>10.0f} мс")
+    print()
+    print("Первое использование (после старта):")
+    for name in deferred + views:
+        first_use = measure([name], preload=startup, repeat=args.repeat)
+        print(f"  {name:<38}{first_use * 1000:>10.0f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,163 @@
+import importlib
+import os
+
 import streamlit as st
 import pandas as pd
 
-# Импорт модулей для обработки данных
-from modules.process_contacts import process_contacts
-from modules.process_calls import process_calls
-from modules.process_spend import process_spend
-from modules.process_deals import process_deals
-
-# Заголовок приложения
-st.title("Дашборд аналитики CRM: Метрики и тренды")
-
-# Загрузка данных
-st.sidebar.header("Загрузка данных")
-uploaded_file = st.sidebar.file_uploader("Загрузите CSV файл", type=["csv"])
-
-if uploaded_file is not None:
-    # Чтение данных
-    data = pd.read_csv(uploaded_file)
-    st.sidebar.success("Данные успешно загружены!")
-
-    # Проверка имени датасета и вызов соответствующего модуля
-    if "cont" in uploaded_file.name.lower():
-        process_contacts(data)
-    elif "calls" in uploaded_file.name.lower():
-        process_calls(data)
-    elif "spend" in uploaded_file.name.lower():
-        process_spend(data)
-    elif "deals" in uploaded_file.name.lower():
-        process_deals(data)
+from modules.cache import bytes_version
+from modules.dataset_store import detect_dataset_kind, get_dataset_store, stored_kinds
+from modules.time_index import period_bounds
+from modules.shared_datasets import shared_dataset, is_shared
+from modules.ingest import start_ingest, finish_ingest, ingest_progress
+
+# Модули разделов импортируются при первом открытии датасета своего типа,
+# а не при старте приложения. Так же, в ветках, где они нужны, импортируются
+# фоновый расчёт агрегатов (с ним — все модули аналитики и pyarrow) и снимки.
+DATASET_VIEWS = {
+    "contacts": "modules.process_contacts",
+    "calls": "modules.process_calls",
+    "spend": "modules.process_spend",
+    "deals": "modules.process_deals",
+    "snapshot": "modules.process_snapshot",
+}
+
+
+def dataset_view(kind):
+    module = importlib.import_module(DATASET_VIEWS[kind])
+    return getattr(module, f"process_{kind}")
+
+
+# Интерфейс строится только при запуске скрипта (Streamlit выполняет его как
+# __main__). Рабочие процессы пула разделов (spawn) импортируют главный модуль
+# как __mp_main__ и получают только импорты.
+def main():
+    # Заголовок приложения
+    st.title("Дашборд аналитики CRM: Метрики и тренды")
+
+    # Загрузка данных
+    st.sidebar.header("Загрузка данных")
+
+    # Режим загрузки: новый файл целиком, дельта к сохранённому датасету, сохранённый датасет без загрузки
+    # или снимок готовых агрегатов (без исходных данных)
+    load_mode = st.sidebar.radio(
+        "Режим загрузки",
+        options=["Новый датасет", "Дополнить сохранённый", "Открыть сохранённый", "Открыть снимок"],
+        index=0
+    )
+
+    data = None
+    dataset_kind = None
+    store = None
+    snapshot = None
+    ingesting = False
+
+    if load_mode == "Открыть снимок":
+        from modules.snapshot import list_snapshots, open_snapshot
+
+        # Снимки строит пакетный отчёт: python -m modules.batch_report --format snapshot
+        snapshot_path = st.sidebar.selectbox(
+            "Снимок агрегатов",
+            [None] + list_snapshots(),
+            format_func=lambda x: "Выберите снимок" if x is None else os.path.basename(x)
+        )
+        if snapshot_path is not None:
+            snapshot = open_snapshot(snapshot_path)
+    elif load_mode == "Открыть сохранённый":
+        dataset_kind = st.sidebar.selectbox(
+            "Сохранённый датасет",
+            [None] + stored_kinds(),
+            format_func=lambda x: "Выберите датасет" if x is None else x
+        )
+        if dataset_kind is not None:
+            store = get_dataset_store(dataset_kind)
     else:
-        st.error("Неизвестный тип данных. Убедитесь, что название файла содержит 'contacts', 'calls', 'spend' или 'deals'.")
+        uploaded_file = st.sidebar.file_uploader("Загрузите CSV файл", type=["csv"])
+
+        if uploaded_file is not None:
+            # Версия данных для кэшей графиков: хэш содержимого файла. Один и тот же
+            # файл разбирается один раз и общий для всех сессий
+            content = uploaded_file.getvalue()
+            key = bytes_version(content)
+            if is_shared(key):
+                data = shared_dataset(key, lambda: pd.read_csv(uploaded_file))
+            else:
+                # Новый файл разбирается в фоне; до конца разбора видны прогресс и первая порция
+                job = start_ingest(key, content)
+                if job.done:
+                    try:
+                        data = shared_dataset(key, job.result)
+                    except ValueError as error:
+                        st.sidebar.error(f"Не удалось разобрать файл: {error}")
+                    finally:
+                        finish_ingest(key)
+                else:
+                    ingesting = True
+                    ingest_progress(job, uploaded_file.name)
+            dataset_kind = detect_dataset_kind(uploaded_file.name)
+
+            if data is not None and load_mode == "Дополнить сохранённый" and dataset_kind is not None:
+                # Слияние дельты с сохранённым датасетом (дедупликация по ключу)
+                store = get_dataset_store(dataset_kind)
+                result = store.append(data, data.attrs["data_version"])
+                if result["skipped"]:
+                    st.sidebar.info("Этот файл уже добавлен в сохранённый датасет.")
+                else:
+                    st.sidebar.success(f"Добавлено строк: {result['added']}, обновлено: {result['updated']}")
+            elif data is not None:
+                st.sidebar.success("Данные успешно загружены!")
+
+    if store is not None and store.exists:
+        # Период: читаются только месячные партиции, пересекающиеся с ним
+        min_date, max_date = store.date_range()
+        period = ()
+        if min_date is not None:
+            period = st.sidebar.date_input(
+                "Период",
+                value=(min_date.date(), max_date.date()),
+                min_value=min_date.date(),
+                max_value=max_date.date()
+            )
+        if len(period) == 2 and tuple(period) != (min_date.date(), max_date.date()):
+            start, end = period_bounds(period)
+            data = store.load(start, end)
+            data.attrs["data_version"] = bytes_version(f"{store.version}:{start}:{end}".encode())
+        else:
+            data = store.load()
+            data.attrs["data_version"] = store.version
+
+        # Агрегаты обновляются инкрементально, без пересчёта всей истории
+        with st.sidebar.expander("Агрегаты сохранённого датасета"):
+            for dimension, table in store.aggregates.items():
+                st.write(f"**{dimension}**")
+                st.dataframe(table.sort_values(by="Count", ascending=False))
+
+    if snapshot is not None:
+        dataset_view("snapshot")(snapshot)
+    elif data is not None and data.empty:
+        st.warning("За выбранный период нет данных.")
+    elif data is not None:
+        from modules.precompute import start_precompute
+        from modules.figure_cache import figure_transport_panel
+
+        # Агрегаты всех разделов считаются в фоне сразу после загрузки датасета
+        precompute_job = start_precompute(dataset_kind, data)
+        if precompute_job is not None and not precompute_job.done:
+            st.sidebar.caption(f"Фоновый расчёт агрегатов: {precompute_job.completed} из {precompute_job.total}")
+
+        # Проверка типа датасета и вызов соответствующего модуля
+        if dataset_kind in DATASET_VIEWS:
+            dataset_view(dataset_kind)(data)
+        else:
+            st.error("Неизвестный тип данных. Убедитесь, что название файла содержит 'contacts', 'calls', 'spend' или 'deals'.")
+
+        # Размеры графиков, отправленных в браузер
+        figure_transport_panel()
+
+    elif load_mode == "Открыть снимок":
+        st.warning("Выберите снимок агрегатов. Новый снимок: python -m modules.batch_report --format snapshot")
+    elif not ingesting:
+        st.warning("Загрузите файл, чтобы начать анализ!")
+
 
-else:
-    st.warning("Загрузите файл, чтобы начать анализ!")
+if __name__ == "__main__":
+    main()
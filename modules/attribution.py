@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+from modules.cache import LRUCache, get_data_version
+
+NAT = np.iinfo(np.int64).min
+
+# Таблицы фактов по контактам для версий сделок, звонков и контактов
+attribution_cache = LRUCache(
+    max_entries=16,
+    max_bytes=256 * 1024 * 1024,
+    sizeof=lambda table: int(table.memory_usage(deep=True).sum())
+)
+
+
+# Ключ контакта. Если все идентификаторы целочисленные, соединение точное (int64).
+# В выгрузке звонков CONTACTID обычно записан как float (5.805028000000106e+18):
+# младшие разряды уже потеряны, поэтому тогда ключи всех датасетов приводятся
+# к float64 — тот же идентификатор из сделок округляется до того же значения,
+# а контакты, различающиеся только младшими разрядами, сливаются.
+def contact_keys(values, exact):
+    if exact:
+        return values.values.astype(np.int64), np.ones(len(values), dtype=bool)
+    keys = values.astype(np.float64).values
+    return keys, ~np.isnan(keys)
+
+
+def _numeric_ids(values):
+    return pd.to_numeric(pd.Series(values), errors="coerce")
+
+
+def _ticks(values):
+    return pd.to_datetime(pd.Series(values), errors="coerce").values.astype("datetime64[ns]").view(np.int64)
+
+
+def _hours(delta_ticks):
+    hours = delta_ticks / 3.6e12
+    return hours.astype(np.float32)
+
+
+# Минимум по группам за один проход; пропуски (NaT) не участвуют
+def _group_min(codes, ticks, size):
+    result = np.full(size, np.iinfo(np.int64).max, dtype=np.int64)
+    valid = (codes >= 0) & (ticks != NAT)
+    np.minimum.at(result, codes[valid], ticks[valid])
+    result[result == np.iinfo(np.int64).max] = NAT
+    return result
+
+
+# Таблица фактов: одна строка на контакт из сделок.
+# Звонки и контакты присоединяются хэш-индексом по ключу контакта
+# (Index.get_indexer), все агрегаты — bincount/minimum.at по кодам контактов,
+# так что время линейно по числу звонков.
+def build_attribution(deals, calls, contacts=None):
+    deal_ids = _numeric_ids(deals["Contact Name"])
+    call_ids = _numeric_ids(calls["CONTACTID"])
+    contact_ids = None if contacts is None else _numeric_ids(contacts["Id"])
+    exact = all(
+        pd.api.types.is_integer_dtype(ids) for ids in [deal_ids, call_ids, contact_ids] if ids is not None
+    )
+    deal_keys, valid_deals = contact_keys(deal_ids, exact)
+    contact_index = pd.Index(pd.unique(deal_keys[valid_deals]))
+    size = len(contact_index)
+    deal_codes = np.where(valid_deals, contact_index.get_indexer(deal_keys), -1)
+
+    successful = deals["Months of study"].notnull().values
+    deal_counts = np.bincount(deal_codes[valid_deals], minlength=size)
+    won_counts = np.bincount(deal_codes[valid_deals & successful], minlength=size)
+    first_deal = _group_min(deal_codes, _ticks(deals["Created Time"]), size)
+    # Момент конверсии: самая ранняя дата закрытия среди успешных сделок контакта
+    closing = _ticks(deals["Closing Date"])
+    close_time = _group_min(np.where(successful, deal_codes, -1), closing, size)
+
+    call_keys, valid_calls = contact_keys(call_ids, exact)
+    call_codes = np.where(valid_calls, contact_index.get_indexer(call_keys), -1)
+    call_ticks = _ticks(calls["Call Start Time"])
+    matched = call_codes >= 0
+    call_counts = np.bincount(call_codes[matched], minlength=size)
+    first_call = _group_min(call_codes, call_ticks, size)
+
+    # Звонки до закрытия считаются только для сконвертированных контактов
+    call_close = np.where(matched, close_time[np.where(matched, call_codes, 0)], NAT)
+    before_close = matched & (call_close != NAT) & (call_ticks != NAT) & (call_ticks <= call_close)
+    calls_before_close = np.bincount(call_codes[before_close], minlength=size)
+
+    converted = won_counts > 0
+    has_first_call = (first_call != NAT) & (first_deal != NAT)
+    facts = pd.DataFrame({
+        "Contact": contact_index.values,
+        "Deals": deal_counts.astype(np.int32),
+        "Converted": converted,
+        "Calls": call_counts.astype(np.int32),
+        "Calls Before Close": np.where(converted, calls_before_close, 0).astype(np.int32),
+        "First Deal": first_deal.view("datetime64[ns]"),
+        "First Call": first_call.view("datetime64[ns]"),
+        "Hours To First Call": np.where(has_first_call, _hours(first_call - first_deal), np.nan).astype(np.float32),
+    })
+
+    if contacts is not None:
+        contact_id_keys, valid_contacts = contact_keys(contact_ids, exact)
+        contact_codes = np.where(valid_contacts, contact_index.get_indexer(contact_id_keys), -1)
+        known = contact_codes >= 0
+        owner = np.full(size, None, dtype=object)
+        owner[contact_codes[known]] = contacts["Contact Owner Name"].values[known]
+        facts["Contact Owner Name"] = pd.Categorical(owner)
+        contact_created = np.full(size, NAT, dtype=np.int64)
+        contact_created[contact_codes[known]] = _ticks(contacts["Created Time"])[known]
+        facts["Contact Created"] = contact_created.view("datetime64[ns]")
+
+    return facts
+
+
+def attribution_facts(deals, calls, contacts=None):
+    key = (
+        get_data_version(deals),
+        get_data_version(calls),
+        None if contacts is None else get_data_version(contacts),
+    )
+    return attribution_cache.get_or_compute(key, lambda: build_attribution(deals, calls, contacts))
+
+
+# Сводные показатели атрибуции по таблице фактов
+def attribution_summary(facts):
+    converted = facts[facts["Converted"]]
+    return {
+        "Contacts": len(facts),
+        "Contacted Share (%)": (facts["Calls"] > 0).mean() * 100 if len(facts) else np.nan,
+        "Median Hours To First Call": float(facts["Hours To First Call"].median()),
+        "Touches Per Conversion": converted["Calls Before Close"].sum() / len(converted) if len(converted) else np.nan,
+    }
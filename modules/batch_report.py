@@ -0,0 +1,368 @@
+# Пакетный отчёт без браузера: те же расчёты, что и в разделах дашборда
+# (с настройками виджетов по умолчанию и без фильтров), в статический HTML,
+# PNG или снимок агрегатов для дашборда. Запуск из корня репозитория,
+# например из cron:
+#
+#     python -m modules.batch_report --out reports/nightly [--data-dir demo_data] [--format html|png]
+#     python -m modules.batch_report --format snapshot  # в data_store/snapshots
+import argparse
+import html
+import importlib.util
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from modules.cache import bytes_version
+from modules.category_index import get_category_index
+from modules.dataset_store import DATASETS
+from modules.time_index import month_codes, month_labels
+from modules.deals_sections import SECTION_AGGREGATES
+from modules.parallel import section_aggregates
+from modules.precompute import PRECOMPUTE_WORKERS
+from modules.sla import SLA_DIMENSIONS, SLA_DEFAULT_HOURS, sla_breakdown
+from modules.funnel import funnel_cube
+from modules.cohort import cohort_matrix
+from modules.roi import ROI_DIMENSIONS, ALL_TIME, roi_table, roi_totals
+from modules.attribution import attribution_facts, attribution_summary
+from modules.owner_activity import owner_productivity
+from modules.lag_correlation import LAG_SERIES, lag_correlation, best_lag
+from modules.forecast import FORECAST_MODELS, FORECAST_HORIZON, cached_forecasts, monthly_series
+from modules.histogram import cached_histogram, bin_centers
+from modules.snapshot import SNAPSHOT_DIR, write_snapshot
+
+REPORT_FILES = {
+    "deals": "Cleaned_Deals.csv",
+    "calls": "Cleaned_Calls.csv",
+    "contacts": "Cleaned_Contacts.csv",
+    "spend": "Cleaned_Spend.csv",
+}
+
+REPORT_FORMATS = ["html", "png", "snapshot"]
+
+# Числовые поля сделок, распределения которых показывает дашборд
+NUMERIC_FIELDS = ["Course duration", "Months of study", "Initial Amount Paid", "Offer Total Amount"]
+
+# Сколько значений измерения показывать в обзоре датасета
+TOP_VALUES = 15
+
+# Заголовки агрегатов разделов Deals
+SECTION_TITLES = {
+    "campaign_performance": "Эффективность кампаний",
+    "source_quality": "Качество источников",
+    "payment_summary": "Типы оплаты",
+    "payment_time": "Время до закрытия по типу оплаты",
+    "product_success": "Успешность по продуктам",
+    "education_success": "Успешность по типу обучения",
+    "product_education": "Продукт × тип обучения",
+    "city_success": "Успешность по городам",
+    "country_success": "Успешность по странам",
+    "level_success": "Успешность по уровню немецкого",
+    "city_level_success": "Город × уровень немецкого",
+}
+
+
+# Элемент отчёта: заголовок и таблица и/или график
+class ReportItem:
+    def __init__(self, title, table=None, figure=None, note=None):
+        self.title = title
+        self.table = table
+        self.figure = figure
+        self.note = note
+
+
+# Датасет и версия данных — хэш содержимого файла (отчёт воспроизводим
+# при копировании или перезаписи тех же данных)
+def read_dataset(path):
+    with open(path, "rb") as file:
+        content = file.read()
+    frame = pd.read_csv(io.BytesIO(content))
+    frame.attrs["data_version"] = bytes_version(content)
+    return frame
+
+
+def _bar(table, x, y, title):
+    figure = go.Figure(go.Bar(x=table[x], y=table[y], marker=dict(color="royalblue")))
+    figure.update_layout(title=title, xaxis=dict(title=x), yaxis=dict(title=y), plot_bgcolor="white")
+    return figure
+
+
+# Колонка-подпись и основной показатель агрегата для столбчатой диаграммы
+def _section_figure(table, title):
+    flat = table.reset_index() if table.index.name else table
+    labels = [column for column in flat.columns if not pd.api.types.is_numeric_dtype(flat[column])]
+    metrics = [column for column in flat.columns if pd.api.types.is_numeric_dtype(flat[column])]
+    if not labels or not metrics:
+        return None
+    rates = [column for column in metrics if "rate" in column.lower()]
+    label = flat[labels].astype(str).agg(" / ".join, axis=1).rename(" / ".join(labels))
+    metric = (rates or metrics)[0]
+    return _bar(pd.DataFrame({label.name: label, metric: flat[metric]}), label.name, metric, title)
+
+
+# Обзор датасета: число строк, строки по месяцам, самые частые значения измерений
+def dataset_overview(kind, data):
+    spec = DATASETS[kind]
+    items = [ReportItem(f"{kind}: строк {len(data)}", note=f"Версия данных {data.attrs['data_version']}")]
+    if spec["date_column"] in data:
+        codes = month_codes(data[spec["date_column"]])
+        codes = codes[codes >= 0]
+        if len(codes):
+            counts = np.bincount(codes - codes.min())
+            monthly = pd.DataFrame({"Месяц": month_labels(np.arange(len(counts)) + codes.min()), "Строк": counts})
+            figure = go.Figure(go.Scatter(x=monthly["Месяц"], y=monthly["Строк"], mode="lines+markers"))
+            figure.update_layout(title=f"{kind}: строк по месяцам", plot_bgcolor="white")
+            items.append(ReportItem(f"{kind}: строк по месяцам", figure=figure))
+    for column in spec["dimensions"]:
+        if column not in data:
+            continue
+        counts = get_category_index(data, column).value_counts().head(TOP_VALUES)
+        table = counts.rename_axis(column).reset_index(name="Count")
+        items.append(ReportItem(
+            f"{kind}: {column}", table=table, figure=_bar(table, column, "Count", f"{kind}: {column}")
+        ))
+    return items
+
+
+def section_tables(deals):
+    aggregates = section_aggregates(deals, list(SECTION_AGGREGATES))
+    return [
+        ReportItem(SECTION_TITLES.get(name, name), table=table, figure=_section_figure(table, SECTION_TITLES.get(name, name)))
+        for name, table in aggregates.items()
+    ]
+
+
+def distributions_section(deals):
+    items = []
+    for field in NUMERIC_FIELDS:
+        if field not in deals:
+            continue
+        values = pd.to_numeric(deals[field], errors="coerce").dropna()
+        edges, counts = cached_histogram((deals.attrs["data_version"], "report", field), values)
+        figure = go.Figure(go.Bar(x=bin_centers(edges), y=counts, width=np.diff(edges), marker=dict(color="royalblue")))
+        figure.update_layout(title=f"Распределение: {field}", xaxis=dict(title=field), yaxis=dict(title="Сделок"), plot_bgcolor="white")
+        stats = pd.Series({
+            "Среднее значение": values.mean(), "Медиана": values.median(), "Диапазон": values.max() - values.min()
+        }, name=field).to_frame()
+        items.append(ReportItem(f"Распределение: {field}", table=stats, figure=figure))
+    return items
+
+
+def sla_section(deals):
+    items = []
+    for by in SLA_DIMENSIONS:
+        table = sla_breakdown(deals, by, SLA_DEFAULT_HOURS)
+        title = f"SLA по {by} (порог {SLA_DEFAULT_HOURS} ч)"
+        items.append(ReportItem(title, table=table, figure=_bar(table.rename_axis(by).reset_index(), by, "Breach Rate (%)", title)))
+    return items
+
+
+def funnel_section(deals):
+    conversion = funnel_cube(deals).conversion_to_payment()
+    figure = go.Figure(go.Funnel(y=conversion.index, x=conversion["Reached"], textinfo="value+percent initial"))
+    figure.update_layout(title="Воронка сделок")
+    return [ReportItem("Воронка сделок", table=conversion, figure=figure)]
+
+
+def cohort_section(deals):
+    matrix = cohort_matrix(deals).matrix()
+    figure = go.Figure(go.Heatmap(
+        z=matrix.values, x=list(matrix.columns), y=list(matrix.index), colorscale="Blues",
+        text=np.round(matrix.values, 1), texttemplate="%{text}"
+    ))
+    figure.update_layout(title="Доля сделок, оплаченных в окне от создания (%)", yaxis=dict(autorange="reversed"))
+    return [ReportItem("Когорты по месяцу создания", table=matrix, figure=figure)]
+
+
+def roi_section(spend, deals):
+    items = []
+    for by in ROI_DIMENSIONS:
+        table = roi_table(spend, deals, by, ALL_TIME).reset_index()
+        totals = roi_totals(table)
+        note = ", ".join(f"{name}: {value:,.2f}" for name, value in totals.items())
+        title = f"ROI по {by}"
+        items.append(ReportItem(title, table=table, figure=_bar(table, by, "ROAS", title), note=f"Итого — {note}"))
+    return items
+
+
+# Показатели владельцев только по сделкам: раздел есть в отчёте и снимке,
+# даже если файлов звонков и контактов нет
+def owners_section(deals):
+    table = owner_productivity(deals)
+    note = (f"Среднее количество обработанных сделок: {table['Deals'].mean():.2f}, "
+            f"средний коэффициент конверсии: {table['Conversion Rate (%)'].mean():.2f}%")
+    with_sales = table[table["Closed Deals"] > 0].reset_index()
+    return [
+        ReportItem("Владельцы сделок", table=table, note=note,
+                   figure=_bar(with_sales, "Owner", "Sales", "Владельцы сделок: сумма продаж")),
+        ReportItem("Конверсия владельцев сделок",
+                   figure=_bar(with_sales, "Owner", "Conversion Rate (%)", "Владельцы сделок: конверсия")),
+    ]
+
+
+def calls_section(deals, calls, contacts):
+    summary = attribution_summary(attribution_facts(deals, calls, contacts))
+    items = [ReportItem("Атрибуция звонков по контактам", table=pd.Series(summary, name="Значение").to_frame())]
+    productivity = owner_productivity(deals, calls)
+    items.append(ReportItem("Продуктивность менеджеров", table=productivity))
+
+    leading, following = list(LAG_SERIES)[:2]
+    lag_table = lag_correlation(deals, calls, "D", leading, following, 60)
+    best = best_lag(lag_table)
+    if best is not None:
+        figure = go.Figure(go.Bar(
+            x=lag_table["Lag"], y=lag_table["Correlation"],
+            marker_color=np.where(lag_table["Significant"], "royalblue", "lightgray")
+        ))
+        for level in (lag_table["Band"].iloc[0], -lag_table["Band"].iloc[0]):
+            figure.add_hline(y=level, line=dict(color="red", dash="dash", width=1))
+        figure.update_layout(title=f"Кросс-корреляция: {leading} → {following}", plot_bgcolor="white", showlegend=False)
+        note = f"Наибольшая корреляция {best['Correlation']:.2f} при лаге {int(best['Lag'])} дн."
+        items.append(ReportItem("Лаговая кросс-корреляция", figure=figure, note=note))
+
+    series = monthly_series(deals, calls)
+    if not series.empty:
+        for target, label in [("Deals", "все сделки"), ("Won", "успешные сделки")]:
+            key = (deals.attrs["data_version"], calls.attrs["data_version"], target, FORECAST_HORIZON)
+            forecasts = cached_forecasts(key, series, target, FORECAST_HORIZON)
+            figure = go.Figure(go.Scatter(x=series.index, y=series[target], mode="lines+markers", name="Факт"))
+            for name in FORECAST_MODELS:
+                forecast = forecasts[name]
+                figure.add_trace(go.Scatter(x=forecast.index, y=forecast["Forecast"], mode="lines+markers", name=name, line=dict(dash="dash")))
+            figure.update_layout(title=f"Прогноз: {label} по месяцам", plot_bgcolor="white")
+            items.append(ReportItem(f"Прогноз: {label}", table=pd.concat(forecasts, axis=1), figure=figure))
+    return items
+
+
+# Разделы отчёта: имя → (заголовок, нужные датасеты, построитель).
+# Порядок задаёт порядок в отчёте.
+REPORT_SECTIONS = {
+    "overview_deals": ("Обзор: Deals", ["deals"], partial(dataset_overview, "deals")),
+    "overview_calls": ("Обзор: Calls", ["calls"], partial(dataset_overview, "calls")),
+    "overview_contacts": ("Обзор: Contacts", ["contacts"], partial(dataset_overview, "contacts")),
+    "overview_spend": ("Обзор: Spend", ["spend"], partial(dataset_overview, "spend")),
+    "distributions": ("Числовые поля сделок", ["deals"], distributions_section),
+    "sections": ("Кампании, платежи и география", ["deals"], section_tables),
+    "owners": ("Отдел продаж", ["deals"], owners_section),
+    "sla": ("Анализ SLA", ["deals"], sla_section),
+    "funnel": ("Воронка сделок", ["deals"], funnel_section),
+    "cohorts": ("Когортный анализ", ["deals"], cohort_section),
+    "roi": ("Расходы и ROI", ["spend", "deals"], roi_section),
+    "calls": ("Звонки, атрибуция и прогноз", ["deals", "calls", "contacts"], calls_section),
+}
+
+
+# Все разделы параллельно в пуле потоков (как фоновый прогрев); раздел,
+# которому не хватает датасета, пропускается, упавший — попадает в отчёт
+# с текстом ошибки и в список failed
+def run_sections(datasets, workers=PRECOMPUTE_WORKERS, log=sys.stderr):
+    started = time.perf_counter()
+
+    def run(name, kinds, build):
+        start = time.perf_counter()
+        items = build(*(datasets[kind] for kind in kinds))
+        print(f"{name}: {time.perf_counter() - start:.1f} с", file=log)
+        return items
+
+    results = {}
+    failed = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report") as executor:
+        futures = {
+            name: executor.submit(run, name, kinds, build)
+            for name, (_, kinds, build) in REPORT_SECTIONS.items()
+            if all(datasets.get(kind) is not None for kind in kinds)
+        }
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as error:
+                print(f"{name}: ошибка {error!r}", file=log)
+                results[name] = [ReportItem(REPORT_SECTIONS[name][0], note=f"Раздел не построен: {error!r}")]
+                failed.append(name)
+    print(f"Все разделы: {time.perf_counter() - started:.1f} с", file=log)
+    return results, failed
+
+
+def _table_html(table):
+    return table.to_html(float_format=lambda value: f"{value:,.2f}", na_rep="—", border=0, classes="table")
+
+
+# Отчёт в HTML. Для формата png графики сохраняются отдельными файлами
+# (нужен пакет kaleido) и подключаются как изображения, без JavaScript.
+def write_report(results, out_dir, fmt="html", title="Отчёт CRM"):
+    os.makedirs(out_dir, exist_ok=True)
+    parts = [
+        f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{html.escape(title)}</title>",
+        "<style>body{font-family:sans-serif;margin:2em}.table{border-collapse:collapse;font-size:13px}"
+        ".table td,.table th{padding:2px 8px;border-bottom:1px solid #ddd;text-align:right}</style>",
+        f"</head><body><h1>{html.escape(title)}</h1>",
+    ]
+    plotlyjs = True
+    figure_number = 0
+    for name, items in results.items():
+        parts.append(f"<h2 id='{name}'>{html.escape(REPORT_SECTIONS[name][0])}</h2>")
+        for item in items:
+            parts.append(f"<h3>{html.escape(item.title)}</h3>")
+            if item.note:
+                parts.append(f"<p>{html.escape(item.note)}</p>")
+            if item.figure is not None:
+                figure_number += 1
+                figure_id = f"figure-{figure_number:03d}"
+                if fmt == "png":
+                    item.figure.write_image(os.path.join(out_dir, f"{figure_id}.png"), width=1000, height=500)
+                    parts.append(f"<img src='{figure_id}.png' alt='{html.escape(item.title)}'>")
+                else:
+                    # Фиксированные id блоков и plotly.js один раз в файле: отчёт воспроизводим и открывается без сети
+                    parts.append(pio.to_html(item.figure, full_html=False, include_plotlyjs=plotlyjs, div_id=figure_id))
+                    plotlyjs = False
+            if item.table is not None:
+                parts.append(_table_html(item.table))
+    parts.append("</body></html>")
+    path = os.path.join(out_dir, "report.html")
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("\n".join(parts))
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетный отчёт CRM без браузера")
+    parser.add_argument("--out", help=f"каталог для отчёта (для снимка по умолчанию {SNAPSHOT_DIR})")
+    parser.add_argument("--data-dir", default="demo_data", help="каталог с файлами Cleaned_*.csv")
+    parser.add_argument("--format", choices=REPORT_FORMATS, default="html", dest="fmt")
+    parser.add_argument("--workers", type=int, default=PRECOMPUTE_WORKERS, help="потоков для разделов")
+    parser.add_argument("--title", default="Отчёт CRM")
+    args = parser.parse_args(argv)
+
+    if args.out is None and args.fmt != "snapshot":
+        parser.error("укажите каталог для отчёта: --out")
+    if args.fmt == "png" and importlib.util.find_spec("kaleido") is None:
+        parser.error("для формата png нужен пакет kaleido (pip install kaleido)")
+
+    # Каждый датасет читается один раз; отсутствующий файл отключает зависящие от него разделы
+    datasets = {}
+    for kind, file_name in REPORT_FILES.items():
+        path = os.path.join(args.data_dir, file_name)
+        datasets[kind] = read_dataset(path) if os.path.exists(path) else None
+        if datasets[kind] is None:
+            print(f"{path}: файл не найден, разделы с ним пропущены", file=sys.stderr)
+
+    results, failed = run_sections(datasets, workers=args.workers)
+    if args.fmt == "snapshot":
+        sections = [(name, REPORT_SECTIONS[name][0], items) for name, items in results.items()]
+        versions = {kind: data.attrs["data_version"] for kind, data in datasets.items() if data is not None}
+        path = write_snapshot(sections, versions, args.out or SNAPSHOT_DIR)
+    else:
+        path = write_report(results, args.out, fmt=args.fmt, title=args.title)
+    print(path)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+# LRU-кэш с ограничением по количеству записей и по занимаемой памяти.
+# Экземпляры живут на уровне модуля, поэтому переживают перезапуски скрипта
+# Streamlit и общие для всех сессий процесса (отсюда блокировка).
+class LRUCache:
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024, sizeof=len):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Ключи, которые сейчас вычисляются (ключ -> событие готовности)
+        self._pending = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        # Значение больше всего лимита не кэшируем, иначе оно вытеснит всё остальное
+        if size > self.max_bytes:
+            return value
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._sizes.pop(key)
+                del self._entries[key]
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                old_key, _ = self._entries.popitem(last=False)
+                self._bytes -= self._sizes.pop(old_key)
+        return value
+
+    # Если тот же ключ уже считается в другом потоке (например, фоновым
+    # прогревом), ждём его результата вместо повторного расчёта
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            event = self._pending.get(key)
+            owner = event is None
+            if owner:
+                event = self._pending[key] = threading.Event()
+        if not owner:
+            event.wait()
+            value = self.get(key)
+            # Расчёт в другом потоке упал или значение не поместилось в кэш
+            return value if value is not None else self.put(key, compute())
+        try:
+            return self.put(key, compute())
+        finally:
+            with self._lock:
+                del self._pending[key]
+            event.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+
+# Версия датасета: хэш содержимого загруженного файла (выставляется в main_dashboard),
+# либо, если его нет, хэш самих строк DataFrame
+def get_data_version(data):
+    version = data.attrs.get("data_version")
+    if version is None:
+        row_hashes = pd.util.hash_pandas_object(data, index=False).values
+        version = hashlib.sha1(row_hashes.tobytes()).hexdigest()[:16]
+        data.attrs["data_version"] = version
+    return version
+
+
+def bytes_version(content):
+    return hashlib.sha1(content).hexdigest()[:16]
+
+
+# Версия файла на диске без чтения содержимого (время изменения и размер)
+def file_version(path):
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+from modules.cache import LRUCache, get_data_version
+
+# Часто используемые измерения Deals, для которых индекс строится заранее
+INDEXED_COLUMNS = [
+    "Deal Owner Name", "Campaign", "Source", "City",
+    "Stage", "Quality", "Payment Type", "Product",
+]
+
+
+# Инвертированный индекс по категориальной колонке: значение -> номера строк.
+# Строки сгруппированы по коду значения (перестановка order), границы групп
+# лежат в offsets, поэтому строки одного значения — непрерывный срез.
+# Пропуски (NaN) получают последний код.
+class CategoryIndex:
+    def __init__(self, values):
+        codes, uniques = pd.factorize(values)
+        self.categories = pd.Index(uniques)
+        self.nan_code = len(uniques)
+        self.codes = np.where(codes < 0, self.nan_code, codes).astype(np.int32)
+        self.order = np.argsort(self.codes, kind="stable").astype(np.int32)
+        self.counts = np.bincount(self.codes, minlength=self.nan_code + 1)
+        self.offsets = np.concatenate([[0], np.cumsum(self.counts)])
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.order.nbytes + self.counts.nbytes + self.offsets.nbytes
+
+    def _code(self, value):
+        if pd.isna(value):
+            return self.nan_code
+        position = self.categories.get_indexer([value])[0]
+        return None if position < 0 else position
+
+    # Номера строк со значением value (по возрастанию)
+    def rows(self, value):
+        code = self._code(value)
+        if code is None:
+            return self.order[:0]
+        return self.order[self.offsets[code]:self.offsets[code + 1]]
+
+    # Битовая маска строк, у которых значение входит в values
+    def bitmap(self, values):
+        mask = np.zeros(len(self.codes), dtype=bool)
+        for value in values:
+            mask[self.rows(value)] = True
+        return mask
+
+    # Количество строк по значениям, как у Series.value_counts; mask ограничивает
+    # подсчёт подмножеством строк (например, успешными сделками)
+    def value_counts(self, mask=None, dropna=True, nan_label=np.nan):
+        if mask is None:
+            counts = self.counts
+        else:
+            counts = np.bincount(self.codes[mask], minlength=self.nan_code + 1)
+        labels = self.categories
+        if dropna:
+            counts = counts[:-1]
+        else:
+            labels = labels.append(pd.Index([nan_label]))
+        result = pd.Series(counts, index=labels)
+        return result[result > 0].sort_values(ascending=False, kind="stable")
+
+    # Сумма значений по категориям (bincount с весами); mask ограничивает строки
+    def sums(self, values, mask=None):
+        values = np.nan_to_num(np.asarray(values, dtype=float))
+        codes = self.codes
+        if mask is not None:
+            codes, values = codes[mask], values[mask]
+        totals = np.bincount(codes, weights=values, minlength=self.nan_code + 1)
+        return pd.Series(totals[:-1], index=self.categories)
+
+
+category_index_cache = LRUCache(max_entries=128, max_bytes=512 * 1024 * 1024, sizeof=lambda index: index.nbytes)
+
+
+# Индекс строится один раз на версию данных и колонку
+def get_category_index(data, column):
+    key = (get_data_version(data), column)
+    return category_index_cache.get_or_compute(key, lambda: CategoryIndex(data[column]))
+
+
+# Пересечение битовых масок по нескольким колонкам: {колонка: [значения]}.
+# Пустой список значений колонку не ограничивает.
+def filter_bitmap(data, filters):
+    mask = np.ones(len(data), dtype=bool)
+    for column, values in filters.items():
+        if values:
+            mask &= get_category_index(data, column).bitmap(values)
+    return mask
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+from modules.cache import LRUCache, get_data_version
+from modules.time_index import month_codes, month_labels, get_dates
+from modules.category_index import get_category_index
+
+# Окна конверсии (дни от создания сделки до закрытия)
+COHORT_WINDOWS = [7, 30, 90]
+
+# Разрезы когорт
+COHORT_DIMENSIONS = ["Source", "Campaign"]
+
+cohort_cache = LRUCache(max_entries=32, max_bytes=64 * 1024 * 1024, sizeof=lambda cohorts: cohorts.nbytes)
+
+
+# Когорты по месяцу создания сделки. Месяц, значение разреза и окно —
+# целые коды, поэтому размеры когорт и конверсии считаются bincount по
+# составному коду, а «в пределах N дней» — накопленной суммой по окнам.
+class CohortMatrix:
+    def __init__(self, data, dimension=None):
+        # Даты разбираются один раз на версию данных
+        created = get_dates(data, "Created Time")
+        closing = get_dates(data, "Closing Date")
+        months = month_codes(created)
+        valid = months >= 0
+
+        if dimension is None:
+            self.values = pd.Index(["Все"])
+            dim_codes = np.zeros(len(data), dtype=np.int64)
+        else:
+            index = get_category_index(data, dimension)
+            self.values = index.categories
+            dim_codes = index.codes.astype(np.int64)
+            valid &= dim_codes != index.nan_code
+
+        self.first_month = int(months[valid].min()) if valid.any() else 0
+        self.months = int(months[valid].max()) - self.first_month + 1 if valid.any() else 0
+        cells = len(self.values) * self.months
+        cohort = dim_codes * self.months + (months - self.first_month)
+
+        # Размер когорты: все сделки, созданные в месяце
+        self.sizes = np.bincount(cohort[valid], minlength=cells).reshape(len(self.values), self.months)
+
+        # Номер окна, в которое попала успешная сделка (дни до закрытия)
+        days = (closing - created).astype("timedelta64[D]").astype(float)
+        days[np.isnat(closing) | np.isnat(created)] = np.nan
+        successful = data["Months of study"].notnull().values
+        converted = valid & successful & ~np.isnan(days) & (days >= 0) & (days <= COHORT_WINDOWS[-1])
+        windows = np.searchsorted(COHORT_WINDOWS, days[converted], side="left")
+        flat = cohort[converted] * len(COHORT_WINDOWS) + windows
+        counts = np.bincount(flat, minlength=cells * len(COHORT_WINDOWS))
+        counts = counts.reshape(len(self.values), self.months, len(COHORT_WINDOWS))
+        self.converted = np.cumsum(counts, axis=2)
+
+    @property
+    def nbytes(self):
+        return self.sizes.nbytes + self.converted.nbytes
+
+    @property
+    def window_labels(self):
+        return [f"{window} дней" for window in COHORT_WINDOWS]
+
+    def _position(self, value):
+        if value is None:
+            return slice(None)
+        position = self.values.get_indexer([value])[0]
+        return [position] if position >= 0 else []
+
+    # Матрица когорт: строки — месяцы создания, колонки — окна конверсии
+    def matrix(self, value=None, rate=True):
+        position = self._position(value)
+        sizes = self.sizes[position].sum(axis=0)
+        converted = self.converted[position].sum(axis=0)
+        if rate:
+            converted = np.divide(
+                converted * 100.0, sizes[:, None],
+                out=np.full(converted.shape, np.nan), where=sizes[:, None] > 0
+            )
+        table = pd.DataFrame(converted, index=month_labels(np.arange(self.months) + self.first_month), columns=self.window_labels)
+        table.insert(0, "Сделок в когорте", sizes)
+        return table
+
+
+def cohort_matrix(data, dimension=None):
+    return cohort_cache.get_or_compute(
+        (get_data_version(data), dimension), lambda: CohortMatrix(data, dimension)
+    )
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from modules.cache import LRUCache, get_data_version
+from modules.category_index import get_category_index, filter_bitmap
+from modules.time_index import get_dates
+
+PAGE_SIZES = [25, 50, 100, 500]
+
+# Больше значений в фильтре не показываем (самые частые)
+MAX_FILTER_OPTIONS = 1000
+
+# Порядок строк по версии данных, колонке сортировки и направлению (и с фильтром)
+explorer_order_cache = LRUCache(max_entries=64, max_bytes=256 * 1024 * 1024, sizeof=lambda order: order.nbytes)
+
+
+def _is_date_column(column):
+    return any(keyword in column.lower() for keyword in ["time", "date"])
+
+
+# Перестановка строк для сортировки: значения кодируются рангами
+# (factorize с сортировкой), пропуски получают последний ранг в обоих
+# направлениях, затем устойчивая сортировка целых рангов
+def sort_order(data, column, ascending=True):
+    values = get_dates(data, column) if _is_date_column(column) else data[column]
+    try:
+        codes, uniques = pd.factorize(values, sort=True)
+    except TypeError:
+        # Смешанные типы в колонке (числа и строки) сравниваются как строки
+        codes, uniques = pd.factorize(values.astype(str).where(values.notna()), sort=True)
+    ranks = codes if ascending else len(uniques) - 1 - codes
+    ranks = np.where(codes < 0, len(uniques), ranks)
+    order = np.argsort(ranks, kind="stable")
+    return order.astype(np.int32) if len(order) < np.iinfo(np.int32).max else order
+
+
+# Номера строк (в порядке сортировки), прошедших фильтр {колонка: [значения]}
+def row_positions(data, sort_column=None, ascending=True, filters=None):
+    filters = {column: values for column, values in (filters or {}).items() if values}
+    filters_key = tuple(sorted((column, tuple(sorted(map(str, values)))) for column, values in filters.items()))
+    if sort_column is None:
+        order = np.arange(len(data), dtype=np.int32)
+    else:
+        order = explorer_order_cache.get_or_compute(
+            (get_data_version(data), "sort", sort_column, ascending),
+            lambda: sort_order(data, sort_column, ascending)
+        )
+    if not filters:
+        return order
+    return explorer_order_cache.get_or_compute(
+        (get_data_version(data), "rows", sort_column, ascending, filters_key),
+        lambda: order[filter_bitmap(data, filters)[order]]
+    )
+
+
+# Просмотр сырых строк постранично: сортировка и фильтр считаются на сервере
+# по индексам, в браузер уходит только текущая страница
+def raw_data_explorer(data, key):
+    filter_columns = [
+        column for column in data.select_dtypes(include="object").columns
+        if not _is_date_column(column)
+    ]
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        sort_column = st.selectbox(
+            "Сортировка",
+            [None] + list(data.columns),
+            format_func=lambda x: "Без сортировки" if x is None else x,
+            key=f"{key}_explorer_sort"
+        )
+    with col2:
+        ascending = st.radio(
+            "Порядок", options=["По возрастанию", "По убыванию"], index=0, horizontal=True,
+            key=f"{key}_explorer_order"
+        ) == "По возрастанию"
+    with col3:
+        filter_column = st.selectbox(
+            "Фильтр по колонке",
+            [None] + filter_columns,
+            format_func=lambda x: "Без фильтра" if x is None else x,
+            key=f"{key}_explorer_filter_column"
+        )
+
+    filters = {}
+    if filter_column is not None:
+        counts = get_category_index(data, filter_column).value_counts()
+        if len(counts) > MAX_FILTER_OPTIONS:
+            st.caption(f"Показаны {MAX_FILTER_OPTIONS} самых частых значений из {len(counts)}.")
+        filters[filter_column] = st.multiselect(
+            "Значения",
+            list(counts.index[:MAX_FILTER_OPTIONS]),
+            format_func=lambda value: f"{value} ({counts[value]})",
+            key=f"{key}_explorer_filter_values"
+        )
+
+    positions = row_positions(data, sort_column, ascending, filters)
+    total = len(positions)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        page_size = st.selectbox("Строк на странице", PAGE_SIZES, index=1, key=f"{key}_explorer_page_size")
+    pages = max(1, -(-total // page_size))
+    # После смены фильтра или размера страницы номер может оказаться за пределами
+    page_key = f"{key}_explorer_page"
+    if st.session_state.get(page_key, 1) > pages:
+        st.session_state[page_key] = pages
+    with col2:
+        page = st.number_input("Страница", min_value=1, max_value=pages, step=1, key=page_key)
+
+    start = (page - 1) * page_size
+    window = positions[start:start + page_size]
+    st.dataframe(data.iloc[window])
+    if total:
+        st.caption(f"Строки {start + 1}–{start + len(window)} из {total}, страница {page} из {pages}")
+    else:
+        st.caption("Нет строк, подходящих под фильтр.")
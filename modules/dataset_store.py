@@ -0,0 +1,352 @@
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from modules.cache import LRUCache, bytes_version, file_version
+
+# Каталог с сохранёнными датасетами (по подкаталогу на тип датасета)
+STORE_DIR = "data_store"
+
+# Описание датасетов: ключ дедупликации, основная дата и измерения агрегатов
+DATASETS = {
+    "deals": {
+        "key": ["Id"],
+        "date_column": "Created Time",
+        "dimensions": ["Deal Owner Name", "Campaign", "Source", "City"],
+    },
+    "calls": {
+        "key": ["Id"],
+        "date_column": "Call Start Time",
+        "dimensions": ["Call Owner Name", "Call Type", "Call Status"],
+    },
+    "contacts": {
+        "key": ["Id"],
+        "date_column": "Created Time",
+        "dimensions": ["Contact Owner Name"],
+    },
+    "spend": {
+        # В выгрузке расходов нет Id и нет уникального набора колонок:
+        # дубликатом считается полностью совпадающая строка
+        "key": None,
+        "date_column": "Date",
+        "dimensions": ["Source", "Campaign"],
+    },
+}
+
+
+# Связанные датасеты, которые разделы Deals читают с диска
+LINKED_FILES = {
+    "calls": "demo_data/Cleaned_Calls.csv",
+    "contacts": "demo_data/Cleaned_Contacts.csv",
+    "spend": "demo_data/Cleaned_Spend.csv",
+}
+
+# Разобранные связанные датасеты по (путь, версия файла): каждый CSV
+# читается один раз на версию файла, а не при каждом перезапуске скрипта
+linked_cache = LRUCache(
+    max_entries=8,
+    max_bytes=512 * 1024 * 1024,
+    sizeof=lambda frame: int(frame.memory_usage(deep=True).sum())
+)
+
+
+def _read_linked_file(path, version):
+    frame = pd.read_csv(path)
+    frame.attrs["data_version"] = version
+    return frame
+
+
+# Связанный датасет с версией файла для разделов Deals и фонового расчёта;
+# None, если файла нет. Возвращается поверхностная копия кэшированного фрейма.
+def read_linked(kind):
+    path = LINKED_FILES[kind]
+    if not os.path.exists(path):
+        return None
+    version = file_version(path)
+    frame = linked_cache.get_or_compute((path, version), lambda: _read_linked_file(path, version))
+    return frame.copy(deep=False)
+
+
+# Тип датасета по имени файла (та же логика, что и при выборе модуля в main_dashboard)
+def detect_dataset_kind(file_name):
+    name = file_name.lower()
+    if "cont" in name:
+        return "contacts"
+    elif "calls" in name:
+        return "calls"
+    elif "spend" in name:
+        return "spend"
+    elif "deals" in name:
+        return "deals"
+    return None
+
+
+# Показатели одной строки, которые суммируются в агрегатах
+def row_measures(kind, frame):
+    measures = pd.DataFrame({"Count": np.ones(len(frame), dtype=np.int64)}, index=frame.index)
+    if kind == "deals":
+        successful = frame["Months of study"].notnull()
+        measures["Successful Deals"] = successful.astype(np.int64)
+        measures["Sales"] = frame["Initial Amount Paid"].where(successful, 0).fillna(0)
+    elif kind == "calls":
+        measures["Duration"] = frame["Call Duration (in seconds)"].fillna(0)
+    elif kind == "spend":
+        for column in ["Spend", "Clicks", "Impressions"]:
+            measures[column] = frame[column].fillna(0)
+    return measures
+
+
+# Агрегаты по месяцам основной даты и по каждому измерению для набора строк
+def aggregate_rows(kind, frame):
+    spec = DATASETS[kind]
+    measures = row_measures(kind, frame)
+    month = pd.to_datetime(frame[spec["date_column"]], errors="coerce").dt.to_period("M").astype(str)
+    aggregates = {"Month": measures.groupby(month.values).sum()}
+    for dimension in spec["dimensions"]:
+        if dimension in frame.columns:
+            aggregates[dimension] = measures.groupby(frame[dimension].values).sum()
+    return aggregates
+
+
+# Прибавляет (sign=1) или вычитает (sign=-1) вклад строк; меняются только
+# затронутые группы (месяцы, владельцы, кампании и т.д.)
+def apply_contribution(aggregates, contribution, sign=1):
+    for dimension, table in contribution.items():
+        current = aggregates.get(dimension)
+        if current is None:
+            aggregates[dimension] = table * sign
+            continue
+        missing = table.index.difference(current.index)
+        if len(missing):
+            current = pd.concat([current, pd.DataFrame(0, index=missing, columns=current.columns)])
+        touched = table.index
+        current.loc[touched, table.columns] = (
+            current.loc[touched, table.columns].values + sign * table.values
+        )
+        aggregates[dimension] = current[current["Count"] != 0]
+
+
+# Прочитанные датасеты по (каталог хранилища, версия, начало и конец периода):
+# перезапуск скрипта с тем же периодом не читает партиции заново
+store_frame_cache = LRUCache(
+    max_entries=16,
+    max_bytes=1024 * 1024 * 1024,
+    sizeof=lambda frame: int(frame.memory_usage(deep=True).sum())
+)
+
+
+# Служебная колонка с хэшем ключа строки внутри файлов партиций
+KEY_HASH = "__key_hash"
+
+# Партиция для строк без даты
+NO_DATE_PARTITION = "none"
+
+
+# Имя месячной партиции (YYYY-MM) для каждой строки по основной дате
+def partition_names(frame, date_column):
+    dates = pd.to_datetime(frame[date_column], errors="coerce")
+    return dates, dates.dt.strftime("%Y-%m").fillna(NO_DATE_PARTITION).values
+
+
+def partition_stats(frame, date_column):
+    dates = pd.to_datetime(frame[date_column], errors="coerce")
+    return {
+        "rows": len(frame),
+        "min": None if dates.isna().all() else dates.min().isoformat(),
+        "max": None if dates.isna().all() else dates.max().isoformat(),
+    }
+
+
+# Датасет хранится по месяцам основной даты: data_store/<тип>/month=YYYY-MM.parquet.
+# В манифесте для каждой партиции — число строк и min/max даты, по ним
+# фильтр по периоду читает только пересекающиеся партиции.
+class DatasetStore:
+    def __init__(self, kind, root=STORE_DIR):
+        self.kind = kind
+        self.spec = DATASETS[kind]
+        self.path = os.path.join(root, kind)
+        self.partitions = {}
+        self.aggregates = {}
+        self.version = None
+        self.applied = []
+        # Индекс ключей строится лениво при первом добавлении дельты
+        self.key_index = None
+        self.key_partitions = None
+        self.lock = threading.Lock()
+        self._load()
+
+    @property
+    def exists(self):
+        return bool(self.partitions)
+
+    # Хэш ключа строки; индекс по хэшам позволяет находить дубликаты без сканирования истории
+    def _key_hashes(self, frame):
+        return pd.util.hash_pandas_object(frame[self._key_columns(frame)].astype(str), index=False).values
+
+    def _key_columns(self, frame):
+        columns = [col for col in frame.columns if col != KEY_HASH]
+        if self.spec["key"] is None:
+            return columns
+        return [col for col in self.spec["key"] if col in columns]
+
+    def _partition_path(self, name):
+        return os.path.join(self.path, f"month={name}.parquet")
+
+    def _read_partition(self, name, columns=None):
+        return pd.read_parquet(self._partition_path(name), columns=columns)
+
+    # Индекс ключей: хэш ключа -> партиция, в которой лежит строка.
+    # Читается только служебная колонка хэшей из каждой партиции.
+    def _ensure_key_index(self):
+        if self.key_index is not None:
+            return
+        hashes = [np.array([], dtype=np.uint64)]
+        names = [np.array([], dtype=object)]
+        for name in self.partitions:
+            partition_hashes = self._read_partition(name, columns=[KEY_HASH])[KEY_HASH].values
+            hashes.append(partition_hashes)
+            names.append(np.full(len(partition_hashes), name, dtype=object))
+        self.key_index = pd.Index(np.concatenate(hashes))
+        self.key_partitions = np.concatenate(names)
+
+    # Слияние дельты: новые строки добавляются, строки с существующим ключом заменяются.
+    # Переписываются только партиции, затронутые дельтой или заменёнными строками;
+    # агрегаты пересчитываются только по этим строкам.
+    def append(self, delta, delta_version):
+        with self.lock:
+            if delta_version in self.applied:
+                return {"added": 0, "updated": 0, "skipped": True}
+
+            delta = delta.drop_duplicates(subset=self._key_columns(delta), keep="last").reset_index(drop=True)
+            delta[KEY_HASH] = self._key_hashes(delta)
+            _, delta_partitions = partition_names(delta, self.spec["date_column"])
+
+            self._ensure_key_index()
+            positions = self.key_index.get_indexer(delta[KEY_HASH].values)
+            existing = positions >= 0
+            replaced_hashes = delta[KEY_HASH].values[existing]
+            touched = set(delta_partitions) | set(self.key_partitions[positions[existing]])
+
+            removed = []
+            for name in sorted(touched):
+                new_rows = delta[delta_partitions == name]
+                if name in self.partitions:
+                    partition = self._read_partition(name)
+                    is_replaced = partition[KEY_HASH].isin(replaced_hashes)
+                    removed.append(partition[is_replaced])
+                    partition = pd.concat([partition[~is_replaced], new_rows], ignore_index=True)
+                else:
+                    partition = new_rows
+                self._write_partition(name, partition)
+
+            if removed:
+                removed = pd.concat(removed, ignore_index=True)
+                if len(removed):
+                    apply_contribution(self.aggregates, aggregate_rows(self.kind, removed), sign=-1)
+            apply_contribution(self.aggregates, aggregate_rows(self.kind, delta), sign=1)
+
+            keep = np.ones(len(self.key_index), dtype=bool)
+            keep[positions[existing]] = False
+            self.key_index = self.key_index[keep].append(pd.Index(delta[KEY_HASH].values))
+            self.key_partitions = np.concatenate([self.key_partitions[keep], delta_partitions.astype(object)])
+
+            self.version = bytes_version(f"{self.version}:{delta_version}".encode())
+            self.applied.append(delta_version)
+            self._save_manifest()
+            updated = int(existing.sum())
+            return {"added": len(delta) - updated, "updated": updated, "skipped": False}
+
+    # Вызывается под self.lock. Запись во временный файл и переименование:
+    # читатель не увидит недописанную партицию
+    def _write_partition(self, name, partition):
+        os.makedirs(self.path, exist_ok=True)
+        if len(partition):
+            path = self._partition_path(name)
+            tmp_path = f"{path}.tmp"
+            partition.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+            self.partitions[name] = partition_stats(partition, self.spec["date_column"])
+        elif name in self.partitions:
+            os.remove(self._partition_path(name))
+            del self.partitions[name]
+
+    # Общий диапазон дат по статистикам партиций
+    def date_range(self):
+        mins = [stats["min"] for stats in self.partitions.values() if stats["min"] is not None]
+        maxs = [stats["max"] for stats in self.partitions.values() if stats["max"] is not None]
+        if not mins:
+            return None, None
+        return pd.Timestamp(min(mins)), pd.Timestamp(max(maxs))
+
+    # Чтение датасета. Без периода читаются все партиции; с периодом —
+    # только партиции, чей [min, max] пересекается с [start, end].
+    # Результат кэшируется по версии хранилища; вызывающий получает
+    # поверхностную копию и может менять её колонки и attrs.
+    def load(self, start=None, end=None):
+        with self.lock:
+            key = (self.path, self.version, start, end)
+            frame = store_frame_cache.get_or_compute(key, lambda: self._read_period(start, end))
+        return frame.copy(deep=False)
+
+    def _read_period(self, start, end):
+        if start is None and end is None:
+            names = sorted(self.partitions)
+        else:
+            start = pd.Timestamp.min if start is None else pd.Timestamp(start)
+            end = pd.Timestamp.max if end is None else pd.Timestamp(end)
+            names = [
+                name for name, stats in sorted(self.partitions.items())
+                if stats["min"] is not None
+                and pd.Timestamp(stats["min"]) <= end and pd.Timestamp(stats["max"]) >= start
+            ]
+        if not names:
+            return pd.DataFrame()
+
+        frame = pd.concat([self._read_partition(name) for name in names], ignore_index=True)
+        frame = frame.drop(columns=[KEY_HASH])
+        if start is not None or end is not None:
+            # Точная фильтрация только внутри прочитанных партиций
+            dates = pd.to_datetime(frame[self.spec["date_column"]], errors="coerce")
+            frame = frame[(dates >= start) & (dates <= end)].reset_index(drop=True)
+        return frame
+
+    def _save_manifest(self):
+        os.makedirs(self.path, exist_ok=True)
+        pd.to_pickle(self.aggregates, os.path.join(self.path, "aggregates.pkl"))
+        with open(os.path.join(self.path, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump({"version": self.version, "partitions": self.partitions, "applied": self.applied}, f)
+
+    def _load(self):
+        manifest_path = os.path.join(self.path, "manifest.json")
+        if not os.path.exists(manifest_path):
+            return
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.version = manifest["version"]
+        self.applied = manifest["applied"]
+        self.partitions = manifest["partitions"]
+        aggregates_path = os.path.join(self.path, "aggregates.pkl")
+        if os.path.exists(aggregates_path):
+            self.aggregates = pd.read_pickle(aggregates_path)
+        else:
+            self.aggregates = aggregate_rows(self.kind, self.load())
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+# Хранилище одно на процесс и тип датасета
+def get_dataset_store(kind):
+    with _stores_lock:
+        if kind not in _stores:
+            _stores[kind] = DatasetStore(kind)
+        return _stores[kind]
+
+
+# Типы датасетов, для которых уже есть сохранённые данные
+def stored_kinds(root=STORE_DIR):
+    return [kind for kind in DATASETS if os.path.exists(os.path.join(root, kind, "manifest.json"))]
@@ -0,0 +1,146 @@
+import pandas as pd
+
+# Агрегаты разделов Deals: независимые groupby по одному фрейму. Функции
+# чистые (фрейм -> таблица), поэтому их можно считать в отдельных процессах.
+
+
+def _success_flag(frame):
+    return frame['Months of study'].notnull().astype(int)
+
+
+# Кампании: лиды, успешные сделки и конверсия
+def campaign_performance(frame):
+    df4 = frame.dropna(subset=['Campaign', 'Stage'])
+    leads_by_campaign = df4.groupby('Campaign')['Id'].count().reset_index(name='Leads')
+    successful_deals = df4[df4['Months of study'].notnull()]
+    successful_by_campaign = successful_deals.groupby('Campaign')['Id'].count().reset_index(name='Successful Deals')
+
+    performance = pd.merge(leads_by_campaign, successful_by_campaign, on='Campaign', how='left')
+    performance['Successful Deals'] = performance['Successful Deals'].fillna(0)
+    performance['Conversion Rate (%)'] = (performance['Successful Deals'] / performance['Leads']) * 100
+    return performance.sort_values(by=['Leads', 'Conversion Rate (%)'], ascending=False)
+
+
+# Источники: доля качественных лидов и конверсия в оплату
+def source_quality(frame):
+    target_quality = frame['Quality'].map({
+        'A - High': 'High',
+        'B - Medium': 'Medium',
+        'C - Low': 'Non-Target',
+        'D - Non Target': 'Non-Target',
+        'E - Non Qualified': 'Non-Target',
+        'F': 'Non-Target'
+    })
+    source_total = frame['Source'].value_counts()
+    high_deals = frame[target_quality == 'High']['Source'].value_counts()
+    medium_deals = frame[target_quality == 'Medium']['Source'].value_counts()
+    closed_won = frame[frame['Months of study'].notnull()]['Source'].value_counts()
+
+    result = pd.DataFrame({
+        'Total Deals': source_total,
+        'High Deals': high_deals,
+        'Medium Deals': medium_deals,
+        'High Percent (%)': (high_deals / source_total) * 100,
+        'Medium Percent (%)': (medium_deals / source_total) * 100,
+        'Payment Done Deals': closed_won,
+        'Conversion Rate (%)': (closed_won / source_total) * 100
+    }).fillna(0)
+    return result.sort_values(by=['Conversion Rate (%)'], ascending=False)
+
+
+# Типы оплаты: количество, успешность и средние суммы
+def payment_summary(frame):
+    df = frame.assign(is_successful=_success_flag(frame))
+    summary = df.groupby('Payment Type').agg(
+        total_deals=('is_successful', 'size'),
+        successful_deals=('is_successful', 'sum'),
+        avg_initial_payment=('Initial Amount Paid', 'mean'),
+        avg_offer_amount=('Offer Total Amount', 'mean'),
+        avg_study_months=('Months of study', 'mean')
+    ).round(2)
+    summary['conversion_rate'] = (summary['successful_deals'] / summary['total_deals']).round(2)
+    return summary
+
+
+# Типы оплаты: время от создания до закрытия сделки
+def payment_time(frame):
+    days = (pd.to_datetime(frame['Closing Date']) - pd.to_datetime(frame['Created Time'])).dt.days
+    df = frame[['Payment Type']].assign(creation_to_closing_days=days)
+    return df.groupby('Payment Type').agg(
+        avg_days_to_close=('creation_to_closing_days', 'mean'),
+        median_days_to_close=('creation_to_closing_days', 'median')
+    ).round(2)
+
+
+# Успешность по значениям колонки (продукт, тип обучения, город, страна, уровень языка)
+def success_by(frame, column, rate_column='conversion_rate'):
+    df = frame[[column]].assign(is_successful=_success_flag(frame))
+    result = df.groupby(column).agg(
+        total_deals=('is_successful', 'size'),
+        successful_deals=('is_successful', 'sum')
+    )
+    result[rate_column] = (result['successful_deals'] / result['total_deals']).round(2)
+    return result
+
+
+def product_success(frame):
+    return success_by(frame, 'Product').sort_values(by='total_deals', ascending=False).reset_index()
+
+
+def education_success(frame):
+    return success_by(frame, 'Education Type').sort_values(by='total_deals', ascending=False).reset_index()
+
+
+# Продукт × тип обучения (для тепловой карты конверсии)
+def product_education(frame):
+    df = frame[['Product', 'Education Type']].assign(is_successful=_success_flag(frame))
+    result = df.groupby(['Product', 'Education Type']).agg(
+        total_deals=('is_successful', 'size'),
+        successful_deals=('is_successful', 'sum')
+    )
+    result['conversion_rate'] = (result['successful_deals'] / result['total_deals']).round(2)
+    return result.reset_index()
+
+
+def city_success(frame):
+    return success_by(frame, 'City')
+
+
+def country_success(frame):
+    return success_by(frame, 'Country')
+
+
+def level_success(frame):
+    return success_by(frame, 'Level of Deutsch', rate_column='success_rate')
+
+
+# Город × уровень немецкого: средняя успешность и количество сделок
+def city_level_success(frame):
+    df = frame[['City', 'Level of Deutsch']].assign(is_successful=_success_flag(frame))
+    return df.groupby(['City', 'Level of Deutsch']).agg(
+        is_successful=('is_successful', 'mean'),
+        total_deals=('is_successful', 'size')
+    ).reset_index()
+
+
+# Реестр агрегатов: имя -> (функция, нужные колонки)
+SECTION_AGGREGATES = {
+    "campaign_performance": (campaign_performance, ['Campaign', 'Stage', 'Id', 'Months of study']),
+    "source_quality": (source_quality, ['Source', 'Quality', 'Months of study']),
+    "payment_summary": (payment_summary, ['Payment Type', 'Months of study', 'Initial Amount Paid', 'Offer Total Amount']),
+    "payment_time": (payment_time, ['Payment Type', 'Closing Date', 'Created Time']),
+    "product_success": (product_success, ['Product', 'Months of study']),
+    "education_success": (education_success, ['Education Type', 'Months of study']),
+    "product_education": (product_education, ['Product', 'Education Type', 'Months of study']),
+    "city_success": (city_success, ['City', 'Months of study']),
+    "country_success": (country_success, ['Country', 'Months of study']),
+    "level_success": (level_success, ['Level of Deutsch', 'Months of study']),
+    "city_level_success": (city_level_success, ['City', 'Level of Deutsch', 'Months of study']),
+}
+
+# Агрегаты, которые нужны каждому разделу (вкладки раздела рисуются за один проход)
+SECTION_GROUPS = {
+    "campaigns": ["campaign_performance", "source_quality"],
+    "payments": ["payment_summary", "payment_time", "product_success", "education_success", "product_education"],
+    "geography": ["city_success", "country_success", "level_success", "city_level_success"],
+}
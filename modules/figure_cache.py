@@ -0,0 +1,72 @@
+import json
+
+import streamlit as st
+import plotly.graph_objects as go
+
+from modules.cache import LRUCache
+from modules.figure_transport import TransportStats, encode_figure
+
+# Кэш сериализованных фигур: ключ — (раздел, версия данных, параметры графика),
+# значение — JSON фигуры в байтах (числовые массивы — base64 типизированных массивов)
+figure_cache = LRUCache(max_entries=512, max_bytes=128 * 1024 * 1024)
+
+
+def get_figure_spec(section, data_version, options, build_figure):
+    key = (section, data_version, options)
+    spec = figure_cache.get(key)
+    if spec is None:
+        spec = figure_cache.put(key, encode_figure(build_figure()))
+    return spec
+
+
+# Статистика передачи у каждой сессии своя: панель показывает фигуры,
+# отправленные этому пользователю
+def session_transport_stats():
+    return st.session_state.setdefault("figure_transport_stats", TransportStats())
+
+
+# Фигура из готового JSON собирается без повторной валидации Plotly
+# (валидаторы Plotly не знают типизированных массивов)
+def plotly_chart_spec(spec, **kwargs):
+    session_transport_stats().add(spec)
+    st.plotly_chart(go.Figure(json.loads(spec), _validate=False), **kwargs)
+
+
+# Отрисовка графика из кэша: build_figure вызывается только при промахе
+def plotly_chart_cached(section, data_version, options, build_figure, **kwargs):
+    plotly_chart_spec(get_figure_spec(section, data_version, options, build_figure), **kwargs)
+
+
+# Отрисовка без кэша, но с тем же компактным форматом передачи
+def plotly_chart_encoded(figure, **kwargs):
+    plotly_chart_spec(encode_figure(figure), **kwargs)
+
+
+def _format_bytes(size):
+    for unit in ["Б", "КБ", "МБ"]:
+        if size < 1024 or unit == "МБ":
+            return f"{size:.0f} {unit}" if unit == "Б" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+# Панель с размерами фигур, отправленных в эту сессию, и попаданиями в общий
+# кэш фигур. Сжатие и текстовый JSON считаются, только пока панель включена.
+def figure_transport_panel():
+    stats = session_transport_stats()
+    if not st.sidebar.checkbox("Передача графиков", key="figure_transport_panel"):
+        return
+    if not stats.figures:
+        st.sidebar.caption("Графики ещё не отправлялись.")
+        return
+    st.sidebar.write(f"Фигур отправлено: {stats.figures}, объём: {_format_bytes(stats.binary_bytes)}")
+    count, json_bytes, binary_bytes, compressed_bytes = stats.sample_sizes()
+    st.sidebar.write(f"Последние {count} фигур текстовым JSON: {_format_bytes(json_bytes)}")
+    st.sidebar.write(
+        f"С типизированными массивами: {_format_bytes(binary_bytes)} "
+        f"({binary_bytes / json_bytes:.0%} от JSON)"
+    )
+    st.sidebar.write(
+        f"После сжатия: {_format_bytes(compressed_bytes)} "
+        f"({compressed_bytes / json_bytes:.0%} от JSON)"
+    )
+    st.sidebar.caption(f"Кэш фигур (общий для сервера): попаданий {figure_cache.hits}, промахов {figure_cache.misses}")
@@ -0,0 +1,153 @@
+import base64
+import json
+import threading
+import zlib
+from collections import deque
+
+import numpy as np
+import plotly.io as pio
+
+# Атрибуты трасс, числовые массивы которых передаются в браузер как
+# типизированные массивы plotly.js ({"dtype", "bdata", "shape"}), а не текстом JSON
+TYPED_ARRAY_KEYS = ("x", "y", "z", "values", "customdata")
+TYPED_MARKER_KEYS = ("color", "size")
+
+# Короткие массивы оставляем текстом: base64 и описание типа их не уменьшают
+MIN_TYPED_LENGTH = 16
+
+# Целочисленные типы plotly.js (int64 в нём нет) от самого компактного
+INT_DTYPES = ["u1", "i1", "u2", "i2", "u4", "i4"]
+
+# Число последних отправленных фигур, по которым оцениваются текстовый
+# и сжатый размеры
+SAMPLE_FIGURES = 32
+
+
+# Числовой массив из JSON: null (пропуск) становится NaN; строки, даты,
+# логические и неровные вложенные списки не кодируются (None)
+def _numeric_array(values):
+    try:
+        array = np.asarray(values)
+    except ValueError:
+        return None
+    if array.dtype == object:
+        items = array.ravel()
+        if not all(item is None or (isinstance(item, (int, float)) and not isinstance(item, bool)) for item in items):
+            return None
+        array = array.astype(np.float64)
+    if array.dtype.kind not in "iuf" or array.ndim not in (1, 2):
+        return None
+    return array
+
+
+# Самый компактный тип без потери точности: целые (и дробные с целыми
+# значениями) — в наименьший подходящий целый тип, остальные — f4 или f8
+def _compact_dtype(array):
+    if array.dtype.kind == "f":
+        finite = np.isfinite(array).all()
+        if finite and np.array_equal(array, np.round(array)) and array.size:
+            array = array.astype(np.int64)
+        else:
+            narrow = array.astype(np.float32)
+            exact = np.array_equal(narrow.astype(np.float64), array, equal_nan=True)
+            return array, "f4" if exact else "f8"
+    if not array.size:
+        return array, "i4"
+    low, high = array.min(), array.max()
+    for code in INT_DTYPES:
+        info = np.iinfo(np.dtype(code))
+        if info.min <= low and high <= info.max:
+            return array, code
+    return array.astype(np.float64), "f8"
+
+
+def typed_array(values):
+    if not isinstance(values, list) or len(values) < MIN_TYPED_LENGTH:
+        return None
+    array = _numeric_array(values)
+    if array is None:
+        return None
+    array, code = _compact_dtype(array)
+    data = np.ascontiguousarray(array, dtype=np.dtype(code).newbyteorder("<"))
+    spec = {"dtype": code, "bdata": base64.b64encode(data.tobytes()).decode("ascii")}
+    if array.ndim == 2:
+        spec["shape"] = f"{array.shape[0]},{array.shape[1]}"
+    # Короткие десятичные дроби (0.5, 12.3) текстом короче восьми байт f8
+    if len(json.dumps(spec)) >= len(json.dumps(values)):
+        return None
+    return spec
+
+
+def _encode_trace(trace):
+    for key in TYPED_ARRAY_KEYS:
+        spec = typed_array(trace.get(key))
+        if spec is not None:
+            trace[key] = spec
+    marker = trace.get("marker")
+    if isinstance(marker, dict):
+        for key in TYPED_MARKER_KEYS:
+            spec = typed_array(marker.get(key))
+            if spec is not None:
+                marker[key] = spec
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and set(value) <= {"dtype", "bdata", "shape"} and "bdata" in value:
+        array = np.frombuffer(base64.b64decode(value["bdata"]), dtype=np.dtype(value["dtype"]).newbyteorder("<"))
+        if "shape" in value:
+            array = array.reshape([int(size) for size in value["shape"].split(",")])
+        return array.tolist()
+    return value
+
+
+# Обратное преобразование: типизированные массивы трасс снова списками,
+# как в обычном JSON фигуры
+def decode_figure(spec):
+    figure = json.loads(spec)
+    for trace in figure.get("data", []):
+        for key in TYPED_ARRAY_KEYS:
+            if key in trace:
+                trace[key] = _decode_value(trace[key])
+        marker = trace.get("marker")
+        if isinstance(marker, dict):
+            for key in TYPED_MARKER_KEYS:
+                if key in marker:
+                    marker[key] = _decode_value(marker[key])
+    return figure
+
+
+# Отправленные в браузер фигуры одной сессии: число и объём считаются при
+# каждой отправке (повторная отрисовка из кэша — тоже отправка). Размеры текстового JSON и
+# после сжатия (deflate, как при сжатии веб-сокета) считаются только по
+# запросу и только по последним отправленным фигурам.
+class TransportStats:
+    def __init__(self, sample_size=SAMPLE_FIGURES):
+        self.figures = 0
+        self.binary_bytes = 0
+        self._recent = deque(maxlen=sample_size)
+        self._lock = threading.Lock()
+
+    def add(self, spec):
+        with self._lock:
+            self.figures += 1
+            self.binary_bytes += len(spec)
+            self._recent.append(spec)
+
+    # (фигур в выборке, текстовый JSON, типизированные массивы, после сжатия)
+    def sample_sizes(self):
+        with self._lock:
+            specs = list(self._recent)
+        json_bytes = sum(len(pio.to_json(decode_figure(spec), validate=False).encode("utf-8")) for spec in specs)
+        binary_bytes = sum(len(spec) for spec in specs)
+        compressed_bytes = sum(len(zlib.compress(spec)) for spec in specs)
+        return len(specs), json_bytes, binary_bytes, compressed_bytes
+
+
+# Спецификация фигуры для передачи в браузер: JSON, в котором числовые
+# массивы трасс заменены на base64 типизированных массивов. Сериализуется
+# тем же pio.to_json, что и при отправке, поэтому размеры соответствуют передаваемым.
+def encode_figure(figure):
+    spec = json.loads(figure.to_json())
+    for trace in spec.get("data", []):
+        _encode_trace(trace)
+    return pio.to_json(spec, validate=False).encode("utf-8")
@@ -0,0 +1,131 @@
+import numpy as np
+import streamlit as st
+
+from modules.cache import LRUCache, get_data_version, bytes_version
+from modules.category_index import get_category_index, filter_bitmap
+from modules.time_index import get_time_index
+
+# Общие фильтры Deals: подпись в сайдбаре -> колонка
+FILTER_COLUMNS = {
+    "Владелец": "Deal Owner Name",
+    "Кампания": "Campaign",
+    "Источник": "Source",
+    "Город": "City",
+    "Продукт": "Product",
+}
+
+# Как фильтры Deals переносятся на связанные датасеты: колонка Deals -> колонка датасета
+LINKED_COLUMNS = {
+    "calls": {"Deal Owner Name": "Call Owner Name"},
+    "spend": {"Campaign": "Campaign", "Source": "Source"},
+}
+
+# Основная дата связанных датасетов для фильтра по периоду
+LINKED_DATE_COLUMNS = {
+    "calls": "Call Start Time",
+    "spend": "Date",
+}
+
+# Выбранные значения хранятся вне виджетов, чтобы переживать смену раздела и датасета
+STATE_KEY = "cross_filters"
+
+# Маски строк по версии данных и набору фильтров по категориям
+filter_mask_cache = LRUCache(max_entries=64, max_bytes=256 * 1024 * 1024, sizeof=lambda mask: mask.nbytes)
+
+# Номера отобранных строк по версии данных, фильтрам и периоду
+filter_rows_cache = LRUCache(max_entries=64, max_bytes=256 * 1024 * 1024, sizeof=lambda rows: rows.nbytes)
+
+
+def shared_filters():
+    return st.session_state.get(STATE_KEY, {})
+
+
+# Сайдбар с общими фильтрами Deals. У каждого значения показано число строк
+# с учётом остальных фильтров (перекрёстная фильтрация), счётчики берутся из индекса.
+def deals_filters_sidebar(data):
+    st.sidebar.subheader("Общие фильтры")
+    saved = shared_filters()
+    columns = {label: column for label, column in FILTER_COLUMNS.items() if column in data.columns}
+    options = {}
+    for column in columns.values():
+        options[column] = list(get_category_index(data, column).value_counts().index)
+        key = f"cross_filter_{column}"
+        # Значения, которых нет в текущем датасете, отбрасываются
+        available = set(options[column])
+        selected = st.session_state.get(key, saved.get(column, []))
+        st.session_state[key] = [value for value in selected if value in available]
+
+    current = {column: st.session_state[f"cross_filter_{column}"] for column in columns.values()}
+    filters = {}
+    for label, column in columns.items():
+        others = {other: values for other, values in current.items() if other != column}
+        counts = get_category_index(data, column).value_counts(mask=cached_filter_mask(data, others))
+        filters[column] = st.sidebar.multiselect(
+            label,
+            options[column],
+            format_func=lambda value, counts=counts: f"{value} ({counts.get(value, 0)})",
+            key=f"cross_filter_{column}"
+        )
+
+    st.session_state[STATE_KEY] = {column: list(values) for column, values in filters.items() if values}
+    return filters
+
+
+def _filters_key(filters):
+    return tuple(sorted((column, tuple(sorted(map(str, values)))) for column, values in filters.items() if values))
+
+
+def cached_filter_mask(data, filters):
+    key = (get_data_version(data), _filters_key(filters))
+    return filter_mask_cache.get_or_compute(key, lambda: filter_bitmap(data, filters))
+
+
+def cached_filter_rows(data, filters, date_column=None, start=None, end=None):
+    key = (get_data_version(data), _filters_key(filters), date_column, str(start), str(end))
+    return filter_rows_cache.get_or_compute(key, lambda: _filter_rows(data, filters, date_column, start, end))
+
+
+# Период берётся из отсортированного индекса дат (срез между двумя бинарными
+# поисками), маски категорий проверяются только для строк этого среза
+def _filter_rows(data, filters, date_column, start, end):
+    if date_column is None or (start is None and end is None):
+        return np.flatnonzero(cached_filter_mask(data, filters))
+    rows = get_time_index(data, date_column).between(start, end)
+    if _filters_key(filters):
+        rows = rows[cached_filter_mask(data, filters)[rows]]
+    return rows
+
+
+# Отфильтрованное представление: строки отбираются один раз на набор фильтров,
+# все разделы работают с одним и тем же срезом. У среза своя версия данных,
+# поэтому кэши графиков и индексов не путают его с полным датасетом.
+def apply_filters(data, filters, date_column=None, start=None, end=None):
+    has_period = date_column is not None and (start is not None or end is not None)
+    if not _filters_key(filters) and not has_period:
+        return data
+    view = data.take(cached_filter_rows(data, filters, date_column, start, end))
+    view.attrs["data_version"] = bytes_version(
+        f"{get_data_version(data)}:{_filters_key(filters)}:{date_column}:{start}:{end}".encode()
+    )
+    return view
+
+
+# Перенос фильтров Deals на связанный датасет (calls или spend)
+def apply_linked_filters(kind, frame, filters, start=None, end=None):
+    linked = {
+        LINKED_COLUMNS[kind][column]: values
+        for column, values in filters.items()
+        if values and column in LINKED_COLUMNS[kind]
+    }
+    return apply_filters(frame, linked, LINKED_DATE_COLUMNS[kind], start, end)
+
+
+# Общие фильтры Deals в разделах Calls и Spend (можно отключить в сайдбаре)
+def linked_filters_sidebar(kind, data):
+    applicable = {column: values for column, values in shared_filters().items() if column in LINKED_COLUMNS[kind]}
+    if not applicable:
+        return data
+    description = "; ".join(f"{column}: {', '.join(map(str, values))}" for column, values in applicable.items())
+    if st.sidebar.checkbox("Применить общие фильтры Deals", value=True, key=f"{kind}_cross_filters", help=description):
+        return apply_linked_filters(kind, data, applicable)
+    return data
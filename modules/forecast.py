@@ -0,0 +1,154 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from modules.cache import LRUCache
+from modules.time_index import get_dates, month_codes, month_labels
+
+# Модели прогноза в порядке вывода
+FORECAST_MODELS = ["Сезонная наивная", "Экспоненциальное сглаживание", "Регрессия на звонки (лаг)"]
+
+# Квантиль нормального распределения для 95% интервала
+Z_95 = 1.96
+
+SEASON = 12
+
+# Горизонт прогноза по умолчанию (месяцы)
+FORECAST_HORIZON = 3
+
+# Готовые прогнозы по версиям данных, целевому ряду и горизонту
+forecast_cache = LRUCache(
+    max_entries=64,
+    max_bytes=4 * 1024 * 1024,
+    sizeof=lambda result: sum(int(table.memory_usage().sum()) for table in result.values())
+)
+
+# Подбор моделей идёт в отдельном потоке, чтобы не блокировать перерисовку
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="forecast")
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+# Помесячные ряды звонков, сделок и успешных сделок на общей шкале месяцев
+def monthly_series(deals, calls):
+    deal_months = month_codes(get_dates(deals, "Created Time"))
+    call_months = month_codes(get_dates(calls, "Call Start Time"))
+    successful = deals["Months of study"].notnull().values
+    known = np.concatenate([deal_months[deal_months >= 0], call_months[call_months >= 0]])
+    if not len(known):
+        return pd.DataFrame(columns=["Calls", "Deals", "Won"])
+    first, last = known.min(), known.max()
+    size = last - first + 1
+
+    def count(codes, mask=None):
+        valid = codes >= 0 if mask is None else (codes >= 0) & mask
+        return np.bincount(codes[valid] - first, minlength=size)
+
+    return pd.DataFrame({
+        "Calls": count(call_months),
+        "Deals": count(deal_months),
+        "Won": count(deal_months, successful),
+    }, index=month_labels(np.arange(first, last + 1)))
+
+
+def _interval(forecast, sigma, spread):
+    return forecast - Z_95 * sigma * spread, forecast + Z_95 * sigma * spread
+
+
+# Сезонная наивная: значение того же месяца год назад (или последнее значение,
+# если истории меньше сезона)
+def seasonal_naive(y, horizon):
+    season = SEASON if len(y) >= SEASON + 2 else 1
+    steps = np.arange(horizon)
+    forecast = y[len(y) - season + steps % season].astype(float)
+    residuals = y[season:] - y[:-season]
+    sigma = residuals.std(ddof=1) if len(residuals) > 1 else 0.0
+    return forecast, *_interval(forecast, sigma, np.sqrt(steps // season + 1))
+
+
+def _holt(y, alpha, beta):
+    level, trend = float(y[0]), float(y[1] - y[0]) if len(y) > 1 else 0.0
+    errors = np.empty(len(y) - 1)
+    for t in range(1, len(y)):
+        prediction = level + trend
+        errors[t - 1] = y[t] - prediction
+        new_level = alpha * y[t] + (1 - alpha) * prediction
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        level = new_level
+    return level, trend, errors
+
+
+# Экспоненциальное сглаживание с трендом (Хольт); параметры — по сетке
+# с минимальной суммой квадратов ошибок прогноза на шаг вперёд
+def exponential_smoothing(y, horizon):
+    y = y.astype(float)
+    if len(y) < 3:
+        return seasonal_naive(y, horizon)
+    grid = np.linspace(0.1, 0.9, 9)
+    best = min(
+        ((alpha, beta) for alpha in grid for beta in grid),
+        key=lambda params: np.sum(_holt(y, *params)[2] ** 2)
+    )
+    level, trend, errors = _holt(y, *best)
+    steps = np.arange(1, horizon + 1)
+    forecast = level + steps * trend
+    sigma = errors.std(ddof=1) if len(errors) > 1 else 0.0
+    spread = np.sqrt(1 + (steps - 1) * best[0] ** 2)
+    return forecast, *_interval(forecast, sigma, spread)
+
+
+# Регрессия сделок на звонки с лагом в месяц: deals[t] = a + b * calls[t - 1].
+# Первый шаг использует известные звонки, дальше — прогноз звонков сглаживанием.
+def lagged_regression(y, calls, horizon, lag=1):
+    if len(y) <= lag + 2:
+        return exponential_smoothing(y, horizon)
+    X = np.column_stack([np.ones(len(y) - lag), calls[:-lag].astype(float)])
+    coefficients, *_ = np.linalg.lstsq(X, y[lag:].astype(float), rcond=None)
+    residuals = y[lag:] - X @ coefficients
+    sigma = residuals.std(ddof=2) if len(residuals) > 2 else 0.0
+    future_calls = np.concatenate([calls[-lag:], exponential_smoothing(calls, horizon)[0]])[:horizon]
+    forecast = coefficients[0] + coefficients[1] * future_calls
+    return forecast, *_interval(forecast, sigma, np.ones(horizon))
+
+
+def fit_forecasts(series, target, horizon):
+    y = series[target].values
+    calls = series["Calls"].values
+    last = pd.Period(series.index[-1], freq="M")
+    index = [str(last + step) for step in range(1, horizon + 1)]
+    results = {}
+    for name, (forecast, lower, upper) in zip(FORECAST_MODELS, [
+        seasonal_naive(y, horizon),
+        exponential_smoothing(y, horizon),
+        lagged_regression(y, calls, horizon),
+    ]):
+        results[name] = pd.DataFrame({
+            "Forecast": np.clip(forecast, 0, None),
+            "Lower": np.clip(lower, 0, None),
+            "Upper": np.clip(upper, 0, None),
+        }, index=index)
+    return results
+
+
+# Прогноз из кэша; если его нет — подбор запускается в фоне, а функция
+# сразу возвращает None (вызывающий код показывает, что расчёт идёт)
+def request_forecasts(key, series, target, horizon):
+    result = forecast_cache.get(key)
+    if result is not None:
+        return result
+    with _pending_lock:
+        future = _pending.get(key)
+        if future is None:
+            future = _executor.submit(fit_forecasts, series, target, horizon)
+            _pending[key] = future
+        if not future.done():
+            return None
+        del _pending[key]
+    return forecast_cache.put(key, future.result())
+
+
+# Синхронный расчёт с записью в тот же кэш (для фонового прогрева)
+def cached_forecasts(key, series, target, horizon):
+    return forecast_cache.get_or_compute(key, lambda: fit_forecasts(series, target, horizon))
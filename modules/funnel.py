@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+
+from modules.cache import LRUCache, get_data_version
+from modules.time_index import month_codes, month_labels
+
+# Порядок этапов воронки (от входа к оплате). Этапы, которых нет в списке,
+# ставятся в начало воронки; "Lost" — выход из воронки, а не этап.
+FUNNEL_STAGES = [
+    "New Lead",
+    "Call Delayed",
+    "Need a consultation",
+    "Need to call",
+    "Test Sent",
+    "Registered on Webinar",
+    "Registered on Offline Day",
+    "Waiting For Payment",
+    "Payment Done",
+]
+PAID_STAGE = "Payment Done"
+LOST_STAGE = "Lost"
+
+# Разрезы воронки
+FUNNEL_DIMENSIONS = ["Campaign", "Deal Owner Name", "Source"]
+
+# Интервалы времени в воронке (дни от создания до закрытия)
+FUNNEL_DURATION_EDGES = [0, 8, 31, 91]
+FUNNEL_DURATION_LABELS = ["0-7 дней", "8-30 дней", "31-90 дней", "91+ дней"]
+
+funnel_cache = LRUCache(max_entries=64, max_bytes=128 * 1024 * 1024, sizeof=lambda cube: cube.nbytes)
+time_in_funnel_cache = LRUCache(
+    max_entries=32,
+    max_bytes=16 * 1024 * 1024,
+    sizeof=lambda table: int(table.memory_usage(deep=True).sum())
+)
+
+
+# Куб воронки, материализованный по месяцам создания:
+# counts[значение разреза, месяц, уровень] — число сделок, остановившихся на уровне.
+# Последний уровень — потерянные сделки. Всё считается одним bincount.
+class FunnelCube:
+    def __init__(self, data, dimension=None):
+        stages = data["Stage"]
+        present = [stage for stage in stages.dropna().unique() if stage != LOST_STAGE]
+        unknown = [stage for stage in present if stage not in FUNNEL_STAGES]
+        self.stages = unknown + [stage for stage in FUNNEL_STAGES if stage in present]
+        levels = len(self.stages)
+        stage_codes = pd.Index(self.stages).get_indexer(stages)
+        stage_codes = np.where(stages.values == LOST_STAGE, levels, stage_codes)
+
+        months = month_codes(data["Created Time"])
+        valid = (months >= 0) & (stage_codes >= 0)
+        self.first_month = int(months[valid].min()) if valid.any() else 0
+        months = months - self.first_month
+        self.months = int(months[valid].max()) + 1 if valid.any() else 0
+
+        if dimension is None:
+            self.values = pd.Index(["Все"])
+            dim_codes = np.zeros(len(data), dtype=np.int64)
+        else:
+            dim_codes, uniques = pd.factorize(data[dimension])
+            self.values = pd.Index(uniques)
+            valid &= dim_codes >= 0
+
+        shape = (len(self.values), self.months, levels + 1)
+        flat = (dim_codes[valid] * shape[1] + months[valid]) * shape[2] + stage_codes[valid]
+        self.counts = np.bincount(flat, minlength=int(np.prod(shape))).reshape(shape)
+
+    @property
+    def nbytes(self):
+        return self.counts.nbytes
+
+    @property
+    def month_index(self):
+        return month_labels(np.arange(self.months) + self.first_month)
+
+    def slice(self, value=None):
+        if value is None:
+            return self.counts.sum(axis=0)
+        position = self.values.get_indexer([value])[0]
+        return self.counts[position] if position >= 0 else np.zeros(self.counts.shape[1:], dtype=np.int64)
+
+    # Сколько сделок дошло до каждого этапа: обратная накопленная сумма
+    # по уровням (сделка на этапе k прошла все этапы до него)
+    def reached(self, value=None):
+        stopped = self.slice(value)[:, :-1].sum(axis=0)
+        return pd.Series(np.cumsum(stopped[::-1])[::-1], index=self.stages)
+
+    # Конверсия из каждого этапа в оплату
+    def conversion_to_payment(self, value=None):
+        reached = self.reached(value)
+        paid = reached.get(PAID_STAGE, 0)
+        total = self.slice(value).sum()
+        table = pd.DataFrame({"Reached": reached})
+        table["To Payment (%)"] = np.divide(
+            paid, reached.values, out=np.full(len(reached), np.nan), where=reached.values > 0
+        ) * 100
+        table["Share of All Deals (%)"] = reached.values / total * 100 if total else np.nan
+        return table
+
+    # Распределение по этапам по месяцам создания
+    def monthly_distribution(self, value=None):
+        return pd.DataFrame(
+            self.slice(value),
+            index=self.month_index,
+            columns=self.stages + [LOST_STAGE]
+        )
+
+
+# Когорты времени в воронке: месяц создания × исход (оплата/потеря) × интервал дней
+def time_in_funnel(data):
+    created = pd.to_datetime(data["Created Time"], errors="coerce")
+    closing = pd.to_datetime(data["Closing Date"], errors="coerce")
+    days = (closing - created).dt.days.values
+    outcome = np.select([data["Stage"].values == PAID_STAGE, data["Stage"].values == LOST_STAGE], [0, 1], -1)
+    months = month_codes(created)
+    valid = (months >= 0) & (outcome >= 0) & ~np.isnan(days) & (days >= 0)
+    buckets = np.searchsorted(FUNNEL_DURATION_EDGES, days[valid], side="right") - 1
+    first_month = months[valid].min() if valid.any() else 0
+    month_offsets = months[valid] - first_month
+    n_months = int(month_offsets.max()) + 1 if valid.any() else 0
+    n_buckets = len(FUNNEL_DURATION_LABELS)
+    flat = (month_offsets * 2 + outcome[valid]) * n_buckets + buckets
+    counts = np.bincount(flat, minlength=n_months * 2 * n_buckets).reshape(n_months * 2, n_buckets)
+    index = pd.MultiIndex.from_product(
+        [month_labels(np.arange(n_months) + first_month), ["Оплата", "Потеря"]],
+        names=["Месяц", "Исход"]
+    )
+    return pd.DataFrame(counts, index=index, columns=FUNNEL_DURATION_LABELS)
+
+
+def funnel_cube(data, dimension=None):
+    return funnel_cache.get_or_compute(
+        (get_data_version(data), dimension), lambda: FunnelCube(data, dimension)
+    )
+
+
+def cached_time_in_funnel(data):
+    return time_in_funnel_cache.get_or_compute(get_data_version(data), lambda: time_in_funnel(data))
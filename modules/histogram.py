@@ -0,0 +1,31 @@
+import numpy as np
+
+from modules.cache import LRUCache
+
+# Готовые гистограммы (границы, значения) по версии данных и фильтру
+histogram_cache = LRUCache(
+    max_entries=256,
+    max_bytes=8 * 1024 * 1024,
+    sizeof=lambda hist: hist[0].nbytes + hist[1].nbytes
+)
+
+
+# Разбиение на интервалы на стороне сервера: в браузер уходят только
+# bins значений вместо всех исходных точек
+def binned_histogram(values, bins=30, value_range=None, histnorm=None):
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    counts, edges = np.histogram(values, bins=bins, range=value_range)
+    if histnorm == "probability" and counts.sum() > 0:
+        counts = counts / counts.sum()
+    return edges, counts
+
+
+def cached_histogram(key, values, bins=30, value_range=None, histnorm=None):
+    return histogram_cache.get_or_compute(
+        key, lambda: binned_histogram(values, bins, value_range, histnorm)
+    )
+
+
+def bin_centers(edges):
+    return (edges[:-1] + edges[1:]) / 2
@@ -0,0 +1,94 @@
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import streamlit as st
+
+# Размер порции при разборе CSV (строк)
+CHUNK_ROWS = 100_000
+
+# Строк первой порции в предпросмотре
+PREVIEW_ROWS = 20
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ingest")
+
+# Идущие разборы по хэшу содержимого: сессии, загрузившие один файл, ждут один разбор
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+# Разбор загруженного CSV в фоновом потоке по порциям. Пока он идёт,
+# доступны доля прочитанных байт, число строк, колонки и первая порция.
+class IngestJob:
+    def __init__(self, key, content):
+        self.key = key
+        self.size = len(content)
+        self.rows = 0
+        self.columns = []
+        self.preview = None
+        self._buffer = io.BytesIO(content)
+        self._future = _executor.submit(self._parse)
+
+    def _parse(self):
+        chunks = []
+        for chunk in pd.read_csv(self._buffer, chunksize=CHUNK_ROWS):
+            if self.preview is None:
+                self.columns = list(chunk.columns)
+                self.preview = chunk.head(PREVIEW_ROWS)
+            chunks.append(chunk)
+            self.rows += len(chunk)
+        self._buffer = None
+        if not chunks:
+            return pd.DataFrame(columns=self.columns)
+        return pd.concat(chunks, ignore_index=True)
+
+    # Доля прочитанного файла (парсер читает блоками, поэтому оценка)
+    @property
+    def progress(self):
+        if self.done:
+            return 1.0
+        buffer = self._buffer
+        return min(buffer.tell() / self.size, 1.0) if buffer is not None and self.size else 0.0
+
+    @property
+    def done(self):
+        return self._future.done()
+
+    # Готовый DataFrame; исключение разбора пробрасывается вызывающему
+    def result(self):
+        return self._future.result()
+
+
+def start_ingest(key, content):
+    with _jobs_lock:
+        job = _jobs.get(key)
+        if job is None:
+            job = _jobs[key] = IngestJob(key, content)
+        return job
+
+
+# Разбор завершён и его результат забран (датасет дальше живёт в общем хранилище)
+def finish_ingest(key):
+    with _jobs_lock:
+        _jobs.pop(key, None)
+
+
+# Прогресс и предпросмотр, пока файл разбирается. Фрагмент раз в секунду
+# обновляет только себя, а по завершении разбора перезапускает весь скрипт,
+# чтобы включился полный анализ.
+def ingest_progress(job, file_name):
+    @st.fragment(run_every=1)
+    def render():
+        if job.done:
+            st.rerun()
+        st.progress(job.progress, text=f"Разбор файла {file_name}: {job.progress:.0%}")
+        if job.preview is None:
+            st.info("Чтение первой порции данных...")
+            return
+        st.write(f"Прочитано строк: {job.rows:,}".replace(",", " "))
+        st.write(f"Колонки ({len(job.columns)}): {', '.join(job.columns)}")
+        st.subheader("Первые строки файла")
+        st.dataframe(job.preview)
+
+    render()
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+from modules.cache import LRUCache, get_data_version
+from modules.time_index import get_bucket_counts
+
+# Ряды для кросс-корреляции: (источник, колонка даты, колонка-отбор строк)
+LAG_SERIES = {
+    "Звонки": ("calls", "Call Start Time", None),
+    "Созданные сделки": ("deals", "Created Time", None),
+    "Успешные сделки": ("deals", "Created Time", "Months of study"),
+}
+
+# Квантиль нормального распределения для 95% доверительной полосы
+Z_95 = 1.96
+
+# Таблицы корреляций по версиям данных, частоте, паре рядов и числу лагов
+lag_correlation_cache = LRUCache(
+    max_entries=128,
+    max_bytes=16 * 1024 * 1024,
+    sizeof=lambda table: int(table.memory_usage().sum())
+)
+
+
+# Ряды на общей шкале корзин (дни или недели); пустые корзины — нули
+def aligned_series(deals, calls, freq, names):
+    sources = {"deals": deals, "calls": calls}
+    buckets = [get_bucket_counts(sources[source], column, freq, subset)
+               for source, column, subset in (LAG_SERIES[name] for name in names)]
+    present = [(first, counts) for first, counts in buckets if len(counts)]
+    if not present:
+        return 0, [np.zeros(0) for _ in names]
+    start = min(first for first, _ in present)
+    stop = max(first + len(counts) for first, counts in present)
+    series = []
+    for first, counts in buckets:
+        values = np.zeros(stop - start)
+        values[first - start:first - start + len(counts)] = counts
+        series.append(values)
+    return start, series
+
+
+# Нормированная кросс-корреляция r(k) = corr(x[t], y[t + k]) для всех лагов
+# |k| <= max_lag одним FFT: произведение спектров с нулевым дополнением до
+# 2n - 1 даёт линейную (не циклическую) корреляцию. Положительный лаг —
+# ряд y следует за x.
+def cross_correlation(x, y, max_lag):
+    n = len(x)
+    lags = np.arange(-max_lag, max_lag + 1)
+    x = x - x.mean()
+    y = y - y.mean()
+    norm = np.sqrt(np.dot(x, x) * np.dot(y, y))
+    if n < 2 or norm == 0:
+        return lags, np.full(len(lags), np.nan)
+    size = 1 << int(np.ceil(np.log2(2 * n - 1)))
+    full = np.fft.irfft(np.conj(np.fft.rfft(x, size)) * np.fft.rfft(y, size), size)
+    return lags, full[lags % size] / norm
+
+
+def build_lag_correlation(deals, calls, freq, leading, following, max_lag):
+    _, (x, y) = aligned_series(deals, calls, freq, [leading, following])
+    max_lag = max(0, min(max_lag, len(x) - 1))
+    lags, values = cross_correlation(x, y, max_lag)
+    # Полоса для белого шума: ±1.96 / sqrt(n)
+    band = Z_95 / np.sqrt(len(x)) if len(x) else np.nan
+    return pd.DataFrame({
+        "Lag": lags,
+        "Correlation": values,
+        "Significant": np.abs(values) > band,
+    }).assign(Band=band)
+
+
+def lag_correlation(deals, calls, freq, leading, following, max_lag):
+    key = (get_data_version(deals), get_data_version(calls), freq, leading, following, max_lag)
+    return lag_correlation_cache.get_or_compute(
+        key, lambda: build_lag_correlation(deals, calls, freq, leading, following, max_lag)
+    )
+
+
+# Лаг с наибольшей по модулю корреляцией
+def best_lag(table):
+    values = table["Correlation"].abs()
+    if values.isna().all():
+        return None
+    return table.loc[values.idxmax()]
+
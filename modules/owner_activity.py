@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from modules.cache import LRUCache, get_data_version
+from modules.category_index import get_category_index
+
+# Агрегаты звонков по владельцам для версии данных звонков
+owner_activity_cache = LRUCache(
+    max_entries=32,
+    max_bytes=32 * 1024 * 1024,
+    sizeof=lambda table: int(table.memory_usage(deep=True).sum())
+)
+
+
+# Агрегаты звонков по владельцу за один векторный проход:
+# владельцы кодируются один раз, все показатели — bincount по кодам
+def build_call_owner_aggregates(calls):
+    codes, owners = pd.factorize(calls["Call Owner Name"])
+    valid = codes >= 0
+    codes = codes[valid]
+    size = len(owners)
+    duration = np.nan_to_num(pd.to_numeric(calls["Call Duration (in seconds)"], errors="coerce").values[valid])
+    scheduled = np.nan_to_num(pd.to_numeric(calls["Scheduled in CRM"], errors="coerce").values[valid].astype(float))
+
+    call_count = np.bincount(codes, minlength=size)
+    total_duration = np.bincount(codes, weights=duration, minlength=size)
+    scheduled_count = np.bincount(codes, weights=scheduled, minlength=size)
+    return pd.DataFrame({
+        "Calls": call_count,
+        "Total Duration (min)": total_duration / 60,
+        "Avg Duration (sec)": np.divide(total_duration, call_count, out=np.zeros(size), where=call_count > 0),
+        "Scheduled in CRM (%)": np.divide(scheduled_count, call_count, out=np.zeros(size), where=call_count > 0) * 100,
+    }, index=pd.Index(owners, name="Owner"))
+
+
+def call_owner_aggregates(calls):
+    return owner_activity_cache.get_or_compute(
+        get_data_version(calls), lambda: build_call_owner_aggregates(calls)
+    )
+
+
+# Звонковая активность владельцев рядом с результатами их сделок;
+# без звонков (calls=None) — только показатели сделок
+def owner_productivity(deals, calls=None):
+    successful = deals["Months of study"].notnull().values
+    owners_index = get_category_index(deals, "Deal Owner Name")
+    total = owners_index.value_counts()
+    deal_stats = pd.DataFrame({
+        "Deals": total,
+        "Closed Deals": owners_index.value_counts(mask=successful),
+        "Sales": owners_index.sums(deals["Initial Amount Paid"].values, mask=successful),
+    }).fillna(0)
+    deal_stats.index.name = "Owner"
+    if calls is None:
+        table = deal_stats
+    else:
+        table = call_owner_aggregates(calls).join(deal_stats, how="outer").fillna(0)
+    table["Conversion Rate (%)"] = np.divide(
+        table["Closed Deals"], table["Deals"], out=np.zeros(len(table)), where=table["Deals"] > 0
+    ) * 100
+    if calls is not None:
+        table["Calls per Closed Deal"] = np.divide(
+            table["Calls"], table["Closed Deals"], out=np.full(len(table), np.nan), where=table["Closed Deals"] > 0
+        )
+    return table.sort_values(by="Sales", ascending=False)
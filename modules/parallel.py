@@ -0,0 +1,139 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import pyarrow as pa
+
+from modules.cache import LRUCache, get_data_version
+from modules.deals_sections import SECTION_AGGREGATES
+
+# Рабочих процессов не больше четырёх: каждый держит свою копию pandas,
+# а разделов, которые считаются одновременно, немного
+PARALLEL_WORKERS = min(4, os.cpu_count() or 1)
+
+# На маленьких датасетах запуск задач в процессах дороже самого расчёта
+PARALLEL_MIN_ROWS = 100_000
+
+# Готовые агрегаты разделов по версии данных и имени агрегата
+section_cache = LRUCache(
+    max_entries=256,
+    max_bytes=64 * 1024 * 1024,
+    sizeof=lambda table: int(table.memory_usage(deep=True).sum())
+)
+
+# Один пул на процесс: его разделяют все сессии и потоки фонового расчёта
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# Пул создаётся при первом параллельном расчёте. Контекст spawn: сервер
+# Streamlit многопоточный, fork из него небезопасен. Процессы spawn при
+# запуске импортируют главный модуль родителя (как __mp_main__), поэтому
+# скрипт дашборда строит интерфейс только под именем __main__.
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=PARALLEL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+# Колонки фрейма записываются один раз в разделяемую память как поток Arrow IPC;
+# задачи получают только имя сегмента, а не копию фрейма
+def share_frame(frame, columns=None):
+    table = pa.Table.from_pandas(frame, columns=columns, preserve_index=False)
+    sink = pa.MockOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    segment = shared_memory.SharedMemory(create=True, size=max(1, sink.size()))
+    try:
+        with pa.ipc.new_stream(pa.FixedSizeBufferWriter(pa.py_buffer(segment.buf)), table.schema) as writer:
+            writer.write_table(table)
+    except BaseException:
+        segment.close()
+        segment.unlink()
+        raise
+    return segment
+
+
+# Выполняется в рабочем процессе: Arrow читает колонки прямо из разделяемой
+# памяти без копирования, в pandas переводятся только колонки нужного агрегата.
+# Числовые колонки без пропусков (split_blocks) остаются представлениями
+# буферов сегмента, копируются только колонки, которым нужна конвертация.
+def _run_shared(segment_name, name):
+    builder, columns = SECTION_AGGREGATES[name]
+    segment = shared_memory.SharedMemory(name=segment_name)
+    try:
+        table = pa.ipc.open_stream(pa.py_buffer(segment.buf)).read_all()
+        frame = table.select(columns).to_pandas(split_blocks=True)
+        del table
+        result = builder(frame)
+        del frame
+        return result
+    finally:
+        try:
+            segment.close()
+        except BufferError:
+            # Arrow ещё держит ссылку на буфер: сегмент закроется вместе с процессом
+            pass
+
+
+# Каждый агрегат берётся через get_or_compute: ключ, который уже считает
+# другой поток (например, фоновый прогрев), не считается повторно
+def _run_local(data, version, names):
+    return {
+        name: section_cache.get_or_compute((version, name), lambda name=name: SECTION_AGGREGATES[name][0](data))
+        for name in names
+    }
+
+
+def _run_parallel(data, version, names):
+    columns = list(dict.fromkeys(column for name in names for column in SECTION_AGGREGATES[name][1]))
+    try:
+        segment = share_frame(data, columns)
+    except (pa.ArrowException, OSError):
+        # Колонки со смешанными типами Arrow не переводит — считаем в этом процессе
+        return _run_local(data, version, names)
+    try:
+        pool = _get_pool()
+
+        # get_or_compute блокирует поток до готовности ключа, поэтому ожидание
+        # каждого агрегата идёт в своём потоке: задачи в пуле выполняются параллельно
+        def compute(name):
+            return section_cache.get_or_compute(
+                (version, name), lambda: pool.submit(_run_shared, segment.name, name).result()
+            )
+
+        with ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="sections") as waiters:
+            return dict(zip(names, waiters.map(compute, names)))
+    except BrokenProcessPool:
+        _reset_pool()
+        return _run_local(data, version, names)
+    finally:
+        segment.close()
+        segment.unlink()
+
+
+# Агрегаты разделов {имя: таблица}. Недостающие считаются параллельно
+# в пуле процессов (если данных достаточно), готовые берутся из кэша.
+def section_aggregates(data, names):
+    version = get_data_version(data)
+    missing = [name for name in names if section_cache.get((version, name)) is None]
+    parallel = len(missing) > 1 and PARALLEL_WORKERS > 1 and len(data) >= PARALLEL_MIN_ROWS
+    computed = _run_parallel(data, version, missing) if parallel else {}
+    local = _run_local(data, version, [name for name in names if name not in computed])
+    return {name: computed[name] if name in computed else local[name] for name in names}
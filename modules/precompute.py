@@ -0,0 +1,141 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from modules.cache import get_data_version
+from modules.category_index import INDEXED_COLUMNS, get_category_index
+from modules.dataset_store import DATASETS, read_linked
+from modules.time_index import BUCKET_FREQS, get_bucket_counts, get_time_index
+from modules.sla import SLA_DIMENSIONS, SLA_DEFAULT_HOURS, sla_breakdown, with_sla_timedelta
+from modules.funnel import FUNNEL_DIMENSIONS, funnel_cube, cached_time_in_funnel
+from modules.cohort import COHORT_DIMENSIONS, cohort_matrix
+from modules.roi import ROI_DIMENSIONS, ROI_PERIODS, roi_table
+from modules.attribution import attribution_facts
+from modules.owner_activity import call_owner_aggregates, owner_productivity
+from modules.lag_correlation import LAG_SERIES
+from modules.forecast import FORECAST_HORIZON, cached_forecasts, monthly_series
+from modules.deals_sections import SECTION_AGGREGATES
+from modules.parallel import section_aggregates
+
+PRECOMPUTE_WORKERS = min(8, os.cpu_count() or 1)
+
+# Фоновый прогрев кэшей. Пул потоков, а не процессов: результаты должны
+# попасть в кэши этого процесса, а тяжёлые операции numpy/pandas отпускают GIL.
+_executor = ThreadPoolExecutor(max_workers=PRECOMPUTE_WORKERS, thread_name_prefix="precompute")
+
+# Задания по (тип датасета, версия данных); хранятся последние MAX_JOBS
+MAX_JOBS = 16
+_jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+
+
+# Индексы по измерениям датасета и по его основной дате
+def _index_tasks(kind, data):
+    columns = INDEXED_COLUMNS if kind == "deals" else DATASETS[kind]["dimensions"]
+    tasks = [(f"index:{column}", partial(get_category_index, data, column)) for column in columns if column in data]
+    date_column = DATASETS[kind]["date_column"]
+    if date_column in data:
+        tasks.append((f"time_index:{date_column}", partial(get_time_index, data, date_column)))
+    return tasks
+
+
+def _warm_calls_sections(deals):
+    calls = read_linked("calls")
+    if calls is None:
+        return
+    contacts = read_linked("contacts")
+    attribution_facts(deals, calls, contacts)
+    owner_productivity(deals, calls)
+    for freq in BUCKET_FREQS.values():
+        for source, column, subset in LAG_SERIES.values():
+            get_bucket_counts(deals if source == "deals" else calls, column, freq, subset)
+    series = monthly_series(deals, calls)
+    if not series.empty:
+        for target in ["Deals", "Won"]:
+            key = (get_data_version(deals), get_data_version(calls), target, FORECAST_HORIZON)
+            cached_forecasts(key, series, target, FORECAST_HORIZON)
+
+
+def _warm_roi(deals):
+    spend = read_linked("spend")
+    if spend is None:
+        return
+    for dimension in ROI_DIMENSIONS:
+        for period in ROI_PERIODS:
+            roi_table(spend, deals, dimension, period)
+
+
+# Агрегаты разделов по умолчанию (без фильтров, с настройками виджетов по умолчанию).
+# Раздел Deals работает с копией, где SLA уже timedelta (у неё своя версия
+# данных), поэтому прогреваются агрегаты этой копии.
+def deals_tasks(deals):
+    deals = with_sla_timedelta(deals)
+    tasks = _index_tasks("deals", deals)
+    tasks += [(f"sla:{by}", partial(sla_breakdown, deals, by, SLA_DEFAULT_HOURS)) for by in SLA_DIMENSIONS]
+    tasks += [(f"funnel:{by}", partial(funnel_cube, deals, by)) for by in [None] + FUNNEL_DIMENSIONS]
+    tasks.append(("time_in_funnel", partial(cached_time_in_funnel, deals)))
+    tasks += [(f"cohort:{by}", partial(cohort_matrix, deals, by)) for by in [None] + COHORT_DIMENSIONS]
+    tasks.append(("calls_sections", partial(_warm_calls_sections, deals)))
+    tasks.append(("roi", partial(_warm_roi, deals)))
+    tasks.append(("sections", partial(section_aggregates, deals, list(SECTION_AGGREGATES))))
+    return tasks
+
+
+def calls_tasks(calls):
+    return _index_tasks("calls", calls) + [("owner_activity", partial(call_owner_aggregates, calls))]
+
+
+PRECOMPUTE_TASKS = {
+    "deals": deals_tasks,
+    "calls": calls_tasks,
+    "contacts": partial(_index_tasks, "contacts"),
+    "spend": partial(_index_tasks, "spend"),
+}
+
+
+# Набор фоновых расчётов для одной версии датасета
+class PrecomputeJob:
+    def __init__(self, futures):
+        self.futures = futures
+
+    @property
+    def total(self):
+        return len(self.futures)
+
+    @property
+    def completed(self):
+        return sum(future.done() for future in self.futures.values())
+
+    @property
+    def done(self):
+        return self.completed == self.total
+
+    # Упавшие задания не мешают работе: раздел посчитает агрегат сам при открытии
+    @property
+    def failed(self):
+        return [name for name, future in self.futures.items() if future.done() and future.exception() is not None]
+
+
+# Запуск прогрева при загрузке датасета; повторные перезапуски скрипта
+# с той же версией данных получают уже запущенное задание
+def start_precompute(kind, data):
+    if kind not in PRECOMPUTE_TASKS:
+        return None
+    key = (kind, get_data_version(data))
+    with _jobs_lock:
+        job = _jobs.get(key)
+        if job is not None:
+            _jobs.move_to_end(key)
+            return job
+        # Поверхностная копия: фоновые потоки читают неизменный набор колонок,
+        # даже если вызывающий код заменит колонки своего фрейма
+        frame = data.copy(deep=False)
+        job = PrecomputeJob(OrderedDict(
+            (name, _executor.submit(task)) for name, task in PRECOMPUTE_TASKS[kind](frame)
+        ))
+        _jobs[key] = job
+        while len(_jobs) > MAX_JOBS:
+            _jobs.popitem(last=False)
+    return job
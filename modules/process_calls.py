@@ -1,10 +1,17 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from scipy import stats
 import plotly.express as px
 import plotly.graph_objects as go
 
+from modules.cache import get_data_version
+from modules.figure_cache import plotly_chart_cached, plotly_chart_encoded
+from modules.time_index import get_time_index, period_bounds
+from modules.category_index import get_category_index
+from modules.filter_state import apply_filters, linked_filters_sidebar
+from modules.histogram import cached_histogram, bin_centers
+from modules.data_explorer import raw_data_explorer
+
 def process_calls(data):
     st.header("Анализ данных Calls")
 
@@ -14,6 +21,12 @@ def process_calls(data):
     # Уникальные фильтры для Calls
     st.sidebar.header("Фильтры для Calls")
 
+    # Общие фильтры, выбранные в разделе Deals
+    data = linked_filters_sidebar("calls", data)
+    if data.empty:
+        st.warning("Нет данных, подходящих под общие фильтры Deals.")
+        return
+
     # Фильтр для категорий: любые категориальные поля, исключая "Call Start Time"
     category_column = st.sidebar.selectbox(
         "Выберите категориальную колонку", 
@@ -28,9 +41,30 @@ def process_calls(data):
         format_func=lambda x: "Выберите колонку" if x is None else x
     )
 
+    # Период анализа относится ко всему разделу: таблице, статистике и графикам.
+    # Диапазон дат находится бинарным поиском по отсортированному индексу
+    if date_column:
+        time_index = get_time_index(data, date_column)
+        if time_index.min is not None:
+            full_period = (time_index.min.date(), time_index.max.date())
+            period = st.sidebar.date_input(
+                "Период анализа",
+                value=full_period,
+                min_value=time_index.min.date(),
+                max_value=time_index.max.date(),
+                key="calls_period"
+            )
+            if len(period) == 2 and tuple(period) != full_period:
+                data = apply_filters(data, {}, date_column, *period_bounds(period))
+                if data.empty:
+                    st.warning("За выбранный период нет данных.")
+                    return
+    data_version = get_data_version(data)
+
     # Отображение данных
     st.subheader("📊 Данные и описательная статистика")
-    st.dataframe(data.head())
+    # Сырые строки постранично: в браузер уходит только текущая страница
+    raw_data_explorer(data, "calls")
 
     # Описательная статистика
     st.subheader("Описательная статистика")
@@ -70,6 +104,27 @@ def process_calls(data):
             """
         )
 
+        # Гистограмма длительности звонков: интервалы считаются на сервере
+        def build_call_duration_figure():
+            edges, counts = cached_histogram((data_version, "call_duration"), call_duration, bins=30)
+            fig_duration = go.Figure(
+                go.Bar(
+                    x=bin_centers(edges),
+                    y=counts,
+                    width=np.diff(edges),
+                    marker=dict(color="royalblue")
+                )
+            )
+            fig_duration.update_layout(
+                title="Распределение длительности звонков",
+                xaxis=dict(title="Длительность звонка (в секундах)"),
+                yaxis=dict(title="Количество звонков"),
+                plot_bgcolor="white"
+            )
+            return fig_duration
+
+        plotly_chart_cached("call_duration_hist", data_version, (), build_call_duration_figure)
+
     
     # Основной блок визуализации категорий
     st.subheader("📈 Визуализация категорий")
@@ -82,15 +137,10 @@ def process_calls(data):
             horizontal=True
         )
     
-        # Подготовка данных
-        category_data = data[category_column].copy()
-        if include_nan == "С NaN":
-            category_data = category_data.fillna("NaN")  # Заменяем NaN на строку "NaN"
-        else:
-            category_data = category_data.dropna()  # Убираем NaN
-    
-        # Получаем данные для графика
-        category_counts = category_data.value_counts()
+        # Получаем данные для графика из инвертированного индекса колонки
+        category_counts = get_category_index(data, category_column).value_counts(
+            dropna=include_nan != "С NaN", nan_label="NaN"
+        )
     
         # Проверка на пустые данные
         if category_counts.empty:
@@ -154,7 +204,7 @@ def process_calls(data):
                 )
     
             # Отображение графика
-            st.plotly_chart(fig_category)
+            plotly_chart_encoded(fig_category)
     else:
         st.write("Выберите категорию с левой панели")
 
@@ -216,7 +266,7 @@ def process_calls(data):
                 xaxis=dict(tickangle=45)  # Угол наклона подписей оси X
             )
         
-        st.plotly_chart(fig_time)
+        plotly_chart_encoded(fig_time)
     else:
         st.write("Выберите колонку с датами с левой панели")
 
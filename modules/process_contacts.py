@@ -3,6 +3,12 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 
+from modules.figure_cache import plotly_chart_encoded
+from modules.time_index import get_time_index, period_bounds
+from modules.category_index import get_category_index
+from modules.filter_state import apply_filters
+from modules.data_explorer import raw_data_explorer
+
 def process_contacts(data):
     st.header("Анализ данных Contacts")
 
@@ -23,9 +29,29 @@ def process_contacts(data):
         format_func=lambda x: "Выберите колонку" if x is None else x
     )
 
+    # Период анализа относится ко всему разделу: таблице, статистике и графикам.
+    # Диапазон дат находится бинарным поиском по отсортированному индексу
+    if date_column:
+        time_index = get_time_index(data, date_column)
+        if time_index.min is not None:
+            full_period = (time_index.min.date(), time_index.max.date())
+            period = st.sidebar.date_input(
+                "Период анализа",
+                value=full_period,
+                min_value=time_index.min.date(),
+                max_value=time_index.max.date(),
+                key="contacts_period"
+            )
+            if len(period) == 2 and tuple(period) != full_period:
+                data = apply_filters(data, {}, date_column, *period_bounds(period))
+                if data.empty:
+                    st.warning("За выбранный период нет данных.")
+                    return
+
     # Отображение данных
     st.subheader("📊 Данные и описательная статистика")
-    st.dataframe(data.head())
+    # Сырые строки постранично: в браузер уходит только текущая страница
+    raw_data_explorer(data, "contacts")
     
     # Описательная статистика
     st.subheader("Описательная статистика")
@@ -39,7 +65,7 @@ def process_contacts(data):
     st.subheader("📈 Визуализация категорий")
     if category_column:
         # Получаем данные для графика
-        category_counts = data[category_column].value_counts()
+        category_counts = get_category_index(data, category_column).value_counts()
     
         # Проверка на пустые данные
         if category_counts.empty:
@@ -103,7 +129,7 @@ def process_contacts(data):
                 )
     
             # Отображение графика
-            st.plotly_chart(fig_category)
+            plotly_chart_encoded(fig_category)
     else:
         st.write("Выберите категорию с левой панели")
 
@@ -173,7 +199,7 @@ def process_contacts(data):
                 xaxis=dict(tickangle=45)  # Угол наклона подписей оси X
             )
        
-        st.plotly_chart(fig_time)
+        plotly_chart_encoded(fig_time)
 
     else:
         st.write("Выберите колонку с датами с левой панели")
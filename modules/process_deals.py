@@ -1,21 +1,39 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from scipy import stats
 import plotly.express as px
 import plotly.graph_objects as go
-import plotly.figure_factory as ff
 from plotly.subplots import make_subplots
-from plotly.colors import get_colorscale
-from plotly.colors import find_intermediate_color
 import streamlit.components.v1 as components
 
+from modules.cache import get_data_version
+from modules.figure_cache import plotly_chart_cached
+from modules.time_index import BUCKET_FREQS, get_time_index, period_bounds
+from modules.category_index import get_category_index
+from modules.filter_state import deals_filters_sidebar, apply_filters, apply_linked_filters
+from modules.roi import ROI_DIMENSIONS, ROI_PERIODS, roi_table, roi_totals
+from modules.attribution import attribution_facts, attribution_summary
+from modules.owner_activity import owner_productivity
+from modules.sla import SLA_DIMENSIONS, SLA_DEFAULT_HOURS, MISSING_SLA, get_sla_seconds, with_sla_timedelta, sla_breakdown
+from modules.funnel import FUNNEL_DIMENSIONS, funnel_cube, cached_time_in_funnel
+from modules.cohort import COHORT_DIMENSIONS, cohort_matrix
+from modules.lag_correlation import LAG_SERIES, lag_correlation, best_lag
+from modules.deals_sections import SECTION_GROUPS
+from modules.parallel import section_aggregates
+from modules.forecast import FORECAST_MODELS, FORECAST_HORIZON, forecast_cache, monthly_series, request_forecasts
+from modules.kde import cached_kde
+from modules.histogram import cached_histogram, bin_centers
+from modules.data_explorer import raw_data_explorer
+from modules.dataset_store import read_linked
+
 def process_deals(data):
     st.header("Анализ данных Deals")
 
     # Уникальные фильтры для Deals
     st.sidebar.header("Фильтры для Deals")
-    data['SLA'] = pd.to_timedelta(data['SLA'].astype(str))
+    # SLA разбирается один раз на версию данных (в int64 секунды) и кэшируется;
+    # колонка заменяется в копии с собственной версией данных
+    data = with_sla_timedelta(data)
     
     # Фильтр для категорий: любые категориальные поля, исключая содержащие "time", "date"
     category_column = st.sidebar.selectbox(
@@ -33,6 +51,28 @@ def process_deals(data):
         format_func=lambda x: "Выберите колонку" if x is None else x
     )
 
+    # Период анализа: диапазон дат находится бинарным поиском по отсортированному индексу
+    period = ()
+    if date_column:
+        time_index = get_time_index(data, date_column)
+        if time_index.min is not None:
+            period = st.sidebar.date_input(
+                "Период анализа",
+                value=(time_index.min.date(), time_index.max.date()),
+                min_value=time_index.min.date(),
+                max_value=time_index.max.date(),
+                key="deals_period"
+            )
+    period_start, period_end = period_bounds(period)
+
+    # Общие фильтры и период применяются один раз: все разделы работают с одним срезом
+    filters = deals_filters_sidebar(data)
+    data = apply_filters(data, filters, date_column, period_start, period_end)
+    data_version = get_data_version(data)
+    if data.empty:
+        st.warning("Нет сделок, подходящих под выбранные фильтры.")
+        return
+
 
     # # Заголовок
     # st.title("Мой интерактивный дашборд")
@@ -47,7 +87,10 @@ def process_deals(data):
             "📋 Анализ эффективности кампаний и источников",
             "💼 Анализ эффективности работы отдела продаж",
             "💰 Анализ платежей и продуктов",
-            "🌍 Географический анализ"
+            "🌍 Географический анализ",
+            "⏱️ Анализ SLA",
+            "🔻 Воронка сделок",
+            "🧮 Когортный анализ"
         ],
         horizontal=True
     )
@@ -56,7 +99,8 @@ def process_deals(data):
     if tab_selected == "📊 Данные и описательная статистика":
         # Отображение данных
         st.subheader("📊 Данные и описательная статистика")
-        st.dataframe(data.head())
+        # Сырые строки постранично: в браузер уходит только текущая страница
+        raw_data_explorer(data, "deals")
     
         # Описательная статистика
         st.subheader("Описательная статистика")
@@ -80,7 +124,6 @@ def process_deals(data):
         st.subheader("Сводная статистика для числовых полей")
         st.dataframe(data[['Course duration', 'Months of study', 'Initial Amount Paid', 'Offer Total Amount', 'SLA']].describe().T)
 
-        data['SLA'] = pd.to_timedelta(data['SLA'].astype(str))
         # Фильтрация существующих числовых колонок из exclude_columns
         numerical_fields = ['Course duration', 'Months of study', 'Initial Amount Paid', 'Offer Total Amount']
         
@@ -147,13 +190,10 @@ def process_deals(data):
         
             # Обновление только при нажатии на кнопку
             if submit_button:
-                category_data = data[category_column].copy()
-                if include_nan == "С NaN":
-                    category_data = category_data.fillna("NaN")
-                else:
-                    category_data = category_data.dropna()
-        
-                category_counts = category_data.value_counts()
+                # Количество по значениям берётся из инвертированного индекса без прохода по колонке
+                category_counts = get_category_index(data, category_column).value_counts(
+                    dropna=include_nan != "С NaN", nan_label="NaN"
+                )
                 if category_counts.empty:
                     st.warning(f"Колонка '{category_column}' не содержит данных для визуализации.")
                 else:
@@ -162,50 +202,52 @@ def process_deals(data):
                         category_counts = category_counts.head(10)
                         st.info("Показаны только топ-10 категорий.")
         
-                    if chart_type == "BarH":
-                        fig_category = go.Figure(
-                            go.Bar(
-                                x=category_counts.values,
-                                y=category_counts.index,
-                                orientation="h",
-                                marker=dict(color="royalblue"),
-                                text=category_counts.values,
-                                textposition="outside"
+                    def build_category_figure():
+                        if chart_type == "BarH":
+                            fig_category = go.Figure(
+                                go.Bar(
+                                    x=category_counts.values,
+                                    y=category_counts.index,
+                                    orientation="h",
+                                    marker=dict(color="royalblue"),
+                                    text=category_counts.values,
+                                    textposition="outside"
+                                )
+                            )
+                            fig_category.update_layout(
+                                title=f"Распределение {category_column}",
+                                xaxis=dict(title="Количество"),
+                                yaxis=dict(title="Категории", autorange="reversed"),
+                                plot_bgcolor="white"
                             )
-                        )
-                        fig_category.update_layout(
-                            title=f"Распределение {category_column}",
-                            xaxis=dict(title="Количество"),
-                            yaxis=dict(title="Категории", autorange="reversed"),
-                            plot_bgcolor="white"
-                        )
         
-                    elif chart_type == "BarV":
-                        fig_category = go.Figure(
-                            go.Bar(
-                                x=category_counts.index,
-                                y=category_counts.values,
-                                marker=dict(color="royalblue"),
-                                text=category_counts.values,
-                                textposition="outside"
+                        elif chart_type == "BarV":
+                            fig_category = go.Figure(
+                                go.Bar(
+                                    x=category_counts.index,
+                                    y=category_counts.values,
+                                    marker=dict(color="royalblue"),
+                                    text=category_counts.values,
+                                    textposition="outside"
+                                )
+                            )
+                            fig_category.update_layout(
+                                title=f"Распределение {category_column}",
+                                xaxis=dict(title="Категории"),
+                                yaxis=dict(title="Количество"),
+                                plot_bgcolor="white"
                             )
-                        )
-                        fig_category.update_layout(
-                            title=f"Распределение {category_column}",
-                            xaxis=dict(title="Категории"),
-                            yaxis=dict(title="Количество"),
-                            plot_bgcolor="white"
-                        )
         
-                    elif chart_type == "Pie":
-                        fig_category = px.pie(
-                            values=category_counts.values,
-                            names=category_counts.index,
-                            title=f"Распределение {category_column}",
-                            color_discrete_sequence=px.colors.qualitative.Plotly
-                        )
+                        elif chart_type == "Pie":
+                            fig_category = px.pie(
+                                values=category_counts.values,
+                                names=category_counts.index,
+                                title=f"Распределение {category_column}",
+                                color_discrete_sequence=px.colors.qualitative.Plotly
+                            )
+                        return fig_category
         
-                    st.plotly_chart(fig_category)
+                    plotly_chart_cached("deals_category", data_version, (category_column, include_nan, chart_type), build_category_figure)
         else:
             st.write("Выберите категорию с левой панели")
 
@@ -216,7 +258,9 @@ def process_deals(data):
     elif tab_selected == "📉 Анализ временных рядов":
         st.subheader("📉 Анализ временных рядов")
         if date_column:
-            data[date_column] = pd.to_datetime(data[date_column])
+            # Даты разбираются в локальную серию: фрейм, по версии которого
+            # кэшируются графики, не меняется
+            dates = pd.to_datetime(data[date_column])
             st.subheader("Тенденция создания сделок с течением времени")
             deal_filter = st.radio(
                 "Выберите сделки для анализа",
@@ -226,9 +270,7 @@ def process_deals(data):
             )
 
             if deal_filter == "Успешные сделки":
-                filtered_data = data[data['Months of study'].notnull()]
-            else:
-                filtered_data = data
+                dates = dates[data['Months of study'].notnull()]
 
             aggregation_level = st.radio(
                 "Выберите уровень агрегации",
@@ -237,39 +279,41 @@ def process_deals(data):
                 horizontal=True
             )
 
-            if aggregation_level == "День":
-                time_series = filtered_data.groupby(filtered_data[date_column].dt.date).size()
-                title = f"Тенденция сделок (ежедневно)"
+            def build_time_figure():
+                if aggregation_level == "День":
+                    time_series = dates.groupby(dates.dt.date).size()
+                    title = f"Тенденция сделок (ежедневно)"
 
-                fig_time = px.line(
-                    x=time_series.index.astype(str),
-                    y=time_series.values,
-                    title=title,
-                    labels={"x": "Дата", "y": "Количество сделок"}
-                )
+                    fig_time = px.line(
+                        x=time_series.index.astype(str),
+                        y=time_series.values,
+                        title=title,
+                        labels={"x": "Дата", "y": "Количество сделок"}
+                    )
 
-            else:
-                time_series = filtered_data.groupby(filtered_data[date_column].dt.to_period("M")).size()
-                title = f"Тенденция сделок (ежемесячно)"
+                else:
+                    time_series = dates.groupby(dates.dt.to_period("M")).size()
+                    title = f"Тенденция сделок (ежемесячно)"
+
+                    fig_time = px.line(
+                        x=time_series.index.astype(str),
+                        y=time_series.values,
+                        title=title,
+                        labels={"x": "Дата", "y": "Количество сделок"},
+                        text=time_series.values
+                    )
+
+                    fig_time.update_traces(textposition="top center")
 
-                fig_time = px.line(
-                    x=time_series.index.astype(str),
-                    y=time_series.values,
+                fig_time.update_layout(
                     title=title,
-                    labels={"x": "Дата", "y": "Количество сделок"},
-                    text=time_series.values
+                    xaxis=dict(title="Дата"),
+                    yaxis=dict(title="Количество сделок"),
+                    plot_bgcolor="white"
                 )
+                return fig_time
 
-                fig_time.update_traces(textposition="top center")
-
-            fig_time.update_layout(
-                title=title,
-                xaxis=dict(title="Дата"),
-                yaxis=dict(title="Количество сделок"),
-                plot_bgcolor="white"
-            )
-
-            st.plotly_chart(fig_time)
+            plotly_chart_cached("deals_time_series", data_version, (date_column, deal_filter, aggregation_level), build_time_figure)
         else:
             st.write("Выберите колонку с датами с левой панели")            
 
@@ -278,98 +322,105 @@ def process_deals(data):
         st.subheader("Связь между звонками и созданием успешных сделок")
         
         # Загрузка данных о звонках
-        calls_data = pd.read_csv("demo_data/Cleaned_Calls.csv")
-        
-        # Приведение данных к единому формату
-        calls_data['CONTACTID'] = calls_data['CONTACTID'].astype(str)
-        data['Contact Name'] = data['Contact Name'].astype(str)
-        
-        # Приведение столбцов с датами к datetime
-        calls_data['Call Start Time'] = pd.to_datetime(calls_data['Call Start Time'])
-        data['Created Time'] = pd.to_datetime(data['Created Time'])
-        
-        # Фильтрация успешных сделок
-        # successful_deals = data[data['Months of study'].notnull()]
-        
-        # Группировка звонков по месяцам
-        monthly_calls = calls_data.resample('ME', on='Call Start Time').size().reset_index(name='Call Count')
-        
-        # Группировка успешных сделок по месяцам
-        monthly_deals = data.resample('ME', on='Created Time').size().reset_index(name='Deal Count')
-
-        # Объединение данных
-        monthly_data = pd.merge(
-            monthly_calls,
-            monthly_deals,
-            left_on='Call Start Time',
-            right_on='Created Time',
-            how='outer'
-        ).fillna(0)
-        
-        # Переименование столбцов
-        monthly_data.rename(columns={'Call Start Time': 'Date'}, inplace=True)
-        
-        # Рассчитываем корреляцию
-        correlation = monthly_data['Call Count'].corr(monthly_data['Deal Count'])
-        st.write(f"Корреляция между звонками и созданием сделок: {correlation:.2f}")
-
-        
-        # Создаём фигуру с двумя осями Y
-        fig_deals_calls = make_subplots(specs=[[{"secondary_y": True}]])
-
-        # Добавление графика звонков на левую ось
-        fig_deals_calls.add_trace(
-            go.Scatter(
-                x=monthly_data['Date'],
-                y=monthly_data['Call Count'],
-                mode='lines+markers',
-                name='Количество звонков',
-                line=dict(color='mediumorchid')
-            ),
-            secondary_y=False
-        )
-        
-        # Добавление графика сделок на правую ось
-        fig_deals_calls.add_trace(
-            go.Scatter(
-                x=monthly_data['Date'],
-                y=monthly_data['Deal Count'],
-                mode='lines+markers',
-                name='Количество сделок',
-                line=dict(color='royalblue')
-            ),
-            secondary_y=True
-        )
-        
-        # Обновление макета (без yaxis2!)
-        fig_deals_calls.update_layout(
-            xaxis=dict(title='Дата'),
-            yaxis=dict(
-                title=dict(
-                    text='Количество звонков',
-                    font=dict(color='mediumorchid')
-                ),
-                tickfont=dict(color='mediumorchid'),
-                showgrid=False
-            ),
-            legend=dict(x=0.5, xanchor='center', y=-0.2, orientation='h'),
-            plot_bgcolor='white',
-            margin=dict(l=50, r=50, t=50, b=50)
-        )
-        
-        # Настройка второй оси через метод update_yaxes
-        fig_deals_calls.update_yaxes(
-            title=dict(
-                text="Количество сделок",
-                font=dict(color='royalblue')
-            ),
-            tickfont=dict(color='royalblue'),
-            showgrid=False,
-            secondary_y=True
-        )
-
-        
-        st.plotly_chart(fig_deals_calls)
+        calls_data = read_linked("calls")
+        if calls_data is None:
+            st.info("Файл звонков demo_data/Cleaned_Calls.csv не найден: связь звонков и сделок недоступна.")
+        else:
+            # Общие фильтры Deals переносятся на звонки (владелец и период)
+            calls_data = apply_linked_filters("calls", calls_data, filters, period_start, period_end)
+        
+            # Приведение данных к единому формату
+            calls_data['CONTACTID'] = calls_data['CONTACTID'].astype(str)
+            data['Contact Name'] = data['Contact Name'].astype(str)
+        
+            # Приведение столбцов с датами к datetime
+            calls_data['Call Start Time'] = pd.to_datetime(calls_data['Call Start Time'])
+            data['Created Time'] = pd.to_datetime(data['Created Time'])
+        
+            # Фильтрация успешных сделок
+            # successful_deals = data[data['Months of study'].notnull()]
+        
+            # Группировка звонков по месяцам
+            monthly_calls = calls_data.resample('ME', on='Call Start Time').size().reset_index(name='Call Count')
+        
+            # Группировка успешных сделок по месяцам
+            monthly_deals = data.resample('ME', on='Created Time').size().reset_index(name='Deal Count')
+
+            # Объединение данных
+            monthly_data = pd.merge(
+                monthly_calls,
+                monthly_deals,
+                left_on='Call Start Time',
+                right_on='Created Time',
+                how='outer'
+            ).fillna(0)
+        
+            # Переименование столбцов
+            monthly_data.rename(columns={'Call Start Time': 'Date'}, inplace=True)
+        
+            # Рассчитываем корреляцию
+            correlation = monthly_data['Call Count'].corr(monthly_data['Deal Count'])
+            st.write(f"Корреляция между звонками и созданием сделок: {correlation:.2f}")
+
+        
+            def build_deals_calls_figure():
+                # Создаём фигуру с двумя осями Y
+                fig_deals_calls = make_subplots(specs=[[{"secondary_y": True}]])
+
+                # Добавление графика звонков на левую ось
+                fig_deals_calls.add_trace(
+                    go.Scatter(
+                        x=monthly_data['Date'],
+                        y=monthly_data['Call Count'],
+                        mode='lines+markers',
+                        name='Количество звонков',
+                        line=dict(color='mediumorchid')
+                    ),
+                    secondary_y=False
+                )
+        
+                # Добавление графика сделок на правую ось
+                fig_deals_calls.add_trace(
+                    go.Scatter(
+                        x=monthly_data['Date'],
+                        y=monthly_data['Deal Count'],
+                        mode='lines+markers',
+                        name='Количество сделок',
+                        line=dict(color='royalblue')
+                    ),
+                    secondary_y=True
+                )
+        
+                # Обновление макета (без yaxis2!)
+                fig_deals_calls.update_layout(
+                    xaxis=dict(title='Дата'),
+                    yaxis=dict(
+                        title=dict(
+                            text='Количество звонков',
+                            font=dict(color='mediumorchid')
+                        ),
+                        tickfont=dict(color='mediumorchid'),
+                        showgrid=False
+                    ),
+                    legend=dict(x=0.5, xanchor='center', y=-0.2, orientation='h'),
+                    plot_bgcolor='white',
+                    margin=dict(l=50, r=50, t=50, b=50)
+                )
+        
+                # Настройка второй оси через метод update_yaxes
+                fig_deals_calls.update_yaxes(
+                    title=dict(
+                        text="Количество сделок",
+                        font=dict(color='royalblue')
+                    ),
+                    tickfont=dict(color='royalblue'),
+                    showgrid=False,
+                    secondary_y=True
+                )
+                return fig_deals_calls
+
+        
+            plotly_chart_cached("deals_calls", data_version, (get_data_version(calls_data),), build_deals_calls_figure)
 
 
         
@@ -377,97 +428,279 @@ def process_deals(data):
         st.subheader("Связь между звонками и созданием успешных сделок")
         
         # Загрузка данных о звонках
-        calls_data = pd.read_csv("demo_data/Cleaned_Calls.csv")
-        
-        # Приведение данных к единому формату
-        calls_data['CONTACTID'] = calls_data['CONTACTID'].astype(str)
-        data['Contact Name'] = data['Contact Name'].astype(str)
-        
-        # Приведение столбцов с датами к datetime
-        calls_data['Call Start Time'] = pd.to_datetime(calls_data['Call Start Time'])
-        data['Created Time'] = pd.to_datetime(data['Created Time'])
-        
-        # Фильтрация успешных сделок
-        successful_deals = data[data['Months of study'].notnull()]
-        
-        # Группировка звонков по месяцам
-        monthly_calls = calls_data.resample('ME', on='Call Start Time').size().reset_index(name='Call Count')
-        
-        # Группировка успешных сделок по месяцам
-        monthly_deals = successful_deals.resample('ME', on='Created Time').size().reset_index(name='Deal Count')
-
-        # Объединение данных
-        monthly_data = pd.merge(
-            monthly_calls,
-            monthly_deals,
-            left_on='Call Start Time',
-            right_on='Created Time',
-            how='outer'
-        ).fillna(0)
-        
-        # Переименование столбцов
-        monthly_data.rename(columns={'Call Start Time': 'Date'}, inplace=True)
-        
-        # Рассчитываем корреляцию
-        correlation = monthly_data['Call Count'].corr(monthly_data['Deal Count'])
-        st.write(f"Корреляция между звонками и созданием успешных сделок: {correlation:.2f}")
-
-        # Создаём фигуру с двумя осями Y
-        fig_deals_calls = make_subplots(specs=[[{"secondary_y": True}]])
-        
-        # Линия для количества звонков (первая ось)
-        fig_deals_calls.add_trace(
-            go.Scatter(
-                x=monthly_data['Date'],
-                y=monthly_data['Call Count'],
-                mode='lines+markers',
-                name='Количество звонков',
-                line=dict(color='mediumorchid')
-            ),
-            secondary_y=False
-        )
-        
-        # Линия для количества успешных сделок (вторая ось)
-        fig_deals_calls.add_trace(
-            go.Scatter(
-                x=monthly_data['Date'],
-                y=monthly_data['Deal Count'],
-                mode='lines+markers+text',
-                name='Количество успешных сделок',
-                line=dict(color='green'),
-                text=monthly_data['Deal Count'].round(),
-                textposition="top center"
-            ),
-            secondary_y=True
-        )
-        
-        # Настройка осей
-        fig_deals_calls.update_layout(
-            xaxis_title='Дата',
-            yaxis_title='Количество звонков',
-            yaxis=dict(
-                tickfont=dict(color='mediumorchid'),
-                showgrid=False
-            ),
-            legend=dict(x=0.5, xanchor='center', y=-0.2, orientation='h'),
-            plot_bgcolor='white',
-            margin=dict(l=50, r=50, t=50, b=50)
-        )
-
-        
-        # Настройка второй оси (успешные сделки)
-        fig_deals_calls.update_yaxes(
-            title=dict(
-                text='Количество успешных сделок',
-                font=dict(color='green')
-            ),
-            tickfont=dict(color='green'),
-            showgrid=False,
-            secondary_y=True
-        )
-        
-        # Отображение графика в Streamlit
-        st.plotly_chart(fig_deals_calls)
+        calls_data = read_linked("calls")
+        if calls_data is None:
+            st.info("Файл звонков demo_data/Cleaned_Calls.csv не найден: связь звонков и успешных сделок недоступна.")
+        else:
+            # Общие фильтры Deals переносятся на звонки (владелец и период)
+            calls_data = apply_linked_filters("calls", calls_data, filters, period_start, period_end)
+        
+            # Приведение данных к единому формату
+            calls_data['CONTACTID'] = calls_data['CONTACTID'].astype(str)
+            data['Contact Name'] = data['Contact Name'].astype(str)
+        
+            # Приведение столбцов с датами к datetime
+            calls_data['Call Start Time'] = pd.to_datetime(calls_data['Call Start Time'])
+            data['Created Time'] = pd.to_datetime(data['Created Time'])
+        
+            # Фильтрация успешных сделок
+            successful_deals = data[data['Months of study'].notnull()]
+        
+            # Группировка звонков по месяцам
+            monthly_calls = calls_data.resample('ME', on='Call Start Time').size().reset_index(name='Call Count')
+        
+            # Группировка успешных сделок по месяцам
+            monthly_deals = successful_deals.resample('ME', on='Created Time').size().reset_index(name='Deal Count')
+
+            # Объединение данных
+            monthly_data = pd.merge(
+                monthly_calls,
+                monthly_deals,
+                left_on='Call Start Time',
+                right_on='Created Time',
+                how='outer'
+            ).fillna(0)
+        
+            # Переименование столбцов
+            monthly_data.rename(columns={'Call Start Time': 'Date'}, inplace=True)
+        
+            # Рассчитываем корреляцию
+            correlation = monthly_data['Call Count'].corr(monthly_data['Deal Count'])
+            st.write(f"Корреляция между звонками и созданием успешных сделок: {correlation:.2f}")
+
+            def build_successful_deals_calls_figure():
+                # Создаём фигуру с двумя осями Y
+                fig_deals_calls = make_subplots(specs=[[{"secondary_y": True}]])
+        
+                # Линия для количества звонков (первая ось)
+                fig_deals_calls.add_trace(
+                    go.Scatter(
+                        x=monthly_data['Date'],
+                        y=monthly_data['Call Count'],
+                        mode='lines+markers',
+                        name='Количество звонков',
+                        line=dict(color='mediumorchid')
+                    ),
+                    secondary_y=False
+                )
+        
+                # Линия для количества успешных сделок (вторая ось)
+                fig_deals_calls.add_trace(
+                    go.Scatter(
+                        x=monthly_data['Date'],
+                        y=monthly_data['Deal Count'],
+                        mode='lines+markers+text',
+                        name='Количество успешных сделок',
+                        line=dict(color='green'),
+                        text=monthly_data['Deal Count'].round(),
+                        textposition="top center"
+                    ),
+                    secondary_y=True
+                )
+        
+                # Настройка осей
+                fig_deals_calls.update_layout(
+                    xaxis_title='Дата',
+                    yaxis_title='Количество звонков',
+                    yaxis=dict(
+                        tickfont=dict(color='mediumorchid'),
+                        showgrid=False
+                    ),
+                    legend=dict(x=0.5, xanchor='center', y=-0.2, orientation='h'),
+                    plot_bgcolor='white',
+                    margin=dict(l=50, r=50, t=50, b=50)
+                )
+
+        
+                # Настройка второй оси (успешные сделки)
+                fig_deals_calls.update_yaxes(
+                    title=dict(
+                        text='Количество успешных сделок',
+                        font=dict(color='green')
+                    ),
+                    tickfont=dict(color='green'),
+                    showgrid=False,
+                    secondary_y=True
+                )
+                return fig_deals_calls
+        
+            # Отображение графика в Streamlit
+            plotly_chart_cached("successful_deals_calls", data_version, (get_data_version(calls_data),), build_successful_deals_calls_figure)
+
+
+        # --- Лаговая кросс-корреляция по дневным и недельным рядам ---
+        st.subheader("Лаговая кросс-корреляция")
+
+        if calls_data is None:
+            st.info("Файл звонков demo_data/Cleaned_Calls.csv не найден: кросс-корреляция звонков и сделок недоступна.")
+        else:
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                lag_freq_label = st.radio("Шаг ряда", options=list(BUCKET_FREQS), index=0, horizontal=True, key="lag_freq")
+            with col2:
+                lag_leading = st.selectbox("Ведущий ряд", options=list(LAG_SERIES), index=0, key="lag_leading")
+            with col3:
+                lag_following = st.selectbox("Ведомый ряд", options=list(LAG_SERIES), index=1, key="lag_following")
+            with col4:
+                max_lag = st.number_input("Максимальный лаг", min_value=1, max_value=730, value=60, step=1, key="lag_max")
+
+            lag_freq = BUCKET_FREQS[lag_freq_label]
+            lag_table = lag_correlation(data, calls_data, lag_freq, lag_leading, lag_following, max_lag)
+            best = best_lag(lag_table)
+            step_label = "дн." if lag_freq == "D" else "нед."
+
+            if best is None:
+                st.warning("Недостаточно данных для расчёта кросс-корреляции.")
+            else:
+                band = lag_table["Band"].iloc[0]
+                st.write(
+                    f"Наибольшая корреляция: {best['Correlation']:.2f} при лаге {int(best['Lag'])} {step_label} "
+                    f"(95% полоса для независимых рядов: ±{band:.2f}). "
+                    f"Положительный лаг — «{lag_following}» следует за «{lag_leading}»."
+                )
+
+                def build_lag_figure():
+                    colors = np.where(lag_table["Significant"], "royalblue", "lightgray")
+                    fig_lag = go.Figure(go.Bar(
+                        x=lag_table["Lag"], y=lag_table["Correlation"],
+                        marker_color=colors, name="Корреляция"
+                    ))
+                    for level in (band, -band):
+                        fig_lag.add_hline(y=level, line=dict(color="red", dash="dash", width=1))
+                    fig_lag.add_vline(x=best["Lag"], line=dict(color="green", dash="dot", width=1))
+                    fig_lag.update_layout(
+                        title=f"Кросс-корреляция: {lag_leading} → {lag_following}",
+                        xaxis=dict(title=f"Лаг ({step_label})"),
+                        yaxis=dict(title="Коэффициент корреляции"),
+                        plot_bgcolor="white",
+                        showlegend=False
+                    )
+                    return fig_lag
+
+                plotly_chart_cached(
+                    "deals_lag_correlation", data_version,
+                    (get_data_version(calls_data), lag_freq, lag_leading, lag_following, max_lag),
+                    build_lag_figure
+                )
+
+        # --- Прогноз сделок по помесячным агрегатам ---
+        st.subheader("Прогноз сделок")
+
+        if calls_data is None:
+            st.info("Файл звонков demo_data/Cleaned_Calls.csv не найден: прогноз сделок недоступен.")
+        else:
+            col1, col2 = st.columns(2)
+            with col1:
+                forecast_target = st.radio(
+                    "Ряд для прогноза", options=["Все сделки", "Успешные сделки"], index=0, horizontal=True, key="forecast_target"
+                )
+            with col2:
+                forecast_horizon = st.number_input("Горизонт (месяцы)", min_value=1, max_value=12, value=FORECAST_HORIZON, step=1, key="forecast_horizon")
+
+            target_column = "Won" if forecast_target == "Успешные сделки" else "Deals"
+            series = monthly_series(data, calls_data)
+            forecast_key = (data_version, get_data_version(calls_data), target_column, forecast_horizon)
+            # Прогнозы, которых сессия ждёт: флаг у каждого ряда и горизонта свой
+            forecast_waiting = st.session_state.setdefault("forecast_waiting", set())
+
+            # Модели подбираются в фоновом потоке; пока расчёт идёт, фрагмент
+            # раз в секунду проверяет готовность, не блокируя остальную страницу
+            def render_forecast():
+                forecasts = request_forecasts(forecast_key, series, target_column, forecast_horizon)
+                if forecasts is None:
+                    st.info("Прогноз рассчитывается...")
+                    return
+                if forecast_key in forecast_waiting:
+                    forecast_waiting.discard(forecast_key)
+                    st.rerun()
+
+                def build_forecast_figure():
+                    fig_forecast = go.Figure()
+                    fig_forecast.add_trace(go.Scatter(
+                        x=series.index, y=series[target_column], mode="lines+markers",
+                        name="Факт", line=dict(color="royalblue")
+                    ))
+                    for name, color in zip(FORECAST_MODELS, ["gray", "seagreen", "mediumorchid"]):
+                        forecast = forecasts[name]
+                        fig_forecast.add_trace(go.Scatter(
+                            x=list(forecast.index) + list(forecast.index[::-1]),
+                            y=list(forecast["Upper"]) + list(forecast["Lower"][::-1]),
+                            fill="toself", fillcolor=color, opacity=0.15, line=dict(width=0),
+                            name=f"{name}: 95% интервал", showlegend=False, hoverinfo="skip"
+                        ))
+                        fig_forecast.add_trace(go.Scatter(
+                            x=forecast.index, y=forecast["Forecast"], mode="lines+markers",
+                            name=name, line=dict(color=color, dash="dash")
+                        ))
+                    fig_forecast.update_layout(
+                        title=f"Прогноз: {forecast_target.lower()} по месяцам",
+                        xaxis=dict(title="Месяц"),
+                        yaxis=dict(title="Количество сделок"),
+                        legend=dict(x=0.5, xanchor="center", y=-0.2, orientation="h"),
+                        plot_bgcolor="white"
+                    )
+                    return fig_forecast
+
+                plotly_chart_cached("deals_forecast", data_version, forecast_key[1:], build_forecast_figure)
+                st.dataframe(pd.concat(forecasts, axis=1).style.format(precision=1))
+
+            if series.empty:
+                st.warning("Недостаточно данных для прогноза.")
+            elif forecast_cache.get(forecast_key) is None:
+                forecast_waiting.add(forecast_key)
+                st.fragment(render_forecast, run_every=1)()
+            else:
+                render_forecast()
+
+        # --- Атрибуция: звонки и контакты, связанные со сделками по контакту ---
+        st.subheader("Атрибуция звонков по контактам")
+
+        # Загрузка данных о звонках и контактах; без контактов атрибуция считается только по звонкам
+        calls_data = read_linked("calls")
+        if calls_data is None:
+            st.info("Файл звонков demo_data/Cleaned_Calls.csv не найден: атрибуция звонков недоступна.")
+        else:
+            calls_data = apply_linked_filters("calls", calls_data, filters, period_start, period_end)
+            contacts_data = read_linked("contacts")
+
+            # Таблица фактов по контактам строится один раз на версии трёх датасетов
+            facts = attribution_facts(data, calls_data, contacts_data)
+            summary = attribution_summary(facts)
+            st.write(
+                f"""
+                - **Контактов со сделками:** {summary['Contacts']}  
+                - **Доля контактов со звонками:** {summary['Contacted Share (%)']:.2f}%  
+                - **Медианное время до первого звонка:** {summary['Median Hours To First Call']:.1f} ч  
+                - **Звонков на одну конверсию (до закрытия):** {summary['Touches Per Conversion']:.2f}  
+                """
+            )
+            st.dataframe(facts.sort_values(by="Calls Before Close", ascending=False).head(100))
+
+            def build_attribution_figure():
+                converted_calls = facts.loc[facts["Converted"], "Calls Before Close"].clip(upper=20)
+                touches = converted_calls.value_counts().sort_index()
+                fig_touches = go.Figure(
+                    go.Bar(
+                        x=touches.index,
+                        y=touches.values,
+                        marker=dict(color="mediumorchid"),
+                        text=touches.values,
+                        textposition="outside"
+                    )
+                )
+                fig_touches.update_layout(
+                    title="Количество звонков до закрытия у сконвертированных контактов",
+                    xaxis=dict(title="Звонков до закрытия (20 = 20 и более)"),
+                    yaxis=dict(title="Количество контактов"),
+                    plot_bgcolor="white"
+                )
+                return fig_touches
+
+            plotly_chart_cached(
+                "calls_attribution", data_version,
+                (get_data_version(calls_data), None if contacts_data is None else get_data_version(contacts_data)),
+                build_attribution_figure
+            )
        
         
         
@@ -505,56 +738,73 @@ def process_deals(data):
         if st.button("Показать график"):
             # Проверяем наличие данных
             if not successful_deals.empty and not lost_deals.empty:
-                # Нормализованные гистограммы
-                fig_hist = go.Figure()
-        
-                fig_hist.add_trace(
-                    go.Histogram(
-                        x=successful_deals,
-                        nbinsx=30,
-                        name="Успешные сделки",
-                        histnorm="probability",
-                        marker=dict(color="green"),
-                        opacity=0.7
+                # Нормализованные гистограммы: интервалы считаются на сервере
+                # по общему диапазону, в браузер уходят только столбцы
+                def build_hist_figure():
+                    duration_range = (df3['Deal Duration'].min(), df3['Deal Duration'].max())
+                    fig_hist = go.Figure()
+            
+                    for label, durations, color in [
+                        ("Успешные сделки", successful_deals, "green"),
+                        ("Потерянные сделки", lost_deals, "red")
+                    ]:
+                        edges, counts = cached_histogram(
+                            (data_version, "deal_duration", label),
+                            durations,
+                            bins=30,
+                            value_range=duration_range,
+                            histnorm="probability"
+                        )
+                        fig_hist.add_trace(
+                            go.Bar(
+                                x=bin_centers(edges),
+                                y=counts,
+                                width=np.diff(edges),
+                                name=label,
+                                marker=dict(color=color),
+                                opacity=0.7
+                            )
+                        )
+            
+                    fig_hist.update_layout(
+                        title="Сравнение длительности успешных и потерянных сделок (нормализовано)",
+                        xaxis_title="Длительность сделки (в днях)",
+                        yaxis_title="Плотность",
+                        barmode="overlay",
+                        legend_title="Тип сделки"
                     )
-                )
-                fig_hist.add_trace(
-                    go.Histogram(
-                        x=lost_deals,
-                        nbinsx=30,
-                        name="Потерянные сделки",
-                        histnorm="probability",
-                        marker=dict(color="red"),
-                        opacity=0.7
+                    return fig_hist
+        
+                # KDE графики: плотность считается на фиксированной сетке,
+                # в браузер уходят только точки кривых
+                def build_kde_figure():
+                    kde_fig = go.Figure()
+                    for label, durations, color in [
+                        ("Успешные сделки", successful_deals, "green"),
+                        ("Потерянные сделки", lost_deals, "red")
+                    ]:
+                        grid, density = cached_kde((data_version, "deal_duration", label), durations)
+                        kde_fig.add_trace(
+                            go.Scatter(
+                                x=grid,
+                                y=density,
+                                mode="lines",
+                                name=label,
+                                line=dict(color=color)
+                            )
+                        )
+            
+                    kde_fig.update_layout(
+                        title="Сравнение длительности успешных и потерянных сделок (графики плотности)",
+                        xaxis_title="Длительность сделки (в днях)",
+                        yaxis_title="Плотность",
+                        legend_title="Тип сделки"
                     )
-                )
-        
-                fig_hist.update_layout(
-                    title="Сравнение длительности успешных и потерянных сделок (нормализовано)",
-                    xaxis_title="Длительность сделки (в днях)",
-                    yaxis_title="Плотность",
-                    barmode="overlay",
-                    legend_title="Тип сделки"
-                )
-        
-                # KDE графики
-                kde_fig = ff.create_distplot(
-                    [successful_deals, lost_deals],
-                    group_labels=["Успешные сделки", "Потерянные сделки"],
-                    colors=["green", "red"],
-                    show_hist=False
-                )
-        
-                kde_fig.update_layout(
-                    title="Сравнение длительности успешных и потерянных сделок (графики плотности)",
-                    xaxis_title="Длительность сделки (в днях)",
-                    yaxis_title="Плотность",
-                    legend_title="Тип сделки"
-                )
+                    return kde_fig
         
                 # Отображение графиков
-                st.plotly_chart(fig_hist, use_container_width=True)
-                st.plotly_chart(kde_fig, use_container_width=True)
+                plotly_chart_cached("deal_duration_hist", data_version, (), build_hist_figure, use_container_width=True)
+                plotly_chart_cached("deal_duration_kde", data_version, (), build_kde_figure, use_container_width=True)
             else:
                 st.warning("Недостаточно данных для построения графиков.")  
     
@@ -563,10 +813,14 @@ def process_deals(data):
     
     elif tab_selected == "📋 Анализ эффективности кампаний и источников":
         st.subheader("📋 Анализ эффективности кампаний и источников")
+
+        # Агрегаты вкладок независимы и считаются параллельно (результат кэшируется)
+        aggregates = section_aggregates(data, SECTION_GROUPS["campaigns"])
         
         # Создание вкладок
-        tab1, tab2 = st.tabs(["Advertising Campaigns",
-                              "Marketing Sources"])
+        tab1, tab2, tab3 = st.tabs(["Advertising Campaigns",
+                                    "Marketing Sources",
+                                    "Spend ROI"])
 
         # Вкладка 1:
         with tab1:        
@@ -574,15 +828,7 @@ def process_deals(data):
             st.subheader("Эффективность различных кампаний с точки зрения генерации лидов и коэффициента конверсии")
         
             # --- Обработка данных ---
-            df4 = data.dropna(subset=['Campaign', 'Stage'])
-            leads_by_campaign = df4.groupby('Campaign')['Id'].count().reset_index(name='Leads')
-            successful_deals = df4[df4['Months of study'].notnull()]
-            successful_by_campaign = successful_deals.groupby('Campaign')['Id'].count().reset_index(name='Successful Deals')
-        
-            campaign_performance = pd.merge(leads_by_campaign, successful_by_campaign, on='Campaign', how='left')
-            campaign_performance['Successful Deals'] = campaign_performance['Successful Deals'].fillna(0)
-            campaign_performance['Conversion Rate (%)'] = (campaign_performance['Successful Deals'] / campaign_performance['Leads']) * 100
-            campaign_performance = campaign_performance.sort_values(by=['Leads', 'Conversion Rate (%)'], ascending=False)
+            campaign_performance = aggregates["campaign_performance"]
             filtered_data = campaign_performance[campaign_performance['Conversion Rate (%)'] >= 2]
         
             # --- Новые расчеты ---
@@ -602,239 +848,269 @@ def process_deals(data):
 
             
             
-            # --- Первый график: Лиды и успешные сделки ---
-            fig1 = make_subplots(specs=[[{"secondary_y": True}]], vertical_spacing=0.2)
+            def build_campaign_leads_figure():
+                # --- Первый график: Лиды и успешные сделки ---
+                fig1 = make_subplots(specs=[[{"secondary_y": True}]], vertical_spacing=0.2)
 
-            # Лиды
-            fig1.add_trace(
-                go.Bar(
-                    x=filtered_data['Campaign'],
-                    y=filtered_data['Leads'],
-                    name="Leads",
-                    marker_color="plum",
-                ),
-                secondary_y=False,
-            )
+                # Лиды
+                fig1.add_trace(
+                    go.Bar(
+                        x=filtered_data['Campaign'],
+                        y=filtered_data['Leads'],
+                        name="Leads",
+                        marker_color="plum",
+                    ),
+                    secondary_y=False,
+                )
             
-            # Успешные сделки
-            fig1.add_trace(
-                go.Scatter(
-                    x=filtered_data['Campaign'],
-                    y=filtered_data['Successful Deals'],
-                    name="Successful Deals",
-                    mode="lines+markers+text",
-                    line=dict(color="cornflowerblue"),
-                    marker=dict(size=7),
-                    text=filtered_data['Successful Deals'],
-                    textposition="top center"
-                ),
-                secondary_y=True,
-            )
+                # Успешные сделки
+                fig1.add_trace(
+                    go.Scatter(
+                        x=filtered_data['Campaign'],
+                        y=filtered_data['Successful Deals'],
+                        name="Successful Deals",
+                        mode="lines+markers+text",
+                        line=dict(color="cornflowerblue"),
+                        marker=dict(size=7),
+                        text=filtered_data['Successful Deals'],
+                        textposition="top center"
+                    ),
+                    secondary_y=True,
+                )
             
-            fig1.update_layout(
-                title_text="Лиды и успешные сделки по кампаниям (Конверсия > 2%)",
-                height=600,
-                xaxis_title="Кампании",
-                xaxis=dict(tickangle=45),
-                yaxis_title="Количество лидов",
-                yaxis=dict(
-                    tickfont=dict(color="mediumorchid"),
-                    showgrid=False,
-                    zeroline=False
-                ),
-                legend=dict(
-                    orientation="h",
-                    x=0.5,
-                    xanchor="center",
-                    y=1.02  # <= важно! 1.1 может вылетать с ошибкой!
-                ),
-                plot_bgcolor='white'
-            )
+                fig1.update_layout(
+                    title_text="Лиды и успешные сделки по кампаниям (Конверсия > 2%)",
+                    height=600,
+                    xaxis_title="Кампании",
+                    xaxis=dict(tickangle=45),
+                    yaxis_title="Количество лидов",
+                    yaxis=dict(
+                        tickfont=dict(color="mediumorchid"),
+                        showgrid=False,
+                        zeroline=False
+                    ),
+                    legend=dict(
+                        orientation="h",
+                        x=0.5,
+                        xanchor="center",
+                        y=1.02  # <= важно! 1.1 может вылетать с ошибкой!
+                    ),
+                    plot_bgcolor='white'
+                )
 
             
-            fig1.update_yaxes(
-                title=dict(
-                    text="Количество успешных сделок",
-                    font=dict(color="royalblue")
-                ),
-                tickfont=dict(color="royalblue"),
-                showgrid=False,
-                zeroline=False,
-                secondary_y=True
-            )
+                fig1.update_yaxes(
+                    title=dict(
+                        text="Количество успешных сделок",
+                        font=dict(color="royalblue")
+                    ),
+                    tickfont=dict(color="royalblue"),
+                    showgrid=False,
+                    zeroline=False,
+                    secondary_y=True
+                )
+                return fig1
 
         
-            # --- Второй график: Лиды и коэффициент конверсии ---
-            fig2 = make_subplots(specs=[[{"secondary_y": True}]], vertical_spacing=0.2)
+            def build_campaign_conversion_figure():
+                # --- Второй график: Лиды и коэффициент конверсии ---
+                fig2 = make_subplots(specs=[[{"secondary_y": True}]], vertical_spacing=0.2)
 
-            # Лиды
-            fig2.add_trace(
-                go.Bar(
-                    x=filtered_data['Campaign'],
-                    y=filtered_data['Leads'],
-                    name="Leads",
-                    marker_color="plum"
-                ),
-                secondary_y=False,
-            )
+                # Лиды
+                fig2.add_trace(
+                    go.Bar(
+                        x=filtered_data['Campaign'],
+                        y=filtered_data['Leads'],
+                        name="Leads",
+                        marker_color="plum"
+                    ),
+                    secondary_y=False,
+                )
             
-            # Коэффициент конверсии
-            fig2.add_trace(
-                go.Scatter(
-                    x=filtered_data['Campaign'],
-                    y=filtered_data['Conversion Rate (%)'],
-                    name="Conversion Rate",
-                    mode="lines+markers+text",
-                    line=dict(color="mediumseagreen"),
-                    marker=dict(size=7),
-                    text=filtered_data['Conversion Rate (%)'].round(),
-                    textposition="top center"
-                ),
-                secondary_y=True,
-            )
+                # Коэффициент конверсии
+                fig2.add_trace(
+                    go.Scatter(
+                        x=filtered_data['Campaign'],
+                        y=filtered_data['Conversion Rate (%)'],
+                        name="Conversion Rate",
+                        mode="lines+markers+text",
+                        line=dict(color="mediumseagreen"),
+                        marker=dict(size=7),
+                        text=filtered_data['Conversion Rate (%)'].round(),
+                        textposition="top center"
+                    ),
+                    secondary_y=True,
+                )
             
-            fig2.update_layout(
-                title_text="Лиды и коэффициент конверсии по кампаниям (Конверсия > 2%)",
-                height=600,
-                xaxis_title="Кампании",
-                xaxis=dict(tickangle=45),
-                yaxis_title="Количество лидов",
-                yaxis=dict(
-                    tickfont=dict(color="mediumorchid"),
-                    showgrid=False,
-                    zeroline=False
-                ),
-                legend=dict(
-                    orientation="h",
-                    x=0.5,
-                    xanchor="center",
-                    y=1.02  # <= поправка
-                ),
-                plot_bgcolor='white'
-            )
+                fig2.update_layout(
+                    title_text="Лиды и коэффициент конверсии по кампаниям (Конверсия > 2%)",
+                    height=600,
+                    xaxis_title="Кампании",
+                    xaxis=dict(tickangle=45),
+                    yaxis_title="Количество лидов",
+                    yaxis=dict(
+                        tickfont=dict(color="mediumorchid"),
+                        showgrid=False,
+                        zeroline=False
+                    ),
+                    legend=dict(
+                        orientation="h",
+                        x=0.5,
+                        xanchor="center",
+                        y=1.02  # <= поправка
+                    ),
+                    plot_bgcolor='white'
+                )
 
             
-            fig2.update_yaxes(
-                title=dict(
-                    text="Коэффициент конверсии (%)",
-                    font=dict(color="green")
-                ),
-                tickfont=dict(color="green"),
-                showgrid=False,
-                zeroline=False,
-                secondary_y=True
-            )
+                fig2.update_yaxes(
+                    title=dict(
+                        text="Коэффициент конверсии (%)",
+                        font=dict(color="green")
+                    ),
+                    tickfont=dict(color="green"),
+                    showgrid=False,
+                    zeroline=False,
+                    secondary_y=True
+                )
+                return fig2
         
             # --- Вывод графиков ---
-            st.plotly_chart(fig1, use_container_width=True)
-            st.plotly_chart(fig2, use_container_width=True)
+            plotly_chart_cached("campaign_leads", data_version, (), build_campaign_leads_figure, use_container_width=True)
+            plotly_chart_cached("campaign_conversion", data_version, (), build_campaign_conversion_figure, use_container_width=True)
 
         # Вкладка 2:
         with tab2: 
             st.subheader("Эффективность различных маркетинговых источников (Source) в генерировании качественных лидов")
             
-            # Копируем DataFrame deals во временный df
-            df5 = data.copy()
-            
-            # Группировка качественных сделок
-            df5['Target Quality'] = df5['Quality'].map({
-                'A - High': 'High',
-                'B - Medium': 'Medium',
-                'C - Low': 'Non-Target',
-                'D - Non Target': 'Non-Target',
-                'E - Non Qualified': 'Non-Target',
-                'F': 'Non-Target'
-            })
-            
-            # Общее количество сделок по каждому источнику
-            source_total = df5['Source'].value_counts()
-            
-            # Количество High и Medium сделок по источникам
-            high_deals = df5[df5['Target Quality'] == 'High']['Source'].value_counts()
-            medium_deals = df5[df5['Target Quality'] == 'Medium']['Source'].value_counts()
-            
-            # Количество закрытых сделок (Payment Done) по источникам
-            closed_won = df5[df5['Months of study'].notnull()]['Source'].value_counts()
-            
-            # Расчёт процентов
-            high_percent = (high_deals / source_total) * 100
-            medium_percent = (medium_deals / source_total) * 100
-            conversion_rate = (closed_won / source_total) * 100
-            
-            # Итоговая таблица
-            result = pd.DataFrame({
-                'Total Deals': source_total,
-                'High Deals': high_deals,
-                'Medium Deals': medium_deals,
-                'High Percent (%)': high_percent,
-                'Medium Percent (%)': medium_percent,
-                'Payment Done Deals': closed_won,
-                'Conversion Rate (%)': conversion_rate
-            }).fillna(0)
-            
-            # Сортируем по конверсии
-            result = result.sort_values(by=['Conversion Rate (%)'], ascending=False)
-            
-            # --- Первый график: Коэффициент конверсии по источникам ---
-            fig1 = go.Figure()
-            
-            fig1.add_trace(
-                go.Bar(
-                    x=result.index,
-                    y=result['Conversion Rate (%)'],
-                    name='Коэффициент конверсии (%)',
-                    marker=dict(color='royalblue'),
-                    text=result['Conversion Rate (%)'].round(2),  # Значения для отображения
-                    textposition='outside'  # Расположение текста
+            # Доля качественных лидов и конверсия по источникам (отсортировано по конверсии)
+            result = aggregates["source_quality"]
+            
+            def build_source_conversion_figure():
+                # --- Первый график: Коэффициент конверсии по источникам ---
+                fig1 = go.Figure()
+            
+                fig1.add_trace(
+                    go.Bar(
+                        x=result.index,
+                        y=result['Conversion Rate (%)'],
+                        name='Коэффициент конверсии (%)',
+                        marker=dict(color='royalblue'),
+                        text=result['Conversion Rate (%)'].round(2),  # Значения для отображения
+                        textposition='outside'  # Расположение текста
+                    )
                 )
-            )
-            
-            fig1.update_layout(
-                title="Коэффициент конверсии по источникам (Conversion Rate by Source)",
-                xaxis=dict(title="Источник", tickangle=45),
-                yaxis=dict(title="Коэффициент конверсии (%)"),
-                height=500,
-                showlegend=False
-            )
             
-            # --- Второй график: Эффективность источников в генерации качественных лидов ---
-            fig2 = go.Figure()
-            
-            fig2.add_trace(
-                go.Bar(
-                    x=result.index,
-                    y=result['High Percent (%)'],
-                    name='Процент High (%)',
-                    marker=dict(color='green'),
-                    text=result['High Percent (%)'].round(2),  # Значения для отображения
-                    textposition='outside'
+                fig1.update_layout(
+                    title="Коэффициент конверсии по источникам (Conversion Rate by Source)",
+                    xaxis=dict(title="Источник", tickangle=45),
+                    yaxis=dict(title="Коэффициент конверсии (%)"),
+                    height=500,
+                    showlegend=False
+                )
+                return fig1
+            
+            def build_source_quality_figure():
+                # --- Второй график: Эффективность источников в генерации качественных лидов ---
+                fig2 = go.Figure()
+            
+                fig2.add_trace(
+                    go.Bar(
+                        x=result.index,
+                        y=result['High Percent (%)'],
+                        name='Процент High (%)',
+                        marker=dict(color='green'),
+                        text=result['High Percent (%)'].round(2),  # Значения для отображения
+                        textposition='outside'
+                    )
                 )
-            )
             
-            fig2.add_trace(
-                go.Bar(
-                    x=result.index,
-                    y=result['Medium Percent (%)'],
-                    name='Процент Medium (%)',
-                    marker=dict(color='orange'),
-                    text=result['Medium Percent (%)'].round(2),  # Значения для отображения
-                    textposition='outside'
+                fig2.add_trace(
+                    go.Bar(
+                        x=result.index,
+                        y=result['Medium Percent (%)'],
+                        name='Процент Medium (%)',
+                        marker=dict(color='orange'),
+                        text=result['Medium Percent (%)'].round(2),  # Значения для отображения
+                        textposition='outside'
+                    )
                 )
-            )
             
-            fig2.update_layout(
-                title="Эффективность источников в генерации качественных лидов",
-                xaxis=dict(title="Источник", tickangle=45),
-                yaxis=dict(title="Процент"),
-                height=500,
-                barmode="stack",
-                showlegend=True,
-                legend=dict(orientation="v", x=1, xanchor="right", y=1)
-            )
+                fig2.update_layout(
+                    title="Эффективность источников в генерации качественных лидов",
+                    xaxis=dict(title="Источник", tickangle=45),
+                    yaxis=dict(title="Процент"),
+                    height=500,
+                    barmode="stack",
+                    showlegend=True,
+                    legend=dict(orientation="v", x=1, xanchor="right", y=1)
+                )
+                return fig2
             
             # Выводим графики по очереди
-            st.plotly_chart(fig1, use_container_width=True)
-            st.plotly_chart(fig2, use_container_width=True)
+            plotly_chart_cached("source_conversion", data_version, (), build_source_conversion_figure, use_container_width=True)
+            plotly_chart_cached("source_quality", data_version, (), build_source_quality_figure, use_container_width=True)
+
+        # Вкладка 3:
+        with tab3:
+            st.subheader("Окупаемость рекламы: CPL, CAC и ROAS по кампаниям и источникам")
+
+            # Загрузка данных о расходах; общие фильтры Deals переносятся на расходы
+            spend_data = read_linked("spend")
+            if spend_data is None:
+                st.info("Файл расходов demo_data/Cleaned_Spend.csv не найден: окупаемость рекламы недоступна.")
+            else:
+                spend_data = apply_linked_filters("spend", spend_data, filters, period_start, period_end)
+
+                col1, col2 = st.columns(2)
+                with col1:
+                    roi_dimension = st.radio("Измерение", options=ROI_DIMENSIONS, index=0, horizontal=True, key="roi_dimension")
+                with col2:
+                    roi_period = st.radio("Период", options=list(ROI_PERIODS), index=0, horizontal=True, key="roi_period")
+
+                # Таблица считается один раз на версии данных, измерение и период
+                roi_result = roi_table(spend_data, data, roi_dimension, roi_period)
+                totals = roi_totals(roi_result)
+                st.write(
+                    f"""
+                    - **Расходы:** {totals['Spend']:.2f}  
+                    - **CPL (стоимость лида):** {totals['CPL']:.2f}  
+                    - **CAC (стоимость клиента):** {totals['CAC']:.2f}  
+                    - **ROAS (выручка / расходы):** {totals['ROAS']:.2f}  
+                    """
+                )
+                st.dataframe(roi_result.style.format({
+                    "Spend": "{:.2f}",
+                    "Revenue": "{:.2f}",
+                    "CPL": "{:.2f}",
+                    "CAC": "{:.2f}",
+                    "ROAS": "{:.2f}",
+                    "CTR (%)": "{:.2f}"
+                }))
+
+                def build_roas_figure():
+                    roas = roi_result.groupby(level=0)[["Spend", "Revenue"]].sum()
+                    roas = roas[roas["Spend"] > 0]
+                    roas["ROAS"] = roas["Revenue"] / roas["Spend"]
+                    roas = roas.sort_values(by="ROAS", ascending=False).head(15)
+                    fig_roas = go.Figure(
+                        go.Bar(
+                            x=roas.index,
+                            y=roas["ROAS"],
+                            marker=dict(color="seagreen"),
+                            text=roas["ROAS"].round(2),
+                            textposition="outside"
+                        )
+                    )
+                    fig_roas.update_layout(
+                        title=f"ROAS по {roi_dimension} (топ-15)",
+                        xaxis=dict(title=roi_dimension, tickangle=45),
+                        yaxis=dict(title="ROAS"),
+                        plot_bgcolor="white"
+                    )
+                    return fig_roas
+
+                plotly_chart_cached("spend_roas", data_version, (get_data_version(spend_data), roi_dimension, roi_period), build_roas_figure, use_container_width=True)
 
 
 
@@ -843,8 +1119,9 @@ def process_deals(data):
         st.subheader("💼 Анализ эффективности работы отдела продаж")
 
         # Создание вкладок
-        tab1, tab2 = st.tabs(["Deal Owners",
-                              "Advertising Campaigns"])
+        tab1, tab2, tab3 = st.tabs(["Deal Owners",
+                                    "Advertising Campaigns",
+                                    "Call Activity"])
 
         # Вкладка 1:
         with tab1:        
@@ -852,8 +1129,10 @@ def process_deals(data):
             st.subheader("Эффективность отдельных владельцев сделок с точки зрения количества обработанных сделок, коэффициента конверсии и общей суммы продаж")
         
             # Подготовка данных
-            owners_total_deals = data['Deal Owner Name'].value_counts()
-            owners_closed_won = data[data['Months of study'].notnull()]['Deal Owner Name'].value_counts()
+            successful_mask = data['Months of study'].notnull().values
+            owners_index = get_category_index(data, 'Deal Owner Name')
+            owners_total_deals = owners_index.value_counts()
+            owners_closed_won = owners_index.value_counts(mask=successful_mask)
             owners_conversion_rate = (owners_closed_won / owners_total_deals) * 100
             owners_total_sales = data[data['Months of study'].notnull()].groupby('Deal Owner Name')['Initial Amount Paid'].sum()
             
@@ -874,113 +1153,117 @@ def process_deals(data):
             # Фильтрация владельцев с продажами
             owners_with_sales = owners_result[owners_result['Closed Deals'] > 0]
             
-            # --- Построение графиков ---
-            # График 1: Закрытые сделки и общая сумма продаж
-            fig1 = make_subplots(specs=[[{"secondary_y": True}]])
-            
-            fig1.add_trace(
-                go.Bar(
-                    x=owners_with_sales.index,
-                    y=owners_with_sales['Closed Deals'],
-                    name='Closed Deals',
-                    marker_color='skyblue',
-                    text=owners_with_sales['Closed Deals'],
-                    textposition='inside'
-                ),
-                secondary_y=False,
-            )
+            def build_owner_sales_figure():
+                # --- Построение графиков ---
+                # График 1: Закрытые сделки и общая сумма продаж
+                fig1 = make_subplots(specs=[[{"secondary_y": True}]])
+            
+                fig1.add_trace(
+                    go.Bar(
+                        x=owners_with_sales.index,
+                        y=owners_with_sales['Closed Deals'],
+                        name='Closed Deals',
+                        marker_color='skyblue',
+                        text=owners_with_sales['Closed Deals'],
+                        textposition='inside'
+                    ),
+                    secondary_y=False,
+                )
             
-            fig1.add_trace(
-                go.Scatter(
-                    x=owners_with_sales.index,
-                    y=owners_with_sales['Total Sales Amount'],
-                    name='Total Sales Amount',
-                    mode='lines+markers',
-                    line=dict(color='purple'),
-                    marker=dict(size=7)
-                ),
-                secondary_y=True,
-            )
+                fig1.add_trace(
+                    go.Scatter(
+                        x=owners_with_sales.index,
+                        y=owners_with_sales['Total Sales Amount'],
+                        name='Total Sales Amount',
+                        mode='lines+markers',
+                        line=dict(color='purple'),
+                        marker=dict(size=7)
+                    ),
+                    secondary_y=True,
+                )
             
-            fig1.update_layout(
-                title_text='Effectiveness of Deal Owners: Sales & Closed Deals',
-                xaxis_title='Deal Owner Name',
-                yaxis_title='Closed Deals (Count)',
-                yaxis=dict(
-                    tickfont=dict(color='steelblue'),
-                    zeroline=False,
-                    showgrid=False
-                ),
-                legend=dict(x=0.5, xanchor='center', y=1.02, orientation="h"),
-                template='plotly_white'
-            )
+                fig1.update_layout(
+                    title_text='Effectiveness of Deal Owners: Sales & Closed Deals',
+                    xaxis_title='Deal Owner Name',
+                    yaxis_title='Closed Deals (Count)',
+                    yaxis=dict(
+                        tickfont=dict(color='steelblue'),
+                        zeroline=False,
+                        showgrid=False
+                    ),
+                    legend=dict(x=0.5, xanchor='center', y=1.02, orientation="h"),
+                    template='plotly_white'
+                )
             
-            fig1.update_yaxes(
-                title=dict(
-                    text='Total Sales Amount',
-                    font=dict(color='purple')
-                ),
-                tickfont=dict(color='purple'),
-                zeroline=False,
-                showgrid=False,
-                secondary_y=True
-            )
+                fig1.update_yaxes(
+                    title=dict(
+                        text='Total Sales Amount',
+                        font=dict(color='purple')
+                    ),
+                    tickfont=dict(color='purple'),
+                    zeroline=False,
+                    showgrid=False,
+                    secondary_y=True
+                )
+                return fig1
             
-            st.plotly_chart(fig1, use_container_width=True)
+            plotly_chart_cached("owner_sales", data_version, (), build_owner_sales_figure, use_container_width=True)
 
             
-            # График 2: Закрытые сделки и коэффициент конверсии
-            fig2 = make_subplots(specs=[[{"secondary_y": True}]])
+            def build_owner_conversion_figure():
+                # График 2: Закрытые сделки и коэффициент конверсии
+                fig2 = make_subplots(specs=[[{"secondary_y": True}]])
 
-            fig2.add_trace(
-                go.Bar(
-                    x=owners_with_sales.index,
-                    y=owners_with_sales['Closed Deals'],
-                    name='Closed Deals',
-                    marker_color='skyblue',
-                    text=owners_with_sales['Closed Deals'],
-                    textposition='inside'
-                ),
-                secondary_y=False,
-            )
+                fig2.add_trace(
+                    go.Bar(
+                        x=owners_with_sales.index,
+                        y=owners_with_sales['Closed Deals'],
+                        name='Closed Deals',
+                        marker_color='skyblue',
+                        text=owners_with_sales['Closed Deals'],
+                        textposition='inside'
+                    ),
+                    secondary_y=False,
+                )
             
-            fig2.add_trace(
-                go.Scatter(
-                    x=owners_with_sales.index,
-                    y=owners_with_sales['Conversion Rate (%)'],
-                    name='Conversion Rate',
-                    mode='lines+markers',
-                    line=dict(color='green', dash='dash'),
-                    marker=dict(size=7)
-                ),
-                secondary_y=True,
-            )
+                fig2.add_trace(
+                    go.Scatter(
+                        x=owners_with_sales.index,
+                        y=owners_with_sales['Conversion Rate (%)'],
+                        name='Conversion Rate',
+                        mode='lines+markers',
+                        line=dict(color='green', dash='dash'),
+                        marker=dict(size=7)
+                    ),
+                    secondary_y=True,
+                )
             
-            fig2.update_layout(
-                title_text='Effectiveness of Deal Owners: Conversion Rate & Closed Deals',
-                xaxis_title='Deal Owner Name',
-                yaxis_title='Closed Deals (Count)',
-                yaxis=dict(
-                    tickfont=dict(color='steelblue'),
-                    zeroline=False,
-                    showgrid=False
-                ),
-                legend=dict(x=0.5, xanchor='center', y=1.02, orientation="h"),
-                template='plotly_white'
-            )
+                fig2.update_layout(
+                    title_text='Effectiveness of Deal Owners: Conversion Rate & Closed Deals',
+                    xaxis_title='Deal Owner Name',
+                    yaxis_title='Closed Deals (Count)',
+                    yaxis=dict(
+                        tickfont=dict(color='steelblue'),
+                        zeroline=False,
+                        showgrid=False
+                    ),
+                    legend=dict(x=0.5, xanchor='center', y=1.02, orientation="h"),
+                    template='plotly_white'
+                )
             
-            fig2.update_yaxes(
-                title=dict(
-                    text='Conversion Rate (%)',
-                    font=dict(color='green')
-                ),
-                tickfont=dict(color='green'),
-                zeroline=False,
-                showgrid=False,
-                secondary_y=True
-            )
+                fig2.update_yaxes(
+                    title=dict(
+                        text='Conversion Rate (%)',
+                        font=dict(color='green')
+                    ),
+                    tickfont=dict(color='green'),
+                    zeroline=False,
+                    showgrid=False,
+                    secondary_y=True
+                )
+                return fig2
             
-            st.plotly_chart(fig2, use_container_width=True)
+            plotly_chart_cached("owner_conversion", data_version, (), build_owner_conversion_figure, use_container_width=True)
 
 
 
@@ -990,8 +1273,10 @@ def process_deals(data):
 
             st.subheader("Эффективность рекламных кампаний с точки зрения количества обработанных сделок, коэффициента конверсии и общей суммы продаж")
             # Анализ рекламных кампаний
-            campaign_total_deals = data['Campaign'].value_counts()
-            campaign_closed_won = data[data['Months of study'].notnull()]['Campaign'].value_counts()
+            successful_mask = data['Months of study'].notnull().values
+            campaign_index = get_category_index(data, 'Campaign')
+            campaign_total_deals = campaign_index.value_counts()
+            campaign_closed_won = campaign_index.value_counts(mask=successful_mask)
             campaign_conversion_rate = (campaign_closed_won / campaign_total_deals) * 100
             campaign_total_sales = data[data['Months of study'].notnull()].groupby('Campaign')['Initial Amount Paid'].sum()
             
@@ -1004,116 +1289,171 @@ def process_deals(data):
             
             campaigns_with_sales = campaign_result[campaign_result['Closed Deals (Payment Done)'] > 0]
             
-            # --- Первый график: Закрытые сделки и Total Sales Amount ---
-            fig1 = make_subplots(specs=[[{"secondary_y": True}]])
-            
-            fig1.add_trace(
-                go.Bar(
-                    x=campaigns_with_sales.index,
-                    y=campaigns_with_sales['Closed Deals (Payment Done)'],
-                    name='Closed Deals',
-                    marker_color='skyblue',
-                    text=campaigns_with_sales['Closed Deals (Payment Done)'],
-                    textposition='inside'
-                ),
-                secondary_y=False,
-            )
+            def build_campaign_sales_figure():
+                # --- Первый график: Закрытые сделки и Total Sales Amount ---
+                fig1 = make_subplots(specs=[[{"secondary_y": True}]])
+            
+                fig1.add_trace(
+                    go.Bar(
+                        x=campaigns_with_sales.index,
+                        y=campaigns_with_sales['Closed Deals (Payment Done)'],
+                        name='Closed Deals',
+                        marker_color='skyblue',
+                        text=campaigns_with_sales['Closed Deals (Payment Done)'],
+                        textposition='inside'
+                    ),
+                    secondary_y=False,
+                )
             
-            fig1.add_trace(
-                go.Scatter(
-                    x=campaigns_with_sales.index,
-                    y=campaigns_with_sales['Total Sales Amount'],
-                    name='Total Sales Amount',
-                    mode='lines+markers',
-                    line=dict(color='purple'),
-                    marker=dict(size=7)
-                ),
-                secondary_y=True,
-            )
+                fig1.add_trace(
+                    go.Scatter(
+                        x=campaigns_with_sales.index,
+                        y=campaigns_with_sales['Total Sales Amount'],
+                        name='Total Sales Amount',
+                        mode='lines+markers',
+                        line=dict(color='purple'),
+                        marker=dict(size=7)
+                    ),
+                    secondary_y=True,
+                )
             
-            fig1.update_layout(
-                title_text='Effectiveness of Campaigns: Sales & Closed Deals',
-                height=500,
-                xaxis_title='Campaign',
-                xaxis=dict(tickangle=45),
-                yaxis_title='Closed Deals (Count)',
-                yaxis=dict(
-                    tickfont=dict(color='steelblue'),
-                    zeroline=False,
-                    showgrid=False
-                ),
-                legend=dict(x=0.5, xanchor='center', y=1.02, orientation="h"),
-                template='plotly_white'
-            )
+                fig1.update_layout(
+                    title_text='Effectiveness of Campaigns: Sales & Closed Deals',
+                    height=500,
+                    xaxis_title='Campaign',
+                    xaxis=dict(tickangle=45),
+                    yaxis_title='Closed Deals (Count)',
+                    yaxis=dict(
+                        tickfont=dict(color='steelblue'),
+                        zeroline=False,
+                        showgrid=False
+                    ),
+                    legend=dict(x=0.5, xanchor='center', y=1.02, orientation="h"),
+                    template='plotly_white'
+                )
             
-            fig1.update_yaxes(
-                title=dict(
-                    text='Total Sales Amount',
-                    font=dict(color='purple')
-                ),
-                tickfont=dict(color='purple'),
-                zeroline=False,
-                showgrid=False,
-                secondary_y=True
-            )
+                fig1.update_yaxes(
+                    title=dict(
+                        text='Total Sales Amount',
+                        font=dict(color='purple')
+                    ),
+                    tickfont=dict(color='purple'),
+                    zeroline=False,
+                    showgrid=False,
+                    secondary_y=True
+                )
+                return fig1
 
             
-            # --- Второй график: Закрытые сделки и Conversion Rate ---
-            fig2 = make_subplots(specs=[[{"secondary_y": True}]])
+            def build_campaign_closed_conversion_figure():
+                # --- Второй график: Закрытые сделки и Conversion Rate ---
+                fig2 = make_subplots(specs=[[{"secondary_y": True}]])
 
-            fig2.add_trace(
-                go.Bar(
-                    x=campaigns_with_sales.index,
-                    y=campaigns_with_sales['Closed Deals (Payment Done)'],
-                    name='Closed Deals',
-                    marker_color='skyblue',
-                    text=campaigns_with_sales['Closed Deals (Payment Done)'],
-                    textposition='inside'
-                ),
-                secondary_y=False,
-            )
+                fig2.add_trace(
+                    go.Bar(
+                        x=campaigns_with_sales.index,
+                        y=campaigns_with_sales['Closed Deals (Payment Done)'],
+                        name='Closed Deals',
+                        marker_color='skyblue',
+                        text=campaigns_with_sales['Closed Deals (Payment Done)'],
+                        textposition='inside'
+                    ),
+                    secondary_y=False,
+                )
             
-            fig2.add_trace(
-                go.Scatter(
-                    x=campaigns_with_sales.index,
-                    y=campaigns_with_sales['Conversion Rate (%)'],
-                    name='Conversion Rate',
-                    mode='lines+markers',
-                    line=dict(color='green'),
-                    marker=dict(size=7)
-                ),
-                secondary_y=True,
-            )
+                fig2.add_trace(
+                    go.Scatter(
+                        x=campaigns_with_sales.index,
+                        y=campaigns_with_sales['Conversion Rate (%)'],
+                        name='Conversion Rate',
+                        mode='lines+markers',
+                        line=dict(color='green'),
+                        marker=dict(size=7)
+                    ),
+                    secondary_y=True,
+                )
             
-            fig2.update_layout(
-                title_text='Effectiveness of Campaigns: Conversion Rate & Closed Deals',
-                height=500,
-                xaxis_title='Campaign',
-                xaxis=dict(tickangle=45),
-                yaxis_title='Closed Deals (Count)',
-                yaxis=dict(
-                    tickfont=dict(color='steelblue'),
-                    zeroline=False,
-                    showgrid=False
-                ),
-                legend=dict(x=0.5, xanchor='center', y=1.02, orientation="h"),
-                template='plotly_white'
-            )
+                fig2.update_layout(
+                    title_text='Effectiveness of Campaigns: Conversion Rate & Closed Deals',
+                    height=500,
+                    xaxis_title='Campaign',
+                    xaxis=dict(tickangle=45),
+                    yaxis_title='Closed Deals (Count)',
+                    yaxis=dict(
+                        tickfont=dict(color='steelblue'),
+                        zeroline=False,
+                        showgrid=False
+                    ),
+                    legend=dict(x=0.5, xanchor='center', y=1.02, orientation="h"),
+                    template='plotly_white'
+                )
             
-            fig2.update_yaxes(
-                title=dict(
-                    text='Conversion Rate (%)',
-                    font=dict(color='green')
-                ),
-                tickfont=dict(color='green'),
-                zeroline=False,
-                showgrid=False,
-                secondary_y=True
-            )
+                fig2.update_yaxes(
+                    title=dict(
+                        text='Conversion Rate (%)',
+                        font=dict(color='green')
+                    ),
+                    tickfont=dict(color='green'),
+                    zeroline=False,
+                    showgrid=False,
+                    secondary_y=True
+                )
+                return fig2
 
     
-            st.plotly_chart(fig1, use_container_width=True)
-            st.plotly_chart(fig2, use_container_width=True)
+            plotly_chart_cached("campaign_sales", data_version, (), build_campaign_sales_figure, use_container_width=True)
+            plotly_chart_cached("campaign_closed_conversion", data_version, (), build_campaign_closed_conversion_figure, use_container_width=True)
+
+        # Вкладка 3:
+        with tab3:
+            st.subheader("Звонковая активность владельцев и результаты их сделок")
+
+            # Загрузка данных о звонках; агрегаты по владельцам считаются один раз на версию звонков
+            calls_data = read_linked("calls")
+            if calls_data is None:
+                st.info("Файл звонков demo_data/Cleaned_Calls.csv не найден: звонковая активность недоступна.")
+            else:
+                calls_data = apply_linked_filters("calls", calls_data, filters, period_start, period_end)
+
+                productivity = owner_productivity(data, calls_data)
+                st.dataframe(productivity.style.format({
+                    "Total Duration (min)": "{:.0f}",
+                    "Avg Duration (sec)": "{:.1f}",
+                    "Scheduled in CRM (%)": "{:.1f}",
+                    "Sales": "{:.2f}",
+                    "Conversion Rate (%)": "{:.2f}",
+                    "Calls per Closed Deal": "{:.2f}"
+                }))
+
+                def build_owner_activity_figure():
+                    fig_activity = go.Figure(
+                        go.Scatter(
+                            x=productivity["Calls"],
+                            y=productivity["Conversion Rate (%)"],
+                            mode="markers+text",
+                            text=productivity.index,
+                            textposition="top center",
+                            marker=dict(
+                                size=productivity["Sales"],
+                                sizemode="area",
+                                sizeref=2.0 * max(productivity["Sales"].max(), 1) / (40 ** 2),
+                                sizemin=4,
+                                color=productivity["Avg Duration (sec)"],
+                                colorscale="Viridis",
+                                showscale=True,
+                                colorbar=dict(title="Средняя длит. (сек)")
+                            )
+                        )
+                    )
+                    fig_activity.update_layout(
+                        title="Количество звонков и конверсия по владельцам (размер — сумма продаж)",
+                        xaxis=dict(title="Количество звонков"),
+                        yaxis=dict(title="Коэффициент конверсии (%)"),
+                        plot_bgcolor="white"
+                    )
+                    return fig_activity
+
+                plotly_chart_cached("owner_call_activity", data_version, (get_data_version(calls_data),), build_owner_activity_figure, use_container_width=True)
 
 
 
@@ -1121,6 +1461,9 @@ def process_deals(data):
 
     elif tab_selected == "💰 Анализ платежей и продуктов":
         st.subheader("💰 Анализ платежей и продуктов")
+
+        # Агрегаты вкладок независимы и считаются параллельно (результат кэшируется)
+        aggregates = section_aggregates(data, SECTION_GROUPS["payments"])
         
         # Создание вкладок
         tab1, tab2, tab3 = st.tabs(["Payment Types", 
@@ -1131,188 +1474,178 @@ def process_deals(data):
         with tab1:
         
             st.subheader("Распределение типов оплаты и их влияние на успешность сделок")
-            # Копируем DataFrame deals во временный df
-            df = data.copy()
-            
-            # Категоризация успешности сделок
-            df['is_successful'] = (df['Months of study'].notnull()).astype(int)
-            
-            # --- Детализация успешных сделок ---
-            detailed_summary = df.groupby('Payment Type').agg(
-                total_deals=('is_successful', 'size'),
-                successful_deals=('is_successful', 'sum'),
-                avg_initial_payment=('Initial Amount Paid', 'mean'),
-                avg_offer_amount=('Offer Total Amount', 'mean'),
-                avg_study_months=('Months of study', 'mean')
-            ).round(2)
-            
-            # Добавляем коэффициент конверсии
-            detailed_summary['conversion_rate'] = (detailed_summary['successful_deals'] / detailed_summary['total_deals']).round(2)
-
-            # --- Визуализация детализации ---
-            detailed_fig = make_subplots(specs=[[{"secondary_y": True}]])
-            # --- Таблица для отображения ---
-            table_fig2 = go.Figure(data=[
-                go.Table(
-                    header=dict(
-                        values=['Payment Type', 'Total Deals', 'Successful Deals', 'Conversion Rate',
-                                'Average Initial Amount Paid', 'Average Offer Total Amount', 'Average Months of study'],
-                        fill_color='lightgrey',
-                        align='center'
-                    ),
-                    cells=dict(
-                        values=[detailed_summary.index, detailed_summary['total_deals'], detailed_summary['successful_deals'],
-                                detailed_summary['conversion_rate'], detailed_summary['avg_initial_payment'], 
-                                detailed_summary['avg_offer_amount'], detailed_summary['avg_study_months']],
-                        fill_color='white',
-                        align='center',
-                        height=30,  # Добавляем высоту ячейки
+
+            # --- Детализация успешных сделок (с коэффициентом конверсии) ---
+            detailed_summary = aggregates["payment_summary"]
+
+            def build_payment_table_figure():
+                # --- Таблица для отображения ---
+                table_fig2 = go.Figure(data=[
+                    go.Table(
+                        header=dict(
+                            values=['Payment Type', 'Total Deals', 'Successful Deals', 'Conversion Rate',
+                                    'Average Initial Amount Paid', 'Average Offer Total Amount', 'Average Months of study'],
+                            fill_color='lightgrey',
+                            align='center'
+                        ),
+                        cells=dict(
+                            values=[detailed_summary.index, detailed_summary['total_deals'], detailed_summary['successful_deals'],
+                                    detailed_summary['conversion_rate'], detailed_summary['avg_initial_payment'], 
+                                    detailed_summary['avg_offer_amount'], detailed_summary['avg_study_months']],
+                            fill_color='white',
+                            align='center',
+                            height=30,  # Добавляем высоту ячейки
+                        )
                     )
-                )
-            ])
+                ])
 
-            table_fig2.update_layout(
-                height=200,  # Общая высота таблицы
-                margin=dict(l=5, r=5, t=5, b=5)
-            )
-            st.plotly_chart(table_fig2, use_container_width=True)
-            
+                table_fig2.update_layout(
+                    height=200,  # Общая высота таблицы
+                    margin=dict(l=5, r=5, t=5, b=5)
+                )
+                return table_fig2
+            plotly_chart_cached("payment_table", data_version, (), build_payment_table_figure, use_container_width=True)
             
             
-            # --- Гистограмма успешных сделок ---
-            bar_fig = px.bar(
-                detailed_summary.reset_index(),
-                x='Payment Type',
-                y='successful_deals',
-                title='Successful Deals by Payment Type',
-                labels={'successful_deals': 'Successful Deals', 'Payment Type': 'Payment Type'},
-                text='successful_deals'
-            )
-            bar_fig.update_traces(texttemplate='%{text}', textposition='outside', marker_color=px.colors.qualitative.Plotly)
-            bar_fig.update_layout(
-                yaxis=dict(title='Successful Deals'),
-                xaxis=dict(title='Payment Type')
-            )
             
-            # --- Гистограмма коэффициентов конверсии ---
-            bar_fig2 = px.bar(
-                detailed_summary.reset_index(),
-                x='Payment Type',
-                y='conversion_rate',
-                title='Conversion Rate by Payment Type',
-                labels={'conversion_rate': 'Conversion Rate', 'Payment Type': 'Payment Type'},
-                text='conversion_rate',
-            )
-            bar_fig2.update_traces(texttemplate='%{text:.2f}', textposition='outside', marker_color=px.colors.qualitative.Plotly)
-            bar_fig2.update_layout(
-                yaxis=dict(title='Conversion Rate', range=[0, 1]),
-                xaxis=dict(title='Payment Type')
-            )
+            def build_payment_success_figure():
+                # --- Гистограмма успешных сделок ---
+                bar_fig = px.bar(
+                    detailed_summary.reset_index(),
+                    x='Payment Type',
+                    y='successful_deals',
+                    title='Successful Deals by Payment Type',
+                    labels={'successful_deals': 'Successful Deals', 'Payment Type': 'Payment Type'},
+                    text='successful_deals'
+                )
+                bar_fig.update_traces(texttemplate='%{text}', textposition='outside', marker_color=px.colors.qualitative.Plotly)
+                bar_fig.update_layout(
+                    yaxis=dict(title='Successful Deals'),
+                    xaxis=dict(title='Payment Type')
+                )
+                return bar_fig
+            
+            def build_payment_conversion_figure():
+                # --- Гистограмма коэффициентов конверсии ---
+                bar_fig2 = px.bar(
+                    detailed_summary.reset_index(),
+                    x='Payment Type',
+                    y='conversion_rate',
+                    title='Conversion Rate by Payment Type',
+                    labels={'conversion_rate': 'Conversion Rate', 'Payment Type': 'Payment Type'},
+                    text='conversion_rate',
+                )
+                bar_fig2.update_traces(texttemplate='%{text:.2f}', textposition='outside', marker_color=px.colors.qualitative.Plotly)
+                bar_fig2.update_layout(
+                    yaxis=dict(title='Conversion Rate', range=[0, 1]),
+                    xaxis=dict(title='Payment Type')
+                )
+                return bar_fig2
 
 
             
             col1, col2 = st.columns([1, 1])
             with col1:
-                st.plotly_chart(bar_fig, use_container_width=True)
+                plotly_chart_cached("payment_success", data_version, (), build_payment_success_figure, use_container_width=True)
             with col2:
-                st.plotly_chart(bar_fig2, use_container_width=True)
+                plotly_chart_cached("payment_conversion", data_version, (), build_payment_conversion_figure, use_container_width=True)
                 
     
             # --- Анализ времени до закрытия сделки ---
-            df['creation_to_closing_days'] = (pd.to_datetime(df['Closing Date']) - pd.to_datetime(df['Created Time'])).dt.days
-            time_analysis = df.groupby('Payment Type').agg(
-                avg_days_to_close=('creation_to_closing_days', 'mean'),
-                median_days_to_close=('creation_to_closing_days', 'median')
-            ).round(2)
-            
-            # --- Визуализация времени до закрытия ---
-            time_fig = go.Figure()
-            time_fig.add_trace(go.Bar(
-                x=time_analysis.index,
-                y=time_analysis['avg_days_to_close'],
-                name='Average Days to Close',
-                marker_color='orange',
-                text=time_analysis['avg_days_to_close'],
-            ))
-            time_fig.add_trace(go.Bar(
-                x=time_analysis.index,
-                y=time_analysis['median_days_to_close'],
-                name='Median Days to Close',
-                marker_color='blue',
-                text=time_analysis['median_days_to_close'],
-            ))
-            time_fig.update_layout(
-                barmode='group',
-                title='Average and Median Days to Close Deals by Payment Type',
-                xaxis=dict(title='Payment Type'),
-                yaxis=dict(title='Days'),
-                legend=dict(x=0.2, xanchor='center', y=1),
-            )
+            time_analysis = aggregates["payment_time"]
+            
+            def build_payment_time_figure():
+                # --- Визуализация времени до закрытия ---
+                time_fig = go.Figure()
+                time_fig.add_trace(go.Bar(
+                    x=time_analysis.index,
+                    y=time_analysis['avg_days_to_close'],
+                    name='Average Days to Close',
+                    marker_color='orange',
+                    text=time_analysis['avg_days_to_close'],
+                ))
+                time_fig.add_trace(go.Bar(
+                    x=time_analysis.index,
+                    y=time_analysis['median_days_to_close'],
+                    name='Median Days to Close',
+                    marker_color='blue',
+                    text=time_analysis['median_days_to_close'],
+                ))
+                time_fig.update_layout(
+                    barmode='group',
+                    title='Average and Median Days to Close Deals by Payment Type',
+                    xaxis=dict(title='Payment Type'),
+                    yaxis=dict(title='Days'),
+                    legend=dict(x=0.2, xanchor='center', y=1),
+                )
+                return time_fig
     
-            st.plotly_chart(time_fig, use_container_width=True)
+            plotly_chart_cached("payment_time_to_close", data_version, (), build_payment_time_figure, use_container_width=True)
     
     
             
-            # Средние платежи
-            # Создаём фигуру
-            detailed_fig = make_subplots(specs=[[{"secondary_y": True}]])
+            def build_payment_detailed_figure():
+                # Средние платежи
+                # Создаём фигуру
+                detailed_fig = make_subplots(specs=[[{"secondary_y": True}]])
+            
+                # Средние платежи
+                detailed_fig.add_trace(
+                    go.Bar(
+                        x=detailed_summary.index,
+                        y=detailed_summary['avg_initial_payment'],
+                        name='Avg Initial Payment',
+                        marker_color='blue',
+                        text=detailed_summary['avg_initial_payment'],
+                        textposition='inside',
+                        opacity=0.6
+                    ),
+                    secondary_y=False
+                )
             
-            # Средние платежи
-            detailed_fig.add_trace(
-                go.Bar(
-                    x=detailed_summary.index,
-                    y=detailed_summary['avg_initial_payment'],
-                    name='Avg Initial Payment',
-                    marker_color='blue',
-                    text=detailed_summary['avg_initial_payment'],
-                    textposition='inside',
-                    opacity=0.6
-                ),
-                secondary_y=False
-            )
+                # Средняя длительность обучения
+                detailed_fig.add_trace(
+                    go.Scatter(
+                        x=detailed_summary.index,
+                        y=detailed_summary['avg_study_months'],
+                        name='Avg Study Months',
+                        mode='lines+markers+text',
+                        line=dict(color='orange', width=2),
+                        text=detailed_summary['avg_study_months'],
+                        textposition='top center'
+                    ),
+                    secondary_y=True
+                )
             
-            # Средняя длительность обучения
-            detailed_fig.add_trace(
-                go.Scatter(
-                    x=detailed_summary.index,
-                    y=detailed_summary['avg_study_months'],
-                    name='Avg Study Months',
-                    mode='lines+markers+text',
-                    line=dict(color='orange', width=2),
-                    text=detailed_summary['avg_study_months'],
-                    textposition='top center'
-                ),
-                secondary_y=True
-            )
+                # Обновление макета
+                detailed_fig.update_layout(
+                    title_text='Initial Payment and Study Months by Payment Type',
+                    xaxis_title='Payment Type',
+                    yaxis_title='Initial Payment',
+                    yaxis=dict(
+                        tickfont=dict(color='royalblue'),
+                        zeroline=False,
+                        showgrid=False
+                    ),
+                    legend=dict(x=0.8, xanchor='center', y=1),
+                    template='plotly_white'
+                )
             
-            # Обновление макета
-            detailed_fig.update_layout(
-                title_text='Initial Payment and Study Months by Payment Type',
-                xaxis_title='Payment Type',
-                yaxis_title='Initial Payment',
-                yaxis=dict(
-                    tickfont=dict(color='royalblue'),
+                # Вторая ось
+                detailed_fig.update_yaxes(
+                    title=dict(
+                        text='Months of Study',
+                        font=dict(color='orange')
+                    ),
+                    tickfont=dict(color='orange'),
                     zeroline=False,
-                    showgrid=False
-                ),
-                legend=dict(x=0.8, xanchor='center', y=1),
-                template='plotly_white'
-            )
-            
-            # Вторая ось
-            detailed_fig.update_yaxes(
-                title=dict(
-                    text='Months of Study',
-                    font=dict(color='orange')
-                ),
-                tickfont=dict(color='orange'),
-                zeroline=False,
-                showgrid=False,
-                secondary_y=True
-            )
+                    showgrid=False,
+                    secondary_y=True
+                )
+                return detailed_fig
             
             # Показываем график
-            st.plotly_chart(detailed_fig, use_container_width=True)
+            plotly_chart_cached("payment_detailed", data_version, (), build_payment_detailed_figure, use_container_width=True)
 
             
 
@@ -1322,260 +1655,254 @@ def process_deals(data):
         with tab2:
             st.subheader("Анализ популярности и успешности различных продуктов")
         
-            # Категоризация успешности сделок
-            df['is_successful'] = (df['Months of study'].notnull()).astype(int)
-            
             # Успешность по продуктам
-            product_success = df.groupby('Product').agg(
-                total_deals=('is_successful', 'size'),
-                successful_deals=('is_successful', 'sum')
-            )
-            product_success['conversion_rate'] = (product_success['successful_deals'] / product_success['total_deals']).round(2)
-            product_success = product_success.sort_values(by='total_deals', ascending=False).reset_index()
-            
-            # Таблица 1: Успешность по продуктам
-            product_table = go.Figure(data=[go.Table(
-                header=dict(
-                    values=['<b>Product</b>', '<b>Total Deals</b>', '<b>Successful Deals</b>', '<b>Conversion Rate</b>'],
-                    fill_color='lightgrey',
-                    align='left',
-                    height=30  # Высота заголовка
-                ),
-                cells=dict(
-                    values=[
-                        product_success['Product'],
-                        product_success['total_deals'],
-                        product_success['successful_deals'],
-                        product_success['conversion_rate']
-                    ],
-                    fill_color='white',
-                    align='left',
-                    height=25  # Высота строк
-                )
-            )])
-            product_table.update_layout(
-                height=200,  # Общая высота таблицы
-                margin=dict(l=5, r=5, t=5, b=5)
-            )
-            st.plotly_chart(product_table, use_container_width=True)
+            product_success = aggregates["product_success"]
+            
+            def build_product_table_figure():
+                # Таблица 1: Успешность по продуктам
+                product_table = go.Figure(data=[go.Table(
+                    header=dict(
+                        values=['<b>Product</b>', '<b>Total Deals</b>', '<b>Successful Deals</b>', '<b>Conversion Rate</b>'],
+                        fill_color='lightgrey',
+                        align='left',
+                        height=30  # Высота заголовка
+                    ),
+                    cells=dict(
+                        values=[
+                            product_success['Product'],
+                            product_success['total_deals'],
+                            product_success['successful_deals'],
+                            product_success['conversion_rate']
+                        ],
+                        fill_color='white',
+                        align='left',
+                        height=25  # Высота строк
+                    )
+                )])
+                product_table.update_layout(
+                    height=200,  # Общая высота таблицы
+                    margin=dict(l=5, r=5, t=5, b=5)
+                )
+                return product_table
+            plotly_chart_cached("product_table", data_version, (), build_product_table_figure, use_container_width=True)
 
             # Данные для топ-10 популярных продуктов
             product_popularity = product_success[['Product', 'total_deals']].sort_values(
                 by='total_deals', ascending=False
             )
             
-            # График 1: Топ-10 популярных продуктов
-            popularity_fig = go.Figure(data=[
-                go.Bar(
-                    x=product_popularity['Product'],
-                    y=product_popularity['total_deals'],
-                    marker=dict(color='skyblue'),
-                    text=product_popularity['total_deals'],
-                    textposition="inside"
-                )
-            ])
-            popularity_fig.update_layout(
-                title='Top Most Popular Products',
-                xaxis=dict(title='Product', tickangle=45),
-                yaxis=dict(title='Number of Deals'),
-                # margin=dict(l=10, r=10, t=40, b=10),
-                height=400
-            )
+            def build_product_popularity_figure():
+                # График 1: Топ-10 популярных продуктов
+                popularity_fig = go.Figure(data=[
+                    go.Bar(
+                        x=product_popularity['Product'],
+                        y=product_popularity['total_deals'],
+                        marker=dict(color='skyblue'),
+                        text=product_popularity['total_deals'],
+                        textposition="inside"
+                    )
+                ])
+                popularity_fig.update_layout(
+                    title='Top Most Popular Products',
+                    xaxis=dict(title='Product', tickangle=45),
+                    yaxis=dict(title='Number of Deals'),
+                    # margin=dict(l=10, r=10, t=40, b=10),
+                    height=400
+                )
+                return popularity_fig
             
             # Данные для топ-10 продуктов по конверсии
             top_conversion = product_success.sort_values(by='conversion_rate', ascending=False)
             
-            # График 2: Топ-10 продуктов по конверсии
-            conversion_fig = go.Figure(data=[
-                go.Bar(
-                    x=top_conversion['Product'],
-                    y=top_conversion['conversion_rate'],
-                    marker=dict(color='orange'),
-                    text=top_conversion['conversion_rate'],
-                    textposition="inside"
-                )
-            ])
-            conversion_fig.update_layout(
-                title='Top Products by Conversion Rate',
-                xaxis=dict(title='Product', tickangle=45),
-                yaxis=dict(title='Conversion Rate'),
-                # margin=dict(l=10, r=10, t=40, b=10),
-                height=400
-            )
+            def build_product_conversion_figure():
+                # График 2: Топ-10 продуктов по конверсии
+                conversion_fig = go.Figure(data=[
+                    go.Bar(
+                        x=top_conversion['Product'],
+                        y=top_conversion['conversion_rate'],
+                        marker=dict(color='orange'),
+                        text=top_conversion['conversion_rate'],
+                        textposition="inside"
+                    )
+                ])
+                conversion_fig.update_layout(
+                    title='Top Products by Conversion Rate',
+                    xaxis=dict(title='Product', tickangle=45),
+                    yaxis=dict(title='Conversion Rate'),
+                    # margin=dict(l=10, r=10, t=40, b=10),
+                    height=400
+                )
+                return conversion_fig
             
           
             col1, col2 = st.columns(2)
             with col1:
-                st.plotly_chart(popularity_fig, use_container_width=True)
+                plotly_chart_cached("product_popularity", data_version, (), build_product_popularity_figure, use_container_width=True)
             with col2:
-                st.plotly_chart(conversion_fig, use_container_width=True)
+                plotly_chart_cached("product_conversion", data_version, (), build_product_conversion_figure, use_container_width=True)
 
         with tab3:
             st.subheader("Анализ популярности и успешности типов обучения")
 
             # Успешность по типам обучения
-            education_type_success = df.groupby('Education Type').agg(
-                total_deals=('is_successful', 'size'),
-                successful_deals=('is_successful', 'sum')
-            )
-            education_type_success['conversion_rate'] = (education_type_success['successful_deals'] / education_type_success['total_deals']).round(2)
-            education_type_success = education_type_success.sort_values(by='total_deals', ascending=False).reset_index()
-            
-            # Таблица 2: Успешность по типам обучения
-            education_type_table = go.Figure(data=[go.Table(
-                header=dict(
-                    values=['<b>Education Type</b>', '<b>Total Deals</b>', '<b>Successful Deals</b>', '<b>Conversion Rate</b>'],
-                    fill_color='lightgrey',
-                    align='left',
-                    height=30
-                ),
-                cells=dict(
-                    values=[
-                        education_type_success['Education Type'],
-                        education_type_success['total_deals'],
-                        education_type_success['successful_deals'],
-                        education_type_success['conversion_rate']
-                    ],
-                    fill_color='white',
-                    align='left',
-                    height=25
-                )
-            )])
-            education_type_table.update_layout(
-                height=100,  # Общая высота таблицы
-                margin=dict(l=5, r=5, t=5, b=5)
-            )
+            education_type_success = aggregates["education_success"]
+            
+            def build_education_table_figure():
+                # Таблица 2: Успешность по типам обучения
+                education_type_table = go.Figure(data=[go.Table(
+                    header=dict(
+                        values=['<b>Education Type</b>', '<b>Total Deals</b>', '<b>Successful Deals</b>', '<b>Conversion Rate</b>'],
+                        fill_color='lightgrey',
+                        align='left',
+                        height=30
+                    ),
+                    cells=dict(
+                        values=[
+                            education_type_success['Education Type'],
+                            education_type_success['total_deals'],
+                            education_type_success['successful_deals'],
+                            education_type_success['conversion_rate']
+                        ],
+                        fill_color='white',
+                        align='left',
+                        height=25
+                    )
+                )])
+                education_type_table.update_layout(
+                    height=100,  # Общая высота таблицы
+                    margin=dict(l=5, r=5, t=5, b=5)
+                )
+                return education_type_table
             
-            st.plotly_chart(education_type_table, use_container_width=True)
+            plotly_chart_cached("education_table", data_version, (), build_education_table_figure, use_container_width=True)
 
             # Данные для топ-10 популярных типов обучения
             education_type_popularity = education_type_success[['Education Type', 'total_deals']].sort_values(
                 by='total_deals', ascending=False
             ).head(10)
             
-            # График 1: Топ-10 популярных типов обучения
-            education_popularity_fig = go.Figure(data=[
-                go.Bar(
-                    x=education_type_popularity['Education Type'],
-                    y=education_type_popularity['total_deals'],
-                    marker=dict(color='lightgreen'),
-                    text=education_type_popularity['total_deals'],
-                    textposition="inside"
-                )
-            ])
-            education_popularity_fig.update_layout(
-                title='Top 10 Most Popular Education Types',
-                xaxis=dict(title='Education Type'),
-                yaxis=dict(title='Number of Deals'),
-                # margin=dict(l=10, r=10, t=40, b=10),
-                height=400
-            )
+            def build_education_popularity_figure():
+                # График 1: Топ-10 популярных типов обучения
+                education_popularity_fig = go.Figure(data=[
+                    go.Bar(
+                        x=education_type_popularity['Education Type'],
+                        y=education_type_popularity['total_deals'],
+                        marker=dict(color='lightgreen'),
+                        text=education_type_popularity['total_deals'],
+                        textposition="inside"
+                    )
+                ])
+                education_popularity_fig.update_layout(
+                    title='Top 10 Most Popular Education Types',
+                    xaxis=dict(title='Education Type'),
+                    yaxis=dict(title='Number of Deals'),
+                    # margin=dict(l=10, r=10, t=40, b=10),
+                    height=400
+                )
+                return education_popularity_fig
             
             # Данные для топ-10 типов обучения по конверсии
             top_education_conversion = education_type_success.sort_values(by='conversion_rate', ascending=False).head(10)
             
-            # График 2: Топ-10 типов обучения по конверсии
-            education_conversion_fig = go.Figure(data=[
-                go.Bar(
-                    x=top_education_conversion['Education Type'],
-                    y=top_education_conversion['conversion_rate'],
-                    marker=dict(color='purple'),
-                    text=top_education_conversion['conversion_rate'],
-                    textposition="inside"
-                )
-            ])
-            education_conversion_fig.update_layout(
-                title='Top 10 Education Types by Conversion Rate',
-                xaxis=dict(title='Education Type'),
-                yaxis=dict(title='Conversion Rate'),
-                # margin=dict(l=10, r=10, t=40, b=10),
-                height=400
-            )
+            def build_education_conversion_figure():
+                # График 2: Топ-10 типов обучения по конверсии
+                education_conversion_fig = go.Figure(data=[
+                    go.Bar(
+                        x=top_education_conversion['Education Type'],
+                        y=top_education_conversion['conversion_rate'],
+                        marker=dict(color='purple'),
+                        text=top_education_conversion['conversion_rate'],
+                        textposition="inside"
+                    )
+                ])
+                education_conversion_fig.update_layout(
+                    title='Top 10 Education Types by Conversion Rate',
+                    xaxis=dict(title='Education Type'),
+                    yaxis=dict(title='Conversion Rate'),
+                    # margin=dict(l=10, r=10, t=40, b=10),
+                    height=400
+                )
+                return education_conversion_fig
             
             col1, col2 = st.columns(2)
             with col1:
-                st.plotly_chart(education_popularity_fig, use_container_width=True)
+                plotly_chart_cached("education_popularity", data_version, (), build_education_popularity_figure, use_container_width=True)
             with col2:
-                st.plotly_chart(education_conversion_fig, use_container_width=True)
+                plotly_chart_cached("education_conversion", data_version, (), build_education_conversion_figure, use_container_width=True)
 
-            product_education_analysis = df.groupby(['Product', 'Education Type']).agg(
-                total_deals=('is_successful', 'size'),
-                successful_deals=('is_successful', 'sum')
-            )
-            product_education_analysis["conversion_rate"] = (
-                product_education_analysis["successful_deals"]
-                / product_education_analysis["total_deals"]
-            ).round(2)
+            def build_product_education_heatmap():
+                product_education_analysis = aggregates["product_education"]
             
-            # Сброс индекса для удобного анализа
-            product_education_analysis = product_education_analysis.reset_index()
-            
-            
-            # Создание сводной таблицы для тепловой карты
-            pivot_table = product_education_analysis.pivot(
-                index='Product', 
-                columns='Education Type', 
-                values='conversion_rate'
-            )
             
-            # Вычисление яркости для определения цвета текста
-            def calculate_text_color(value, zmin, zmax):
-                normalized = (value - zmin) / (zmax - zmin)
-                return 'white' if normalized < 0.5 else 'black'
+                # Создание сводной таблицы для тепловой карты
+                pivot_table = product_education_analysis.pivot(
+                    index='Product', 
+                    columns='Education Type', 
+                    values='conversion_rate'
+                )
             
-            # Подготовка данных
-            z_values = pivot_table.values
-            x_labels = pivot_table.columns
-            y_labels = pivot_table.index
-            
-            # Минимальное и максимальное значение для нормализации
-            zmin, zmax = np.nanmin(z_values), np.nanmax(z_values)
-            
-            # Генерация аннотаций
-            annotations = []
-            for i, y_label in enumerate(y_labels):
-                for j, x_label in enumerate(x_labels):
-                    value = z_values[i][j]
-                    color = calculate_text_color(value, zmin, zmax)
-                    annotations.append(
-                        dict(
-                            x=x_label,
-                            y=y_label,
-                            text=str(round(value, 2)) if not np.isnan(value) else '',
-                            showarrow=False,
-                            font=dict(color=color, size=12),
+                # Вычисление яркости для определения цвета текста
+                def calculate_text_color(value, zmin, zmax):
+                    normalized = (value - zmin) / (zmax - zmin)
+                    return 'white' if normalized < 0.5 else 'black'
+            
+                # Подготовка данных
+                z_values = pivot_table.values
+                x_labels = pivot_table.columns
+                y_labels = pivot_table.index
+            
+                # Минимальное и максимальное значение для нормализации
+                zmin, zmax = np.nanmin(z_values), np.nanmax(z_values)
+            
+                # Генерация аннотаций
+                annotations = []
+                for i, y_label in enumerate(y_labels):
+                    for j, x_label in enumerate(x_labels):
+                        value = z_values[i][j]
+                        color = calculate_text_color(value, zmin, zmax)
+                        annotations.append(
+                            dict(
+                                x=x_label,
+                                y=y_label,
+                                text=str(round(value, 2)) if not np.isnan(value) else '',
+                                showarrow=False,
+                                font=dict(color=color, size=12),
+                            )
                         )
-                    )
             
-            # Построение тепловой карты
-            heatmap_fig = go.Figure(data=go.Heatmap(
-                z=z_values,
-                x=x_labels,
-                y=y_labels,
-                colorscale='Viridis',
-                colorbar=dict(title='Conversion Rate'),
-            ))
-            
-            # Добавление аннотаций
-            heatmap_fig.update_layout(annotations=annotations)
-            
-            # Настройка оформления
-            heatmap_fig.update_layout(
-                title='Conversion Rate by Product and Education Type',
-                xaxis=dict(title='Education Type'),
-                yaxis=dict(title='Product'),
-                # margin=dict(l=10, r=10, t=40, b=10),
-                height=500
-            )
+                # Построение тепловой карты
+                heatmap_fig = go.Figure(data=go.Heatmap(
+                    z=z_values,
+                    x=x_labels,
+                    y=y_labels,
+                    colorscale='Viridis',
+                    colorbar=dict(title='Conversion Rate'),
+                ))
+            
+                # Добавление аннотаций
+                heatmap_fig.update_layout(annotations=annotations)
+            
+                # Настройка оформления
+                heatmap_fig.update_layout(
+                    title='Conversion Rate by Product and Education Type',
+                    xaxis=dict(title='Education Type'),
+                    yaxis=dict(title='Product'),
+                    # margin=dict(l=10, r=10, t=40, b=10),
+                    height=500
+                )
+                return heatmap_fig
             
             # Отображение тепловой карты в Streamlit
             st.subheader("Анализ тепловой карты")
             
-            st.plotly_chart(heatmap_fig, use_container_width=True)            
+            plotly_chart_cached("product_education_heatmap", data_version, (), build_product_education_heatmap, use_container_width=True)
 
 
     elif tab_selected == "🌍 Географический анализ":
         st.subheader("🌍 Географический анализ")
+
+        # Агрегаты вкладок независимы и считаются параллельно (результат кэшируется)
+        aggregates = section_aggregates(data, SECTION_GROUPS["geography"])
         # Создание вкладок
         tab1, tab2 = st.tabs(["Cities & Countries", 
                               "Level of Deutsch"])
@@ -1584,78 +1911,70 @@ def process_deals(data):
         with tab1:
         
             st.subheader("Распределение сделок по городам")
- 
-            # Копируем DataFrame deals во временный df
-            df = data.copy()
-            
-            # Категоризация успешности сделок
-            df['is_successful'] = (df['Months of study'].notnull()).astype(int)
-            
+
             # Агрегация данных по городам
-            city_analysis = df.groupby('City').agg(
-                total_deals=('is_successful', 'size'),
-                successful_deals=('is_successful', 'sum')
-            )
-            city_analysis['conversion_rate'] = (city_analysis['successful_deals'] / city_analysis['total_deals']).round(2)
+            city_analysis = aggregates["city_success"]
             
             # Сортировка по количеству сделок для анализа топ-городов
             top_cities = city_analysis.sort_values(by='total_deals', ascending=False).head(10)
             
-            # Создание графика с двойной осью
-            fig_city = make_subplots(specs=[[{"secondary_y": True}]])
-            
-            # Гистограмма количества сделок (левая ось)
-            fig_city.add_trace(
-                go.Bar(
-                    x=top_cities.index,
-                    y=top_cities['total_deals'],
-                    name='Total Deals',
-                    marker_color='cornflowerblue',
-                    text=top_cities['total_deals'],
-                    textposition='outside',
-                ),
-                secondary_y=False
-            )
+            def build_city_figure():
+                # Создание графика с двойной осью
+                fig_city = make_subplots(specs=[[{"secondary_y": True}]])
+            
+                # Гистограмма количества сделок (левая ось)
+                fig_city.add_trace(
+                    go.Bar(
+                        x=top_cities.index,
+                        y=top_cities['total_deals'],
+                        name='Total Deals',
+                        marker_color='cornflowerblue',
+                        text=top_cities['total_deals'],
+                        textposition='outside',
+                    ),
+                    secondary_y=False
+                )
             
-            # Линейный график коэффициента конверсии (правая ось)
-            fig_city.add_trace(
-                go.Scatter(
-                    x=top_cities.index,
-                    y=top_cities['conversion_rate'],
-                    name='Conversion Rate',
-                    mode='lines+markers',
-                    line=dict(color='magenta', dash="dash"),
-                ),
-                secondary_y=True
-            )
+                # Линейный график коэффициента конверсии (правая ось)
+                fig_city.add_trace(
+                    go.Scatter(
+                        x=top_cities.index,
+                        y=top_cities['conversion_rate'],
+                        name='Conversion Rate',
+                        mode='lines+markers',
+                        line=dict(color='magenta', dash="dash"),
+                    ),
+                    secondary_y=True
+                )
             
-            fig_city.update_layout(
-                title_text='Top 10 Cities: Deals and Conversion Rates',
-                xaxis_title='City',
-                xaxis=dict(tickangle=45),
-                yaxis_title='Number of Deals',
-                yaxis=dict(
-                    tickfont=dict(color="steelblue"),
-                    zeroline=False,
-                    showgrid=False
-                ),
-                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
-                plot_bgcolor="white",
-                height=500
-            )
+                fig_city.update_layout(
+                    title_text='Top 10 Cities: Deals and Conversion Rates',
+                    xaxis_title='City',
+                    xaxis=dict(tickangle=45),
+                    yaxis_title='Number of Deals',
+                    yaxis=dict(
+                        tickfont=dict(color="steelblue"),
+                        zeroline=False,
+                        showgrid=False
+                    ),
+                    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+                    plot_bgcolor="white",
+                    height=500
+                )
             
-            fig_city.update_yaxes(
-                title=dict(
-                    text="Conversion Rate",
-                    font=dict(color="magenta")
-                ),
-                tickfont=dict(color="magenta"),
-                zeroline=False,
-                showgrid=False,
-                secondary_y=True
-            )
+                fig_city.update_yaxes(
+                    title=dict(
+                        text="Conversion Rate",
+                        font=dict(color="magenta")
+                    ),
+                    tickfont=dict(color="magenta"),
+                    zeroline=False,
+                    showgrid=False,
+                    secondary_y=True
+                )
+                return fig_city
             
-            st.plotly_chart(fig_city, use_container_width=True)
+            plotly_chart_cached("top_cities", data_version, (), build_city_figure, use_container_width=True)
 
 
 
@@ -1667,75 +1986,69 @@ def process_deals(data):
                 ("Да", "Нет")
             )
             
-            # Фильтрация данных на основе выбора
+            # Агрегация данных по странам; исключение Германии — это удаление её группы
+            country_analysis = aggregates["country_success"]
             if include_germany == "Нет":
-                df_filtered = df[df['Country'] != 'Germany']
-            else:
-                df_filtered = df
-            
-            # Агрегация данных по странам
-            country_analysis = df_filtered.groupby('Country').agg(
-                total_deals=('is_successful', 'size'),
-                successful_deals=('is_successful', 'sum')
-            )
-            country_analysis['conversion_rate'] = (country_analysis['successful_deals'] / country_analysis['total_deals']).round(2)
+                country_analysis = country_analysis.drop(index='Germany', errors='ignore')
             
             # Сортировка по количеству сделок для анализа топ-городов
             top_countries = country_analysis.sort_values(by='total_deals', ascending=False).head(10)
             
-            # Создание графика с двойной осью
-            fig_countries = make_subplots(specs=[[{"secondary_y": True}]])
-
-            fig_countries.add_trace(
-                go.Bar(
-                    x=top_countries.index,
-                    y=top_countries['total_deals'],
-                    name='Total Deals',
-                    marker_color='skyblue',
-                    text=top_countries['total_deals'],
-                    textposition='outside',
-                ),
-                secondary_y=False
-            )
+            def build_country_figure():
+                # Создание графика с двойной осью
+                fig_countries = make_subplots(specs=[[{"secondary_y": True}]])
+
+                fig_countries.add_trace(
+                    go.Bar(
+                        x=top_countries.index,
+                        y=top_countries['total_deals'],
+                        name='Total Deals',
+                        marker_color='skyblue',
+                        text=top_countries['total_deals'],
+                        textposition='outside',
+                    ),
+                    secondary_y=False
+                )
             
-            fig_countries.add_trace(
-                go.Scatter(
-                    x=top_countries.index,
-                    y=top_countries['conversion_rate'],
-                    name='Conversion Rate',
-                    mode='lines+markers',
-                    line=dict(color='green', dash="dash"),
-                ),
-                secondary_y=True
-            )
+                fig_countries.add_trace(
+                    go.Scatter(
+                        x=top_countries.index,
+                        y=top_countries['conversion_rate'],
+                        name='Conversion Rate',
+                        mode='lines+markers',
+                        line=dict(color='green', dash="dash"),
+                    ),
+                    secondary_y=True
+                )
             
-            fig_countries.update_layout(
-                title_text='Top 10 Countries: Deals and Conversion Rates',
-                xaxis_title='Country',
-                xaxis=dict(tickangle=45),
-                yaxis_title='Number of Deals',
-                yaxis=dict(
-                    tickfont=dict(color="steelblue"),
-                    zeroline=False,
-                    showgrid=False
-                ),
-                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
-                plot_bgcolor="white",
-                height=500
-            )
+                fig_countries.update_layout(
+                    title_text='Top 10 Countries: Deals and Conversion Rates',
+                    xaxis_title='Country',
+                    xaxis=dict(tickangle=45),
+                    yaxis_title='Number of Deals',
+                    yaxis=dict(
+                        tickfont=dict(color="steelblue"),
+                        zeroline=False,
+                        showgrid=False
+                    ),
+                    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+                    plot_bgcolor="white",
+                    height=500
+                )
             
-            fig_countries.update_yaxes(
-                title=dict(
-                    text="Conversion Rate",
-                    font=dict(color="green")
-                ),
-                tickfont=dict(color="green"),
-                zeroline=False,
-                showgrid=False,
-                secondary_y=True
-            )
+                fig_countries.update_yaxes(
+                    title=dict(
+                        text="Conversion Rate",
+                        font=dict(color="green")
+                    ),
+                    tickfont=dict(color="green"),
+                    zeroline=False,
+                    showgrid=False,
+                    secondary_y=True
+                )
+                return fig_countries
             
-            st.plotly_chart(fig_countries, use_container_width=True)
+            plotly_chart_cached("top_countries", data_version, (include_germany,), build_country_figure, use_container_width=True)
 
             
             # Заголовок для раздела
@@ -1754,21 +2067,9 @@ def process_deals(data):
         with tab2:
         
             st.subheader("Анализ влияние уровня знания немецкого языка на успешность сделок в разных городах")
- 
-            # Копируем DataFrame deals во временный df
-            df = data.copy()
 
-            # Категоризация успешности сделок
-            df['is_successful'] = (df['Months of study'].notnull()).astype(int)
-            
-            # Агрегация данных по уровню Level of Deutsch
-            level_analysis = df.groupby('Level of Deutsch').agg(
-                total_deals=('is_successful', 'size'),  # Общее количество сделок
-                successful_deals=('is_successful', 'sum')  # Количество успешных сделок
-            )
-            
-            # Расчет успешности
-            level_analysis['success_rate'] = (level_analysis['successful_deals'] / level_analysis['total_deals']).round(2)
+            # Агрегация данных по уровню Level of Deutsch (с долей успешных сделок)
+            level_analysis = aggregates["level_success"]
             
             # **Добавляем тоггл-кнопку для выбора сортировки**
             sort_by = st.radio(
@@ -1787,148 +2088,325 @@ def process_deals(data):
             total_deals = level_analysis_sorted['total_deals']
             
 
-            # Создание фигуры с двумя Y-осями
-            fig = make_subplots(specs=[[{"secondary_y": True}]])
-            
-            # Бар: Success Rate
-            fig.add_trace(
-                go.Bar(
-                    x=levels,
-                    y=success_rate,
-                    name='Success Rate',
-                    marker_color='royalblue',
-                    opacity=0.7,
-                    text=level_analysis['successful_deals'],
-                    textposition='inside'
-                ),
-                secondary_y=False
-            )
+            def build_deutsch_level_figure():
+                # Создание фигуры с двумя Y-осями
+                fig = make_subplots(specs=[[{"secondary_y": True}]])
+            
+                # Бар: Success Rate
+                fig.add_trace(
+                    go.Bar(
+                        x=levels,
+                        y=success_rate,
+                        name='Success Rate',
+                        marker_color='royalblue',
+                        opacity=0.7,
+                        text=level_analysis['successful_deals'],
+                        textposition='inside'
+                    ),
+                    secondary_y=False
+                )
             
-            # Линия: Total Deals
-            fig.add_trace(
-                go.Scatter(
-                    x=levels,
-                    y=total_deals,
-                    name='Total Deals',
-                    mode='lines+markers+text',
-                    line=dict(color='violet', width=2, dash='dot'),
-                    text=total_deals,
-                    textposition='top center'
-                ),
-                secondary_y=True
-            )
+                # Линия: Total Deals
+                fig.add_trace(
+                    go.Scatter(
+                        x=levels,
+                        y=total_deals,
+                        name='Total Deals',
+                        mode='lines+markers+text',
+                        line=dict(color='violet', width=2, dash='dot'),
+                        text=total_deals,
+                        textposition='top center'
+                    ),
+                    secondary_y=True
+                )
             
-            # Настройки оформления
-            fig.update_layout(
-                title_text='Успешность сделок и общее количество по уровням знания языка',
-                xaxis_title='Level of Deutsch',
-                yaxis_title='Success Rate',
-                yaxis=dict(
-                    range=[0, 1],
-                    tickfont=dict(color='royalblue'),
-                    showgrid=False
-                ),
-                legend=dict(
-                    x=0.5,
-                    y=1.05,
-                    xanchor='center',
-                    orientation="h"
-                ),
-                bargap=0.2,
-                plot_bgcolor='white',
-                hovermode='x unified'
-            )
+                # Настройки оформления
+                fig.update_layout(
+                    title_text='Успешность сделок и общее количество по уровням знания языка',
+                    xaxis_title='Level of Deutsch',
+                    yaxis_title='Success Rate',
+                    yaxis=dict(
+                        range=[0, 1],
+                        tickfont=dict(color='royalblue'),
+                        showgrid=False
+                    ),
+                    legend=dict(
+                        x=0.5,
+                        y=1.05,
+                        xanchor='center',
+                        orientation="h"
+                    ),
+                    bargap=0.2,
+                    plot_bgcolor='white',
+                    hovermode='x unified'
+                )
             
-            # Настройка правой оси
-            fig.update_yaxes(
-                title=dict(
-                    text='Total Deals',
-                    font=dict(color='violet')
-                ),
-                tickfont=dict(color='violet'),
-                showgrid=False,
-                zeroline=False,
-                secondary_y=True
-            )
+                # Настройка правой оси
+                fig.update_yaxes(
+                    title=dict(
+                        text='Total Deals',
+                        font=dict(color='violet')
+                    ),
+                    tickfont=dict(color='violet'),
+                    showgrid=False,
+                    zeroline=False,
+                    secondary_y=True
+                )
+                return fig
             
             # Отображение в Streamlit
-            st.plotly_chart(fig, use_container_width=True)
+            plotly_chart_cached("deutsch_levels", data_version, (sort_by,), build_deutsch_level_figure, use_container_width=True)
+
+
+
+            def build_deutsch_city_facets():
+                # Рассчитать среднюю успешность сделок по уровням и городам
+                city_level_success = aggregates["city_level_success"][['City', 'Level of Deutsch', 'is_successful']]
+            
+                # Отобрать топ-10 городов с наибольшей успешностью по каждому уровню
+                top_cities = city_level_success.groupby('Level of Deutsch').apply(
+                    lambda x: x.nlargest(10, 'is_successful')
+                ).reset_index(drop=True)
+
+                fig3 = px.bar(
+                    top_cities,
+                    x='is_successful',
+                    y='City',
+                    facet_col='Level of Deutsch',
+                    orientation='h',
+                    title="Успешность сделок в городах по уровням знания языка",
+                    color='City',  # Добавляем разделение цвета по городам
+                    color_discrete_sequence=px.colors.qualitative.Set2
+                    # color_discrete_sequence=px.px.colors.sequential.Viridis
+                    # color_discrete_sequence=px.colors.qualitative.Plotly
+                )
+
+                # Убираем "Level of Deutsch=" из заголовков фасетов
+                fig3.for_each_annotation(lambda a: a.update(text=a.text.split('=')[-1]))
 
+                # Убираем только названия осей X, оставляя значения
+                fig3.for_each_xaxis(lambda xaxis: xaxis.update(title_text=''))
 
 
-            # Рассчитать среднюю успешность сделок по уровням и городам
-            city_level_success = df.groupby(['City', 'Level of Deutsch'])['is_successful'].mean().reset_index()
+                # Добавляем аннотацию как глобальное название оси X
+                fig3.add_annotation(
+                    text="Success Rate",
+                    x=0.5, y=-0.11,  # Расположение относительно графика
+                    showarrow=False,
+                    xref="paper", yref="paper",  # Координаты в масштабе всего графика
+                    font=dict(size=14)
+                )
             
-            # Отобрать топ-10 городов с наибольшей успешностью по каждому уровню
-            top_cities = city_level_success.groupby('Level of Deutsch').apply(
-                lambda x: x.nlargest(10, 'is_successful')
-            ).reset_index(drop=True)
+                fig3.update_layout(
+                    title_x=0,
+                    height=800,
+                    plot_bgcolor="white",
+                    # showlegend=False
+                    # margin=dict(t=50, b=80)  # Увеличиваем отступ снизу для аннотации
+                )
+                return fig3
 
-            fig3 = px.bar(
-                top_cities,
-                x='is_successful',
-                y='City',
-                facet_col='Level of Deutsch',
-                orientation='h',
-                title="Успешность сделок в городах по уровням знания языка",
-                color='City',  # Добавляем разделение цвета по городам
-                color_discrete_sequence=px.colors.qualitative.Set2
-                # color_discrete_sequence=px.px.colors.sequential.Viridis
-                # color_discrete_sequence=px.colors.qualitative.Plotly
-            )
+            plotly_chart_cached("deutsch_city_facets", data_version, (), build_deutsch_city_facets, use_container_width=True)
 
-            # Убираем "Level of Deutsch=" из заголовков фасетов
-            fig3.for_each_annotation(lambda a: a.update(text=a.text.split('=')[-1]))
 
-            # Убираем только названия осей X, оставляя значения
-            fig3.for_each_xaxis(lambda xaxis: xaxis.update(title_text=''))
 
+            def build_deutsch_city_scatter():
+                city_level_success = aggregates["city_level_success"]
 
-            # Добавляем аннотацию как глобальное название оси X
-            fig3.add_annotation(
-                text="Success Rate",
-                x=0.5, y=-0.11,  # Расположение относительно графика
-                showarrow=False,
-                xref="paper", yref="paper",  # Координаты в масштабе всего графика
-                font=dict(size=14)
-            )
+                fig4 = px.scatter(
+                    city_level_success,
+                    x='is_successful',
+                    y='City',
+                    size='total_deals',  # Размер пузырька по количеству сделок
+                    color='Level of Deutsch',
+                    title="Успешность сделок в городах с учетом уровня языка",
+                    size_max=15,
+                    color_discrete_sequence=px.colors.qualitative.Set2
+                )
             
-            fig3.update_layout(
-                title_x=0,
-                height=800,
-                plot_bgcolor="white",
-                # showlegend=False
-                # margin=dict(t=50, b=80)  # Увеличиваем отступ снизу для аннотации
-            )
+                fig4.update_layout(
+                    xaxis_title="Success Rate",
+                    yaxis_title="City",
+                    plot_bgcolor="white"
+                )
+                return fig4
 
-            st.plotly_chart(fig3, use_container_width=True)
+            plotly_chart_cached("deutsch_city_scatter", data_version, (), build_deutsch_city_scatter, use_container_width=True)
 
 
 
-            city_level_success = df.groupby(['City', 'Level of Deutsch']).agg(
-                is_successful=('is_successful', 'mean'),
-                total_deals=('is_successful', 'size')  # Добавляем количество сделок
-            ).reset_index()
+    elif tab_selected == "⏱️ Анализ SLA":
+        st.subheader("⏱️ Анализ SLA")
 
-            fig4 = px.scatter(
-                city_level_success,
-                x='is_successful',
-                y='City',
-                size='total_deals',  # Размер пузырька по количеству сделок
-                color='Level of Deutsch',
-                title="Успешность сделок в городах с учетом уровня языка",
-                size_max=15,
-                color_discrete_sequence=px.colors.qualitative.Set2
+        col1, col2 = st.columns(2)
+        with col1:
+            sla_dimension = st.radio("Измерение", options=SLA_DIMENSIONS, index=0, horizontal=True, key="sla_dimension")
+        with col2:
+            sla_threshold = st.number_input("Порог SLA (часы)", min_value=1, max_value=24 * 14, value=SLA_DEFAULT_HOURS, step=1, key="sla_threshold")
+
+        # Перцентили и доля нарушений считаются векторно по кэшированным секундам SLA
+        sla_table = sla_breakdown(data, sla_dimension, sla_threshold)
+        if sla_table.empty:
+            st.warning("Нет сделок с заполненным SLA.")
+        else:
+            st.dataframe(sla_table.style.format({
+                "P50 (ч)": "{:.1f}",
+                "P90 (ч)": "{:.1f}",
+                "P95 (ч)": "{:.1f}",
+                "Mean (ч)": "{:.1f}",
+                "Breach Rate (%)": "{:.2f}"
+            }))
+
+            def build_sla_breach_figure():
+                top = sla_table.head(20)
+                fig_breach = go.Figure(
+                    go.Bar(
+                        x=top.index,
+                        y=top["Breach Rate (%)"],
+                        marker=dict(color="indianred"),
+                        text=top["Breach Rate (%)"].round(1),
+                        textposition="outside",
+                        customdata=top[["P50 (ч)", "P90 (ч)"]].values,
+                        hovertemplate="%{x}<br>Нарушения: %{y:.1f}%<br>P50: %{customdata[0]:.1f} ч<br>P90: %{customdata[1]:.1f} ч<extra></extra>"
+                    )
+                )
+                fig_breach.update_layout(
+                    title=f"Доля сделок с SLA больше {sla_threshold} ч по {sla_dimension}",
+                    xaxis=dict(title=sla_dimension, tickangle=45),
+                    yaxis=dict(title="Доля нарушений (%)"),
+                    plot_bgcolor="white"
+                )
+                return fig_breach
+
+            def build_sla_hist_figure():
+                seconds = get_sla_seconds(data)
+                hours = seconds[seconds != MISSING_SLA] / 3600
+                edges, counts = cached_histogram((data_version, "sla_hours"), hours, bins=40)
+                fig_sla = go.Figure(
+                    go.Bar(
+                        x=bin_centers(edges),
+                        y=counts,
+                        width=np.diff(edges),
+                        marker=dict(color="royalblue")
+                    )
+                )
+                fig_sla.add_vline(x=sla_threshold, line_dash="dash", line_color="red")
+                fig_sla.update_layout(
+                    title="Распределение SLA",
+                    xaxis=dict(title="SLA (часы)"),
+                    yaxis=dict(title="Количество сделок"),
+                    plot_bgcolor="white"
+                )
+                return fig_sla
+
+            plotly_chart_cached("sla_breach", data_version, (sla_dimension, sla_threshold), build_sla_breach_figure, use_container_width=True)
+            plotly_chart_cached("sla_hist", data_version, (sla_threshold,), build_sla_hist_figure, use_container_width=True)
+
+
+
+    elif tab_selected == "🔻 Воронка сделок":
+        st.subheader("🔻 Воронка сделок")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            funnel_dimension = st.selectbox(
+                "Разрез воронки",
+                [None] + FUNNEL_DIMENSIONS,
+                format_func=lambda x: "Все сделки" if x is None else x,
+                key="funnel_dimension"
+            )
+        # Куб по месяцам и этапам строится один раз на версию данных и разрез;
+        # выбор значения разреза — это срез готового массива
+        cube = funnel_cube(data, funnel_dimension)
+        funnel_value = None
+        with col2:
+            if funnel_dimension is not None:
+                funnel_value = st.selectbox("Значение", list(cube.values), key="funnel_value")
+
+        conversion = cube.conversion_to_payment(funnel_value)
+        st.dataframe(conversion.style.format({
+            "To Payment (%)": "{:.2f}",
+            "Share of All Deals (%)": "{:.2f}"
+        }))
+
+        def build_funnel_figure():
+            fig_funnel = go.Figure(
+                go.Funnel(
+                    y=conversion.index,
+                    x=conversion["Reached"],
+                    textinfo="value+percent initial",
+                    marker=dict(color="royalblue")
+                )
             )
-            
-            fig4.update_layout(
-                xaxis_title="Success Rate",
-                yaxis_title="City",
+            fig_funnel.update_layout(title="Сколько сделок дошло до каждого этапа", plot_bgcolor="white")
+            return fig_funnel
+
+        def build_funnel_monthly_figure():
+            distribution = cube.monthly_distribution(funnel_value)
+            fig_monthly = go.Figure()
+            for stage in distribution.columns:
+                fig_monthly.add_trace(go.Bar(x=distribution.index, y=distribution[stage], name=stage))
+            fig_monthly.update_layout(
+                title="Этапы сделок по месяцам создания",
+                xaxis=dict(title="Месяц создания"),
+                yaxis=dict(title="Количество сделок"),
+                barmode="stack",
                 plot_bgcolor="white"
             )
+            return fig_monthly
+
+        funnel_options = (funnel_dimension, funnel_value)
+        plotly_chart_cached("deals_funnel", data_version, funnel_options, build_funnel_figure, use_container_width=True)
+        plotly_chart_cached("deals_funnel_monthly", data_version, funnel_options, build_funnel_monthly_figure, use_container_width=True)
+
+        st.subheader("Время в воронке по месяцам создания")
+        st.dataframe(cached_time_in_funnel(data))
+
+
+
+    elif tab_selected == "🧮 Когортный анализ":
+        st.subheader("🧮 Когорты по месяцу создания сделки")
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            cohort_dimension = st.selectbox(
+                "Разрез когорт",
+                [None] + COHORT_DIMENSIONS,
+                format_func=lambda x: "Все сделки" if x is None else x,
+                key="cohort_dimension"
+            )
+        # Матрица строится один раз на версию данных и разрез
+        cohorts = cohort_matrix(data, cohort_dimension)
+        cohort_value = None
+        with col2:
+            if cohort_dimension is not None:
+                cohort_value = st.selectbox("Значение", list(cohorts.values), key="cohort_value")
+        with col3:
+            cohort_metric = st.radio("Показатель", options=["Конверсия (%)", "Количество"], index=0, horizontal=True, key="cohort_metric")
+
+        cohort_table = cohorts.matrix(cohort_value, rate=cohort_metric == "Конверсия (%)")
+        st.write("Доля (или число) сделок месяца, оплаченных в течение 7, 30 и 90 дней после создания")
+
+        def build_cohort_figure():
+            windows = cohort_table.drop(columns=["Сделок в когорте"])
+            fig_cohort = go.Figure(
+                go.Heatmap(
+                    z=windows.values,
+                    x=windows.columns,
+                    y=windows.index,
+                    colorscale="Blues",
+                    text=np.round(windows.values, 1),
+                    texttemplate="%{text}",
+                    colorbar=dict(title=cohort_metric)
+                )
+            )
+            fig_cohort.update_layout(
+                title="Конверсия когорт по окнам после создания сделки",
+                xaxis=dict(title="Окно конверсии"),
+                yaxis=dict(title="Месяц создания", autorange="reversed"),
+                height=max(400, 28 * len(windows))
+            )
+            return fig_cohort
 
-            st.plotly_chart(fig4, use_container_width=True)
-
-
-
-
+        plotly_chart_cached("deals_cohorts", data_version, (cohort_dimension, cohort_value, cohort_metric), build_cohort_figure, use_container_width=True)
+        st.dataframe(cohort_table.style.format(precision=1))
@@ -0,0 +1,30 @@
+import streamlit as st
+
+from modules.figure_cache import plotly_chart_spec
+
+
+# Просмотр снимка агрегатов: готовые таблицы и графики разделов без
+# исходных данных; читается только выбранный раздел
+def process_snapshot(snapshot):
+    st.header("Снимок агрегатов")
+    st.caption(
+        f"Версия снимка {snapshot.version}. Версии данных: "
+        + ", ".join(f"{kind} — {version}" for kind, version in snapshot.data_versions.items())
+    )
+
+    titles = [section["title"] for section in snapshot.sections]
+    if not titles:
+        st.warning("Снимок пуст.")
+        return
+    section_title = st.radio("Выберите анализ:", options=titles, horizontal=True, key="snapshot_section")
+    section = snapshot.sections[titles.index(section_title)]
+
+    st.subheader(section["title"])
+    for item in section["items"]:
+        st.markdown(f"**{item['title']}**")
+        if item["note"]:
+            st.write(item["note"])
+        if item["figure"]:
+            plotly_chart_spec(snapshot.figure(item["figure"]), key=f"snapshot_{item['figure']}")
+        if item["table"]:
+            st.dataframe(snapshot.table(item["table"]))
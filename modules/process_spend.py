@@ -1,16 +1,27 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from scipy import stats
 import plotly.express as px
 import plotly.graph_objects as go
 
+from modules.figure_cache import plotly_chart_encoded
+from modules.time_index import get_time_index, period_bounds
+from modules.category_index import get_category_index
+from modules.filter_state import apply_filters, linked_filters_sidebar
+from modules.data_explorer import raw_data_explorer
+
 def process_spend(data):
     st.header("Анализ данных Spend")
 
     # Уникальные фильтры для Spend
     st.sidebar.header("Фильтры для Spend")
 
+    # Общие фильтры, выбранные в разделе Deals
+    data = linked_filters_sidebar("spend", data)
+    if data.empty:
+        st.warning("Нет данных, подходящих под общие фильтры Deals.")
+        return
+
     # Фильтр для категорий: любые категориальные поля, исключая "Date"
     category_column = st.sidebar.selectbox(
         "Выберите категориальную колонку", 
@@ -25,9 +36,29 @@ def process_spend(data):
         format_func=lambda x: "Выберите колонку" if x is None else x
     )
 
+    # Период анализа относится ко всему разделу: таблице, статистике и графикам.
+    # Диапазон дат находится бинарным поиском по отсортированному индексу
+    if date_column:
+        time_index = get_time_index(data, date_column)
+        if time_index.min is not None:
+            full_period = (time_index.min.date(), time_index.max.date())
+            period = st.sidebar.date_input(
+                "Период анализа",
+                value=full_period,
+                min_value=time_index.min.date(),
+                max_value=time_index.max.date(),
+                key="spend_period"
+            )
+            if len(period) == 2 and tuple(period) != full_period:
+                data = apply_filters(data, {}, date_column, *period_bounds(period))
+                if data.empty:
+                    st.warning("За выбранный период нет данных.")
+                    return
+
     # Отображение данных
     st.subheader("📊 Данные и описательная статистика")
-    st.dataframe(data.head())
+    # Сырые строки постранично: в браузер уходит только текущая страница
+    raw_data_explorer(data, "spend")
 
     # Описательная статистика
     st.subheader("Описательная статистика")
@@ -96,15 +127,10 @@ def process_spend(data):
             horizontal=True
         )
     
-        # Подготовка данных
-        category_data = data[category_column].copy()
-        if include_nan == "С NaN":
-            category_data = category_data.fillna("NaN")  # Заменяем NaN на строку "NaN"
-        else:
-            category_data = category_data.dropna()  # Убираем NaN
-    
-        # Получаем данные для графика
-        category_counts = category_data.value_counts()
+        # Получаем данные для графика из инвертированного индекса колонки
+        category_counts = get_category_index(data, category_column).value_counts(
+            dropna=include_nan != "С NaN", nan_label="NaN"
+        )
     
         # Проверка на пустые данные
         if category_counts.empty:
@@ -168,7 +194,7 @@ def process_spend(data):
                 )
     
             # Отображение графика
-            st.plotly_chart(fig_category)
+            plotly_chart_encoded(fig_category)
     else:
         st.write("Выберите категорию с левой панели")
             
@@ -230,7 +256,7 @@ def process_spend(data):
                 xaxis=dict(tickangle=45)  # Угол наклона подписей оси X
             )            
         
-        st.plotly_chart(fig_time)
+        plotly_chart_encoded(fig_time)
     else:
         st.write("Выберите колонку с датами с левой панели")
 
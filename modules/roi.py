@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+from modules.cache import LRUCache, get_data_version
+
+# Измерения, по которым расходы сопоставляются со сделками
+ROI_DIMENSIONS = ["Campaign", "Source"]
+
+# Периоды: подпись -> частота pandas (None — весь период одной строкой)
+ROI_PERIODS = {"Весь период": None, "Месяц": "M", "Квартал": "Q"}
+
+ALL_TIME = "Весь период"
+
+# Готовые таблицы ROI по версиям обоих датасетов, измерению и периоду
+roi_cache = LRUCache(
+    max_entries=64,
+    max_bytes=64 * 1024 * 1024,
+    sizeof=lambda table: int(table.memory_usage(deep=True).sum())
+)
+
+
+# Метки периода считаются по уникальным датам и раскладываются по строкам через коды:
+# в ежедневных выгрузках уникальных дат на порядки меньше, чем строк
+def _period_labels(dates, freq):
+    codes, uniques = pd.factorize(dates)
+    unique_dates = pd.to_datetime(pd.Series(uniques, dtype=object), errors="coerce")
+    if freq is None:
+        labels = np.where(unique_dates.isna(), None, ALL_TIME)
+    else:
+        labels = unique_dates.dt.to_period(freq).astype(str).where(unique_dates.notna()).values
+    # Код -1 (пропуск даты) попадает на последний элемент
+    labels = np.append(labels.astype(object), None)
+    return pd.Series(labels[codes], index=dates.index)
+
+
+# Расходы, сведённые к одной строке на (значение измерения, период).
+# Строк рекламных групп может быть сколько угодно: дальше в соединение
+# попадает только эта короткая таблица.
+def spend_by_period(spend, by, freq):
+    period = _period_labels(spend["Date"], freq)
+    return spend.groupby([spend[by], period.rename("Period")])[["Spend", "Clicks", "Impressions"]].sum()
+
+
+# Сделки, сведённые к тем же ключам: лиды, оплатившие клиенты и выручка
+def deals_by_period(deals, by, freq):
+    period = _period_labels(deals["Created Time"], freq)
+    successful = deals["Months of study"].notnull()
+    measures = pd.DataFrame({
+        "Leads": np.ones(len(deals), dtype=np.int64),
+        "Customers": successful.astype(np.int64).values,
+        "Revenue": deals["Initial Amount Paid"].where(successful, 0).fillna(0).values,
+    }, index=deals.index)
+    return measures.groupby([deals[by], period.rename("Period")]).sum()
+
+
+def _ratio(numerator, denominator):
+    numerator = numerator.astype(float)
+    denominator = denominator.astype(float)
+    return np.divide(numerator, denominator, out=np.full(len(numerator), np.nan), where=denominator > 0)
+
+
+# Соединение по индексу (значение измерения, период) агрегированных сторон:
+# каждая сторона уникальна по ключу, поэтому соединение один к одному,
+# без декартова произведения строк расходов и сделок.
+def build_roi_table(spend, deals, by, freq):
+    table = spend_by_period(spend, by, freq).join(deals_by_period(deals, by, freq), how="outer").fillna(0)
+    table["CPL"] = _ratio(table["Spend"].values, table["Leads"].values)
+    table["CAC"] = _ratio(table["Spend"].values, table["Customers"].values)
+    table["ROAS"] = _ratio(table["Revenue"].values, table["Spend"].values)
+    table["CTR (%)"] = _ratio(table["Clicks"].values, table["Impressions"].values) * 100
+    table[["Leads", "Customers"]] = table[["Leads", "Customers"]].astype(np.int64)
+    return table.sort_index()
+
+
+def roi_table(spend, deals, by="Campaign", period="Весь период"):
+    key = (get_data_version(spend), get_data_version(deals), by, period)
+    return roi_cache.get_or_compute(key, lambda: build_roi_table(spend, deals, by, ROI_PERIODS[period]))
+
+
+# Итоговые показатели по всей таблице
+def roi_totals(table):
+    spend = table["Spend"].sum()
+    leads = table["Leads"].sum()
+    customers = table["Customers"].sum()
+    revenue = table["Revenue"].sum()
+    return {
+        "Spend": spend,
+        "CPL": spend / leads if leads else np.nan,
+        "CAC": spend / customers if customers else np.nan,
+        "ROAS": revenue / spend if spend else np.nan,
+    }
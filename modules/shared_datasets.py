@@ -0,0 +1,230 @@
+import itertools
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pyarrow as pa
+import streamlit as st
+
+from modules.dataset_store import STORE_DIR
+
+# Копии загруженных файлов в формате Arrow (имя файла — хэш содержимого)
+SHARED_DIR = os.path.join(STORE_DIR, "shared")
+
+# Лимит памяти на разобранные фреймы и число файлов Arrow на диске
+SHARED_MAX_BYTES = 1024 * 1024 * 1024
+SHARED_MAX_FILES = 32
+
+# Недописанные файлы старше этого возраста остались от упавших процессов
+STALE_TMP_SECONDS = 60 * 60
+
+
+# Датасет, общий для всех сессий: Arrow-копия на диске и один разобранный
+# DataFrame, который сессии получают как поверхностные копии
+class SharedDataset:
+    def __init__(self, key, path):
+        self.key = key
+        self.path = path
+        self.frame = None
+        self.nbytes = 0
+        self.owners = set()
+        self.lock = threading.Lock()
+
+
+# Числовые колонки без пропусков pandas получает из Arrow без копирования:
+# массивы смотрят прямо в отображённый в память файл (только для чтения)
+def _mapped_columns(table):
+    return [
+        field.name for field, column in zip(table.schema, table.columns)
+        if (pa.types.is_integer(field.type) or pa.types.is_floating(field.type)) and column.null_count == 0
+    ]
+
+
+# Фрейм из отображённой в память таблицы Arrow. Числовые колонки без пропусков
+# остаются в файле (split_blocks не склеивает их в общий блок с копированием),
+# остальные переводятся в память процесса. Arrow отдаёт пропуски строковых
+# колонок как None; заменяем на NaN, как read_csv, на месте, без второй копии.
+def _to_pandas(table):
+    frame = table.to_pandas(split_blocks=True)
+    for column in frame.columns:
+        if frame[column].dtype == object:
+            values = frame[column].to_numpy()
+            values[np.equal(values, None)] = np.nan
+    return frame
+
+
+def _write_arrow(frame, path):
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Запись во временный файл и переименование: другой процесс не увидит недописанный файл
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def _read_arrow(path):
+    return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+
+# Хранилище загруженных датасетов по хэшу содержимого. Сессии, загрузившие
+# один и тот же файл, разделяют одну копию. Датасет, которым никто не
+# пользуется, первым выгружается из памяти (LRU) при превышении лимита;
+# файл Arrow остаётся, и повторная загрузка не разбирает CSV заново.
+class SharedDatasetStore:
+    def __init__(self, root=SHARED_DIR, max_bytes=SHARED_MAX_BYTES, max_files=SHARED_MAX_FILES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._adopt_files()
+
+    # Файлы Arrow прошлых запусков учитываются в лимите max_files как
+    # неиспользуемые датасеты (давно изменённые выгружаются первыми);
+    # недописанные файлы упавших процессов удаляются
+    def _adopt_files(self):
+        if not os.path.isdir(self.root):
+            return
+        now = time.time()
+        files = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                modified = os.path.getmtime(path)
+                if name.endswith(".tmp") and now - modified > STALE_TMP_SECONDS:
+                    os.remove(path)
+            except OSError:
+                continue
+            if name.endswith(".arrow"):
+                files.append((modified, name[:-len(".arrow")], path))
+        for _, key, path in sorted(files):
+            self._entries[key] = SharedDataset(key, path)
+        self._evict()
+
+    # Память разобранных фреймов; у выгруженных датасетов nbytes = 0
+    @property
+    def nbytes(self):
+        return sum(entry.nbytes for entry in self._entries.values())
+
+    def _entry(self, key, owner):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = SharedDataset(key, os.path.join(self.root, f"{key}.arrow"))
+            self._entries.move_to_end(key)
+            entry.owners.add(owner)
+            return entry
+
+    # Только что разобранный файл тоже открывается из записанной копии, чтобы его
+    # числовые колонки жили в отображённом файле, а не в памяти процесса. В лимит
+    # памяти входят лишь переведённые колонки: страницы файла освобождает ОС.
+    def _materialize(self, entry, load):
+        if not os.path.exists(entry.path):
+            frame = load()
+            try:
+                _write_arrow(frame, entry.path)
+            except (pa.ArrowException, OSError):
+                # Колонки со смешанными типами Arrow не переводит: датасет живёт только в памяти
+                entry.frame = frame
+                entry.nbytes = int(frame.memory_usage(deep=True).sum())
+                return
+            del frame
+        table = _read_arrow(entry.path)
+        frame = _to_pandas(table)
+        usage = frame.memory_usage(deep=True, index=False)
+        entry.frame = frame
+        entry.nbytes = int(usage.drop(_mapped_columns(table)).sum())
+
+    # Датасет для владельца (сессии); load разбирает исходный файл, если копии ещё нет
+    def acquire(self, key, owner, load):
+        entry = self._entry(key, owner)
+        with entry.lock:
+            if entry.frame is None:
+                self._materialize(entry, load)
+            frame = entry.frame
+        self._evict()
+        view = frame.copy(deep=False)
+        view.attrs["data_version"] = key
+        return view
+
+    # Датасет уже разобран: фрейм в памяти или файл Arrow на диске
+    def available(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.frame is not None:
+                return True
+        return os.path.exists(os.path.join(self.root, f"{key}.arrow"))
+
+    def release(self, key, owner):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.owners.discard(owner)
+        self._evict()
+
+    def release_owner(self, owner):
+        with self._lock:
+            for entry in self._entries.values():
+                entry.owners.discard(owner)
+        self._evict()
+
+    # Выгрузка неиспользуемых датасетов: сначала фреймы из памяти, затем
+    # лишние файлы Arrow с диска (от давно не открывавшихся к недавним)
+    def _evict(self):
+        with self._lock:
+            idle = [entry for entry in self._entries.values() if not entry.owners]
+            loaded = self.nbytes
+            for entry in idle:
+                if loaded <= self.max_bytes:
+                    break
+                if entry.frame is not None:
+                    loaded -= entry.nbytes
+                    entry.frame = None
+                    entry.nbytes = 0
+            excess = len(self._entries) - self.max_files
+            for entry in idle[:max(0, excess)]:
+                del self._entries[entry.key]
+                entry.frame = None
+                entry.nbytes = 0
+                if os.path.exists(entry.path):
+                    os.remove(entry.path)
+
+
+_store = SharedDatasetStore()
+_owner_ids = itertools.count()
+
+
+# Метка сессии в session_state. Когда сессия закрывается и её состояние
+# собирает сборщик мусора, финализатор снимает все ссылки сессии на датасеты.
+class _SessionOwner:
+    def __init__(self, owner_id):
+        self.id = owner_id
+        self.key = None
+
+
+def _session_owner():
+    owner = st.session_state.get("shared_dataset_owner")
+    if owner is None:
+        owner = st.session_state["shared_dataset_owner"] = _SessionOwner(next(_owner_ids))
+        weakref.finalize(owner, _store.release_owner, owner.id)
+    return owner
+
+
+# Загруженный датасет через общее хранилище: key — хэш содержимого файла,
+# load — разбор файла (вызывается, только если копии ещё нет)
+def shared_dataset(key, load):
+    owner = _session_owner()
+    data = _store.acquire(key, owner.id, load)
+    if owner.key is not None and owner.key != key:
+        _store.release(owner.key, owner.id)
+    owner.key = key
+    return data
+
+
+# Есть ли готовая копия датасета (загрузка не потребует разбора CSV)
+def is_shared(key):
+    return _store.available(key)
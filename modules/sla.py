@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+from modules.cache import LRUCache, get_data_version, bytes_version
+from modules.category_index import get_category_index
+
+# Измерения, по которым сравнивается SLA
+SLA_DIMENSIONS = ["Deal Owner Name", "Source", "Campaign"]
+
+# Перцентили SLA в таблице
+SLA_PERCENTILES = [0.5, 0.9, 0.95]
+
+# Порог SLA по умолчанию (часы)
+SLA_DEFAULT_HOURS = 24
+
+# Отметка пропущенного SLA в массиве секунд
+MISSING_SLA = np.iinfo(np.int64).min
+
+# SLA в секундах для версии данных
+sla_seconds_cache = LRUCache(max_entries=32, max_bytes=256 * 1024 * 1024, sizeof=lambda seconds: seconds.nbytes)
+
+# Таблицы SLA по версии данных (с учётом фильтров), измерению и порогу
+sla_breakdown_cache = LRUCache(
+    max_entries=128,
+    max_bytes=16 * 1024 * 1024,
+    sizeof=lambda table: int(table.memory_usage(deep=True).sum())
+)
+
+
+# Разбор SLA в int64 секунды. Строки вида "2 days 23:01:40" разбираются
+# только для уникальных значений и раскладываются по строкам через коды.
+def parse_sla_seconds(values):
+    if pd.api.types.is_timedelta64_dtype(values):
+        ticks = values.values.astype("timedelta64[ns]").view(np.int64)
+        return np.where(ticks == MISSING_SLA, MISSING_SLA, ticks // 10**9)
+    codes, uniques = pd.factorize(values)
+    parsed = pd.to_timedelta(pd.Series(uniques, dtype=object).astype(str), errors="coerce")
+    ticks = parsed.values.astype("timedelta64[ns]").view(np.int64)
+    seconds = np.where(ticks == MISSING_SLA, MISSING_SLA, ticks // 10**9)
+    # Код -1 (пропуск) попадает на последний элемент
+    return np.append(seconds, MISSING_SLA)[codes]
+
+
+def get_sla_seconds(data):
+    return sla_seconds_cache.get_or_compute(get_data_version(data), lambda: parse_sla_seconds(data["SLA"]))
+
+
+# Колонка timedelta из секунд (для describe и совместимости с остальным кодом)
+def sla_timedelta(seconds):
+    return pd.to_timedelta(np.where(seconds == MISSING_SLA, np.nan, seconds), unit="s")
+
+
+# Сделки с колонкой SLA в timedelta. Колонка заменяется в поверхностной копии,
+# общий для сессий фрейм не меняется; у копии своя версия данных, а секунды
+# переносятся в кэш под этой версией без повторного разбора.
+def with_sla_timedelta(data):
+    seconds = get_sla_seconds(data)
+    frame = data.copy(deep=False)
+    frame["SLA"] = sla_timedelta(seconds)
+    frame.attrs["data_version"] = bytes_version(f"{get_data_version(data)}:sla".encode())
+    sla_seconds_cache.put(frame.attrs["data_version"], seconds)
+    return frame
+
+
+# Перцентили внутри групп без цикла по группам: значения сортируются по
+# (код группы, значение), позиция перцентиля в каждой группе считается
+# от её начала, как линейная интерполяция numpy.percentile
+def group_percentiles(codes, values, size, quantiles):
+    order = np.lexsort((values, codes))
+    sorted_values = values[order].astype(float)
+    counts = np.bincount(codes, minlength=size)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    result = np.full((size, len(quantiles)), np.nan)
+    present = counts > 0
+    for j, quantile in enumerate(quantiles):
+        position = starts[present] + quantile * (counts[present] - 1)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.ceil(position).astype(np.int64)
+        fraction = position - lower
+        result[present, j] = sorted_values[lower] * (1 - fraction) + sorted_values[upper] * fraction
+    return result
+
+
+def build_sla_breakdown(seconds, index, threshold_hours):
+    valid = (seconds != MISSING_SLA) & (index.codes != index.nan_code)
+    codes = index.codes[valid]
+    values = seconds[valid]
+    size = index.nan_code
+    counts = np.bincount(codes, minlength=size)
+    hours = 3600.0
+    breaches = np.bincount(codes[values > threshold_hours * hours], minlength=size)
+    totals = np.bincount(codes, weights=values, minlength=size)
+    percentiles = group_percentiles(codes, values, size, SLA_PERCENTILES) / hours
+
+    table = pd.DataFrame({"Deals with SLA": counts}, index=index.categories)
+    for j, quantile in enumerate(SLA_PERCENTILES):
+        table[f"P{int(quantile * 100)} (ч)"] = percentiles[:, j]
+    table["Mean (ч)"] = np.divide(totals, counts, out=np.full(size, np.nan), where=counts > 0) / hours
+    table["Breach Rate (%)"] = np.divide(breaches, counts, out=np.full(size, np.nan), where=counts > 0) * 100
+    return table[table["Deals with SLA"] > 0].sort_values(by="Breach Rate (%)", ascending=False)
+
+
+def sla_breakdown(data, by, threshold_hours):
+    key = (get_data_version(data), by, threshold_hours)
+    return sla_breakdown_cache.get_or_compute(
+        key, lambda: build_sla_breakdown(get_sla_seconds(data), get_category_index(data, by), threshold_hours)
+    )
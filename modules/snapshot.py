@@ -0,0 +1,135 @@
+import io
+import json
+import os
+import zipfile
+
+import pandas as pd
+import pyarrow as pa
+
+from modules.cache import LRUCache, bytes_version, file_version
+from modules.dataset_store import STORE_DIR
+from modules.figure_transport import encode_figure
+
+# Снимки агрегатов: таблицы и графики всех разделов отчёта в одном файле.
+# Дашборд открывает снимок без исходных CSV.
+SNAPSHOT_DIR = os.path.join(STORE_DIR, "snapshots")
+
+# Версия формата файла; снимки другой версии не открываются
+SNAPSHOT_FORMAT = 1
+
+# Фиксированное время записей zip: одинаковые данные дают одинаковый файл
+ZIP_TIMESTAMP = (1980, 1, 1, 0, 0, 0)
+
+# Прочитанные из снимка таблицы и спецификации графиков по (путь, версия файла, имя записи)
+snapshot_member_cache = LRUCache(
+    max_entries=512,
+    max_bytes=32 * 1024 * 1024,
+    sizeof=lambda value: len(value) if isinstance(value, bytes) else int(value.memory_usage(deep=True).sum())
+)
+
+# Открытые снимки (только оглавление) по пути и версии файла
+snapshot_cache = LRUCache(max_entries=16, sizeof=lambda snapshot: 0)
+
+
+# Таблица в Arrow IPC. Многоуровневые заголовки колонок склеиваются в строки;
+# колонки со смешанными типами сохраняются как текст.
+def _table_bytes(table):
+    frame = table.copy()
+    if isinstance(frame.columns, pd.MultiIndex):
+        frame.columns = [" / ".join(map(str, column)) for column in frame.columns]
+    frame.columns = frame.columns.map(str)
+    try:
+        arrow_table = pa.Table.from_pandas(frame, preserve_index=True)
+    except pa.ArrowException:
+        for column in frame.columns[frame.dtypes == object]:
+            frame[column] = frame[column].map(lambda value: None if pd.isna(value) else str(value))
+        arrow_table = pa.Table.from_pandas(frame, preserve_index=True)
+    sink = io.BytesIO()
+    with pa.ipc.new_file(sink, arrow_table.schema) as writer:
+        writer.write_table(arrow_table)
+    return sink.getvalue()
+
+
+def _read_table(content):
+    return pa.ipc.open_file(pa.BufferReader(content)).read_all().to_pandas()
+
+
+def _write_member(archive, name, content):
+    info = zipfile.ZipInfo(name, date_time=ZIP_TIMESTAMP)
+    info.compress_type = zipfile.ZIP_DEFLATED
+    archive.writestr(info, content)
+
+
+# Снимок разделов [(имя, заголовок, элементы отчёта)]. Версия снимка — хэш
+# содержимого (оглавления и хэшей всех записей), она же входит в имя файла:
+# одинаковые агрегаты дают одинаковую версию.
+def write_snapshot(sections, data_versions, out_dir=SNAPSHOT_DIR):
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {"format": SNAPSHOT_FORMAT, "data_versions": data_versions, "sections": []}
+    members = {}
+    tmp_path = os.path.join(out_dir, f"snapshot.{os.getpid()}.tmp")
+    with zipfile.ZipFile(tmp_path, "w") as archive:
+        number = 0
+        for name, title, items in sections:
+            entries = []
+            for item in items:
+                number += 1
+                entry = {"title": item.title, "note": item.note, "table": None, "figure": None}
+                if item.table is not None:
+                    entry["table"] = f"tables/{number:04d}.arrow"
+                    content = _table_bytes(item.table)
+                    members[entry["table"]] = bytes_version(content)
+                    _write_member(archive, entry["table"], content)
+                if item.figure is not None:
+                    entry["figure"] = f"figures/{number:04d}.json"
+                    content = encode_figure(item.figure)
+                    members[entry["figure"]] = bytes_version(content)
+                    _write_member(archive, entry["figure"], content)
+                entries.append(entry)
+            manifest["sections"].append({"name": name, "title": title, "items": entries})
+        manifest["members"] = members
+        manifest["version"] = bytes_version(json.dumps(manifest, ensure_ascii=False, sort_keys=True).encode())
+        _write_member(archive, "manifest.json", json.dumps(manifest, ensure_ascii=False, indent=1))
+    path = os.path.join(out_dir, f"snapshot_{manifest['version']}.zip")
+    os.replace(tmp_path, path)
+    return path
+
+
+# Снимок, открытый для чтения: в памяти только оглавление, таблицы
+# и графики читаются из файла при первом показе раздела
+class Snapshot:
+    def __init__(self, path):
+        self.path = path
+        self.file_version = file_version(path)
+        with zipfile.ZipFile(path) as archive:
+            manifest = json.loads(archive.read("manifest.json"))
+        if manifest.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"Неподдерживаемая версия формата снимка: {manifest.get('format')}")
+        self.version = manifest["version"]
+        self.data_versions = manifest["data_versions"]
+        self.sections = manifest["sections"]
+
+    def _read(self, member):
+        with zipfile.ZipFile(self.path) as archive:
+            return archive.read(member)
+
+    def table(self, member):
+        key = (self.path, self.file_version, member)
+        return snapshot_member_cache.get_or_compute(key, lambda: _read_table(self._read(member)))
+
+    # Спецификация графика в формате передачи (JSON с типизированными массивами)
+    def figure(self, member):
+        return snapshot_member_cache.get_or_compute((self.path, self.file_version, member), lambda: self._read(member))
+
+
+def open_snapshot(path):
+    path = os.path.abspath(path)
+    return snapshot_cache.get_or_compute((path, file_version(path)), lambda: Snapshot(path))
+
+
+# Файлы снимков в каталоге, от новых к старым
+def list_snapshots(root=SNAPSHOT_DIR):
+    if not os.path.isdir(root):
+        return []
+    paths = [os.path.join(root, name) for name in os.listdir(root) if name.startswith("snapshot_") and name.endswith(".zip")]
+    return sorted(paths, key=os.path.getmtime, reverse=True)
@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+
+from modules.cache import LRUCache, get_data_version
+
+
+# Отсортированный индекс по колонке с датами: массив int64 (наносекунды)
+# и перестановка строк. Диапазон дат находится двумя бинарными поисками
+# и даёт непрерывный срез перестановки, без булевой маски по всему фрейму.
+class TimeIndex:
+    def __init__(self, dates):
+        ticks = pd.to_datetime(dates, errors="coerce").values.astype("datetime64[ns]").view(np.int64)
+        order = np.argsort(ticks, kind="stable")
+        sorted_ticks = ticks[order]
+        # NaT хранится как минимальное int64 и оказывается в начале, отбрасываем его
+        valid_from = np.searchsorted(sorted_ticks, np.iinfo(np.int64).min, side="right")
+        self.ticks = sorted_ticks[valid_from:]
+        self.rows = order[valid_from:]
+
+    @property
+    def nbytes(self):
+        return self.ticks.nbytes + self.rows.nbytes
+
+    @property
+    def min(self):
+        return pd.Timestamp(self.ticks[0]) if len(self.ticks) else None
+
+    @property
+    def max(self):
+        return pd.Timestamp(self.ticks[-1]) if len(self.ticks) else None
+
+    # Позиции строк (в порядке времени) с датой в [start, end]
+    def positions(self, start=None, end=None):
+        lo = 0 if start is None else np.searchsorted(self.ticks, pd.Timestamp(start).value, side="left")
+        hi = len(self.ticks) if end is None else np.searchsorted(self.ticks, pd.Timestamp(end).value, side="right")
+        return self.rows[lo:hi]
+
+    # Те же строки в исходном порядке фрейма: сортируется только срез
+    # перестановки (k строк периода), а не маска по всем n строкам
+    def between(self, start=None, end=None):
+        return np.sort(self.positions(start, end))
+
+
+time_index_cache = LRUCache(max_entries=32, max_bytes=512 * 1024 * 1024, sizeof=lambda index: index.nbytes)
+
+
+# Индекс строится один раз на версию данных и колонку
+def get_time_index(data, column):
+    key = (get_data_version(data), column)
+    return time_index_cache.get_or_compute(key, lambda: TimeIndex(data[column]))
+
+
+# Период из st.date_input (кортеж дат) в границы [начало первого дня, конец последнего]
+def period_bounds(period):
+    if len(period) != 2:
+        return None, None
+    start = pd.Timestamp(period[0])
+    end = pd.Timestamp(period[1]) + pd.Timedelta(days=1) - pd.Timedelta(1)
+    return start, end
+
+
+# Разбор дат только по уникальным значениям: в выгрузках CRM одна и та же
+# дата (или минута) повторяется во многих строках
+def parse_dates(values):
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    codes, uniques = pd.factorize(values)
+    parsed = pd.to_datetime(pd.Series(uniques, dtype=object), errors="coerce").values.astype("datetime64[ns]")
+    return pd.Series(np.append(parsed, np.datetime64("NaT", "ns"))[codes], index=values.index)
+
+
+# Целочисленный код месяца (год * 12 + месяц); -1 для пропусков
+def month_codes(dates):
+    dates = parse_dates(dates).values.astype("datetime64[ns]")
+    months = dates.astype("datetime64[M]").astype(np.int64) + 1970 * 12
+    return np.where(np.isnat(dates), -1, months)
+
+
+def month_labels(codes):
+    return [f"{code // 12}-{code % 12 + 1:02d}" for code in codes]
+
+
+# Разобранные колонки дат (datetime64[ns]) по версии данных и колонке
+dates_cache = LRUCache(max_entries=64, max_bytes=512 * 1024 * 1024, sizeof=lambda dates: dates.nbytes)
+
+
+def get_dates(data, column):
+    key = (get_data_version(data), column)
+    return dates_cache.get_or_compute(key, lambda: parse_dates(data[column]).values.astype("datetime64[ns]"))
+
+
+# Частоты временных корзин: день и неделя (с понедельника)
+BUCKET_FREQS = {"День": "D", "Неделя": "W"}
+
+
+# Целочисленный код корзины: номер дня от 1970-01-01 или номер недели
+# (1970-01-01 — четверг, сдвиг на 3 дня выравнивает недели по понедельникам); -1 для пропусков
+def bucket_codes(dates, freq):
+    dates = np.asarray(dates).astype("datetime64[ns]")
+    days = dates.astype("datetime64[D]").astype(np.int64)
+    codes = days if freq == "D" else (days + 3) // 7
+    return np.where(np.isnat(dates), -1, codes)
+
+
+# Количество строк по корзинам: (код первой корзины, массив счётчиков).
+# subset — колонка, непустые значения которой отбирают строки (например,
+# успешные сделки по "Months of study")
+bucket_counts_cache = LRUCache(max_entries=128, max_bytes=64 * 1024 * 1024, sizeof=lambda buckets: buckets[1].nbytes)
+
+
+def build_bucket_counts(dates, freq, mask=None):
+    codes = bucket_codes(dates, freq)
+    valid = codes >= 0 if mask is None else (codes >= 0) & mask
+    if not valid.any():
+        return 0, np.zeros(0, dtype=np.int64)
+    first = int(codes[valid].min())
+    return first, np.bincount(codes[valid] - first)
+
+
+def get_bucket_counts(data, column, freq, subset=None):
+    key = (get_data_version(data), column, freq, subset)
+    return bucket_counts_cache.get_or_compute(key, lambda: build_bucket_counts(
+        get_dates(data, column), freq, None if subset is None else data[subset].notnull().values
+    ))
@@ -0,0 +1,101 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEMO_DATA = os.path.join(ROOT, "demo_data")
+
+STAGES = ["New Lead", "Need to call", "Test Sent", "Waiting For Payment", "Payment Done", "Lost"]
+OWNERS = ["Alice", "Bob", "Carol", "Dave"]
+CAMPAIGNS = ["gen_analyst_DE", "performancemax_eng_DE", "youtube_DE"]
+SOURCES = ["Google Ads", "Facebook Ads", "Organic"]
+QUALITIES = ["A - High", "B - Medium", "C - Low", "D - Non Target", "E - Non Qualified", "F"]
+
+
+# Небольшой синтетический датасет сделок в формате выгрузки CRM: пропуски
+# в измерениях и датах, успешные сделки — с заполненным "Months of study"
+def make_deals(rows=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    created = pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 365 * 24 * 60, rows), unit="min")
+    closing = created + pd.to_timedelta(rng.integers(-5, 150, rows), unit="D")
+    stage = rng.choice(STAGES, rows)
+    successful = stage == "Payment Done"
+
+    def with_gaps(values, share=0.05):
+        values = pd.Series(values, dtype=object)
+        return values.where(rng.random(rows) >= share)
+
+    sla = pd.to_timedelta(rng.integers(0, 5 * 24 * 3600, rows), unit="s").astype(str)
+    return pd.DataFrame({
+        "Id": np.arange(rows, dtype=np.int64) + 5805028000000000000,
+        "Contact Name": rng.integers(0, rows // 3, rows).astype(np.int64) + 5805028000000900000,
+        "Deal Owner Name": with_gaps(rng.choice(OWNERS, rows)),
+        "Campaign": with_gaps(rng.choice(CAMPAIGNS, rows)),
+        "Source": with_gaps(rng.choice(SOURCES, rows)),
+        "City": with_gaps(rng.choice(["Berlin", "Munich", "Hamburg"], rows)),
+        "Stage": with_gaps(stage, 0.02),
+        "Created Time": with_gaps(created.strftime("%Y-%m-%d %H:%M:%S"), 0.02),
+        "Closing Date": with_gaps(closing.strftime("%Y-%m-%d"), 0.3),
+        "Months of study": np.where(successful, rng.integers(1, 12, rows), np.nan),
+        "Initial Amount Paid": np.where(successful, rng.integers(0, 2000, rows), np.nan),
+        "SLA": with_gaps(sla, 0.1),
+        "Quality": with_gaps(rng.choice(QUALITIES, rows)),
+        "Payment Type": with_gaps(rng.choice(["Recurring Payments", "One Payment", "Reservation"], rows)),
+        "Offer Total Amount": np.where(rng.random(rows) < 0.8, rng.integers(1000, 10000, rows), np.nan),
+        "Product": with_gaps(rng.choice(["Digital Marketing", "UX/UI Design", "Web Developer"], rows)),
+        "Education Type": with_gaps(rng.choice(["Morning", "Evening"], rows)),
+        "Country": with_gaps(rng.choice(["Germany", "Austria", "Switzerland"], rows)),
+        "Level of Deutsch": with_gaps(rng.choice(["A1", "A2", "B1", "B2", "C1"], rows)),
+    })
+
+
+# Звонки по контактам из тех же сделок и по неизвестным контактам
+def make_calls(deals, rows=5000, seed=1):
+    rng = np.random.default_rng(seed)
+    contacts = np.concatenate([deals["Contact Name"].unique(), rng.integers(0, 10**6, 50) + 5805028000009000000])
+    start = pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 400 * 24 * 60, rows), unit="min")
+    return pd.DataFrame({
+        "Id": np.arange(rows, dtype=np.int64),
+        "CONTACTID": rng.choice(contacts, rows).astype(np.int64),
+        "Call Owner Name": rng.choice(OWNERS, rows),
+        "Call Start Time": pd.Series(start.strftime("%Y-%m-%d %H:%M:%S")).where(rng.random(rows) >= 0.02),
+        "Call Duration (in seconds)": rng.integers(0, 600, rows).astype(float),
+        "Scheduled in CRM": rng.integers(0, 2, rows),
+    })
+
+
+def make_contacts(deals, seed=2):
+    rng = np.random.default_rng(seed)
+    ids = deals["Contact Name"].unique()
+    created = pd.Timestamp("2022-12-01") + pd.to_timedelta(rng.integers(0, 400 * 24 * 60, len(ids)), unit="min")
+    return pd.DataFrame({
+        "Id": ids,
+        "Contact Owner Name": rng.choice(OWNERS, len(ids)),
+        "Created Time": created.strftime("%Y-%m-%d %H:%M:%S"),
+    })
+
+
+@pytest.fixture
+def deals():
+    return make_deals()
+
+
+@pytest.fixture
+def calls(deals):
+    return make_calls(deals)
+
+
+@pytest.fixture
+def contacts(deals):
+    return make_contacts(deals)
+
+
+# Расходы из demo_data (файл есть в репозитории)
+@pytest.fixture
+def spend():
+    return pd.read_csv(os.path.join(DEMO_DATA, "Cleaned_Spend.csv"))
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+from modules.attribution import attribution_summary, build_attribution
+
+
+# Эталон: groupby сделок по контакту и слияние звонков с датой конверсии контакта
+def reference_attribution(deals, calls, contacts):
+    contact = deals["Contact Name"]
+    won = deals["Months of study"].notnull()
+    created = pd.to_datetime(deals["Created Time"])
+    closing = pd.to_datetime(deals["Closing Date"])
+    facts = pd.DataFrame({
+        "Deals": contact.value_counts(sort=False),
+        "Won": contact[won].value_counts(sort=False),
+    }).fillna(0)
+    facts["Converted"] = facts["Won"] > 0
+    facts["First Deal"] = created.groupby(contact).min()
+    close_time = closing[won].groupby(contact[won]).min()
+
+    starts = pd.to_datetime(calls["Call Start Time"])
+    matched = calls.assign(Start=starts)[calls["CONTACTID"].isin(facts.index)]
+    facts["Calls"] = matched.groupby("CONTACTID").size()
+    facts["First Call"] = matched.groupby("CONTACTID")["Start"].min()
+    with_close = matched.assign(Close=matched["CONTACTID"].map(close_time))
+    before = with_close[with_close["Start"] <= with_close["Close"]]
+    facts["Calls Before Close"] = before.groupby("CONTACTID").size()
+    facts[["Calls", "Calls Before Close"]] = facts[["Calls", "Calls Before Close"]].fillna(0)
+    facts.loc[~facts["Converted"], "Calls Before Close"] = 0
+    facts["Hours To First Call"] = (facts["First Call"] - facts["First Deal"]).dt.total_seconds() / 3600
+
+    owners = contacts.set_index("Id")
+    facts["Contact Owner Name"] = owners["Contact Owner Name"].reindex(facts.index)
+    facts["Contact Created"] = pd.to_datetime(owners["Created Time"]).reindex(facts.index)
+    return facts
+
+
+def test_attribution_matches_pandas_groupby(deals, calls, contacts):
+    # Часть контактов из сделок отсутствует в выгрузке контактов
+    contacts = contacts.iloc[: len(contacts) - 20]
+    result = build_attribution(deals, calls, contacts).set_index("Contact")
+    expected = reference_attribution(deals, calls, contacts).reindex(result.index)
+    assert set(result.index) == set(deals["Contact Name"])
+
+    for column in ["Deals", "Calls", "Calls Before Close"]:
+        assert result[column].tolist() == expected[column].astype(int).tolist(), column
+    assert result["Converted"].tolist() == expected["Converted"].tolist()
+    for column in ["First Deal", "First Call", "Contact Created"]:
+        pd.testing.assert_series_equal(result[column], expected[column], check_names=False, check_dtype=False)
+    assert np.allclose(result["Hours To First Call"], expected["Hours To First Call"], equal_nan=True, rtol=1e-6)
+    assert result["Contact Owner Name"].astype(object).tolist() == expected["Contact Owner Name"].tolist()
+
+
+def test_attribution_float_contact_ids(deals, calls):
+    # В выгрузке звонков CONTACTID бывает float: ключи приводятся к float64
+    calls = calls.assign(CONTACTID=calls["CONTACTID"].astype(float))
+    result = build_attribution(deals, calls).set_index("Contact")
+    keys = deals["Contact Name"].astype(float)
+    assert result["Deals"].sum() == len(deals)
+    assert result["Calls"].sum() == calls["CONTACTID"].isin(keys).sum()
+
+
+def test_attribution_summary(deals, calls):
+    facts = build_attribution(deals, calls)
+    summary = attribution_summary(facts)
+    converted = facts[facts["Converted"]]
+    assert summary["Contacts"] == deals["Contact Name"].nunique()
+    assert summary["Contacted Share (%)"] == (facts["Calls"] > 0).mean() * 100
+    assert summary["Touches Per Conversion"] == converted["Calls Before Close"].mean()
@@ -0,0 +1,40 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from modules.batch_report import REPORT_SECTIONS, run_sections
+from modules.owner_activity import owner_productivity
+from modules.figure_transport import decode_figure
+from modules.snapshot import open_snapshot, write_snapshot
+
+
+def test_deals_only_report_has_owner_section(deals):
+    deals = deals.copy()
+    deals.attrs["data_version"] = "deals-only"
+    results, failed = run_sections({"deals": deals, "calls": None, "contacts": None, "spend": None}, log=io.StringIO())
+    assert not failed
+    assert set(results) == {name for name, (_, kinds, _) in REPORT_SECTIONS.items() if kinds == ["deals"]}
+    owners = results["owners"][0].table
+    pd.testing.assert_frame_equal(owners, owner_productivity(deals))
+    assert "Calls" not in owners
+
+
+def test_snapshot_round_trip(tmp_path, deals):
+    deals = deals.copy()
+    deals.attrs["data_version"] = "deals-only"
+    results, _ = run_sections({"deals": deals}, log=io.StringIO())
+    sections = [(name, REPORT_SECTIONS[name][0], items) for name, items in results.items()]
+    path = write_snapshot(sections, {"deals": "deals-only"}, str(tmp_path))
+    # Те же агрегаты дают тот же файл
+    assert write_snapshot(sections, {"deals": "deals-only"}, str(tmp_path)) == path
+
+    snapshot = open_snapshot(path)
+    assert [section["name"] for section in snapshot.sections] == list(results)
+    owners = snapshot.sections[list(results).index("owners")]["items"][0]
+    table = snapshot.table(owners["table"])
+    expected = results["owners"][0].table
+    assert list(table.index) == list(expected.index)
+    np.testing.assert_allclose(table.to_numpy(dtype=float), expected.to_numpy(dtype=float))
+    figure = decode_figure(snapshot.figure(owners["figure"]))
+    assert figure["data"][0]["y"] == expected.loc[expected["Closed Deals"] > 0, "Sales"].tolist()
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.category_index import CategoryIndex, filter_bitmap
+
+
+def assert_counts_equal(result, expected):
+    # Порядок одинаковых счётчиков не задан: сравниваем как словари и проверяем сортировку
+    assert result.to_dict() == expected.to_dict()
+    assert result.is_monotonic_decreasing
+
+
+@pytest.mark.parametrize("column", ["Deal Owner Name", "Campaign", "Source", "Stage"])
+def test_value_counts_match_pandas(deals, column):
+    index = CategoryIndex(deals[column])
+    assert_counts_equal(index.value_counts(), deals[column].value_counts())
+    expected = deals[column].fillna("NaN").value_counts()
+    assert_counts_equal(index.value_counts(dropna=False, nan_label="NaN"), expected)
+
+
+def test_value_counts_with_mask(deals):
+    mask = deals["Months of study"].notnull().values
+    index = CategoryIndex(deals["Campaign"])
+    assert_counts_equal(index.value_counts(mask=mask), deals.loc[mask, "Campaign"].value_counts())
+
+
+@pytest.mark.parametrize("values", [["Alice"], ["Bob", "Carol"], [np.nan], ["Nobody"], []])
+def test_bitmap_matches_isin(deals, values):
+    index = CategoryIndex(deals["Deal Owner Name"])
+    expected = deals["Deal Owner Name"].isin(values).values
+    if any(pd.isna(value) for value in values):
+        expected |= deals["Deal Owner Name"].isna().values
+    assert np.array_equal(index.bitmap(values), expected)
+
+
+def test_sums_match_groupby(deals):
+    index = CategoryIndex(deals["Source"])
+    result = index.sums(deals["Initial Amount Paid"])
+    expected = deals.groupby("Source")["Initial Amount Paid"].sum()
+    assert np.allclose(result.reindex(expected.index).values, expected.values)
+
+
+def test_filter_bitmap_intersects_columns(deals):
+    filters = {"Deal Owner Name": ["Alice", "Bob"], "Source": ["Google Ads"], "City": []}
+    expected = deals["Deal Owner Name"].isin(["Alice", "Bob"]) & deals["Source"].isin(["Google Ads"])
+    assert np.array_equal(filter_bitmap(deals, filters), expected.values)
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.cohort import COHORT_DIMENSIONS, COHORT_WINDOWS, CohortMatrix
+
+
+# Эталон: месяц создания из to_period, дни до закрытия из .dt.days,
+# конверсия в окне N — успешные сделки, закрытые за 0..N дней
+def reference_matrix(deals, dimension=None, value=None, rate=True):
+    created = pd.to_datetime(deals["Created Time"])
+    days = (pd.to_datetime(deals["Closing Date"]) - created).dt.days
+    valid = created.notna()
+    if value is not None:
+        valid &= deals[dimension] == value
+    elif dimension is not None:
+        valid &= deals[dimension].notna()
+    month = created.dt.to_period("M").astype(str)[valid]
+    successful = deals["Months of study"].notnull()[valid]
+    days = days[valid]
+
+    table = pd.DataFrame({"Сделок в когорте": month.value_counts().sort_index()})
+    for window in COHORT_WINDOWS:
+        converted = (successful & days.between(0, window)).groupby(month).sum()
+        table[f"{window} дней"] = converted / table["Сделок в когорте"] * 100 if rate else converted
+    return table
+
+
+def compare(result, expected):
+    # В матрице есть и пустые месяцы внутри диапазона — у эталона их нет
+    assert (result.loc[~result.index.isin(expected.index), "Сделок в когорте"] == 0).all()
+    pd.testing.assert_frame_equal(result.loc[expected.index], expected, check_dtype=False, check_names=False)
+
+
+@pytest.mark.parametrize("rate", [True, False])
+def test_cohort_matrix_matches_pandas(deals, rate):
+    compare(CohortMatrix(deals).matrix(rate=rate), reference_matrix(deals, rate=rate))
+
+
+@pytest.mark.parametrize("dimension", COHORT_DIMENSIONS)
+def test_cohort_matrix_by_dimension_matches_pandas(deals, dimension):
+    cohorts = CohortMatrix(deals, dimension)
+    compare(cohorts.matrix(rate=False), reference_matrix(deals, dimension, rate=False))
+    for value in deals[dimension].dropna().unique():
+        compare(cohorts.matrix(value), reference_matrix(deals, dimension, value))
+
+
+def test_same_day_close_counts_like_dt_days():
+    deals = pd.DataFrame({
+        "Created Time": ["2023-03-01 15:00:00", "2023-03-02 09:00:00", "2023-03-05 10:00:00"],
+        "Closing Date": ["2023-03-01", "2023-03-12", "2023-03-06"],
+        "Months of study": [6.0, 6.0, np.nan],
+    })
+    # Закрытие раньше времени создания в тот же день — -1 день, в окна не попадает
+    table = CohortMatrix(deals).matrix(rate=False)
+    assert table.loc[:, "7 дней"].tolist() == [0]
+    assert table.loc[:, "30 дней"].tolist() == [1]
+    compare(table, reference_matrix(deals, rate=False))
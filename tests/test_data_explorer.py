@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.data_explorer import row_positions, sort_order
+
+
+# Эталон: sort_values с пропусками в конце в обоих направлениях (устойчивая сортировка)
+def reference_order(data, column, ascending):
+    values = pd.to_datetime(data[column], errors="coerce") if "time" in column.lower() else data[column]
+    return values.reset_index(drop=True).sort_values(ascending=ascending, na_position="last", kind="stable").index.to_numpy()
+
+
+@pytest.mark.parametrize("column", ["Deal Owner Name", "Created Time", "Initial Amount Paid"])
+@pytest.mark.parametrize("ascending", [True, False])
+def test_sort_order_matches_sort_values(deals, column, ascending):
+    order = sort_order(deals, column, ascending)
+    expected = reference_order(deals, column, ascending)
+    values = deals[column].reset_index(drop=True)
+    # Равные значения могут идти в любом порядке: сравниваем значения по порядку и набор строк
+    pd.testing.assert_series_equal(values.iloc[order].reset_index(drop=True), values.iloc[expected].reset_index(drop=True))
+    assert sorted(order) == list(range(len(deals)))
+
+
+def test_sort_order_mixed_types():
+    data = pd.DataFrame({"Value": [3, "b", None, 1, "a"]})
+    order = sort_order(data, "Value")
+    assert data["Value"].iloc[order].tolist()[:4] == [1, 3, "a", "b"]
+    assert order[-1] == 2
+
+
+def test_row_positions_filter_and_sort(deals):
+    filters = {"Deal Owner Name": ["Alice", "Bob"], "Campaign": []}
+    positions = row_positions(deals, "Created Time", False, filters)
+    selected = deals.reset_index(drop=True)["Deal Owner Name"].isin(["Alice", "Bob"]).to_numpy()
+    assert sorted(positions) == list(np.flatnonzero(selected))
+    dates = pd.to_datetime(deals["Created Time"]).iloc[positions].dropna()
+    assert dates.is_monotonic_decreasing
+    assert list(row_positions(deals)) == list(range(len(deals)))
@@ -0,0 +1,90 @@
+import pandas as pd
+import pytest
+
+from modules.dataset_store import DatasetStore, aggregate_rows
+
+
+# Эталон слияния: история и дельта склеиваются, из дубликатов по ключу
+# остаётся последняя строка
+def reference_merge(frames, key):
+    merged = pd.concat(frames, ignore_index=True)
+    return merged.drop_duplicates(subset=key, keep="last")
+
+
+# Parquet возвращает пропуски в текстовых колонках как None, а не NaN
+def sort_rows(frame):
+    frame = frame.astype(object).where(frame.notna(), "").astype(str)
+    return frame.sort_values(list(frame.columns)).reset_index(drop=True)
+
+
+def assert_same_rows(result, expected):
+    pd.testing.assert_frame_equal(sort_rows(result), sort_rows(expected[result.columns]))
+
+
+def assert_aggregates_match(store, frame):
+    expected = aggregate_rows(store.kind, frame)
+    assert set(store.aggregates) == set(expected)
+    for dimension, table in expected.items():
+        pd.testing.assert_frame_equal(
+            store.aggregates[dimension].sort_index(), table.sort_index(), check_dtype=False
+        )
+
+
+def test_deals_append_replaces_rows_by_id(tmp_path, deals):
+    store = DatasetStore("deals", root=tmp_path)
+    first, second = deals.iloc[:1200], deals.iloc[800:].copy()
+    # Пересекающиеся строки приходят изменёнными и с дубликатом внутри дельты
+    second.loc[second.index[:400], "Stage"] = "Payment Done"
+    second = pd.concat([second, second.iloc[[0]].assign(City="Leipzig")])
+
+    assert store.append(first, "v1") == {"added": 1200, "updated": 0, "skipped": False}
+    result = store.append(second, "v2")
+    assert result == {"added": 800, "updated": 400, "skipped": False}
+
+    expected = reference_merge([first, second], ["Id"])
+    assert_same_rows(store.load(), expected)
+    assert_aggregates_match(store, expected)
+    assert store.load().set_index("Id").loc[second["Id"].iloc[0], "City"] == "Leipzig"
+
+
+def test_repeated_delta_is_skipped(tmp_path, deals):
+    store = DatasetStore("deals", root=tmp_path)
+    store.append(deals, "v1")
+    version = store.version
+    assert store.append(deals, "v1")["skipped"]
+    assert store.version == version
+
+
+def test_spend_append_drops_full_row_duplicates(tmp_path, spend):
+    store = DatasetStore("spend", root=tmp_path)
+    first, second = spend.iloc[: len(spend) // 2], spend.iloc[len(spend) // 3:]
+    store.append(first, "v1")
+    result = store.append(second, "v2")
+
+    expected = reference_merge([first, second], None)
+    assert result["added"] + result["updated"] == len(second.drop_duplicates())
+    assert_same_rows(store.load(), expected)
+    assert_aggregates_match(store, expected)
+
+
+def test_store_reopens_from_disk(tmp_path, deals):
+    store = DatasetStore("deals", root=tmp_path)
+    store.append(deals.iloc[:1500], "v1")
+    store.append(deals.iloc[1000:], "v2")
+
+    reopened = DatasetStore("deals", root=tmp_path)
+    assert reopened.version == store.version
+    assert_same_rows(reopened.load(), deals)
+    assert_aggregates_match(reopened, deals)
+    assert reopened.append(deals.iloc[:10], "v3")["updated"] == 10
+
+
+@pytest.mark.parametrize("start,end", [("2023-03-01", "2023-05-31 23:59:59"), ("2023-11-15", None)])
+def test_load_period_matches_date_mask(tmp_path, deals, start, end):
+    store = DatasetStore("deals", root=tmp_path)
+    store.append(deals, "v1")
+    dates = pd.to_datetime(deals["Created Time"])
+    mask = dates >= pd.Timestamp(start)
+    if end is not None:
+        mask &= dates <= pd.Timestamp(end)
+    assert_same_rows(store.load(start, end), deals[mask])
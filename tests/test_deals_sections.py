@@ -0,0 +1,142 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import modules.parallel as parallel
+from modules.cache import get_data_version
+from modules.deals_sections import SECTION_AGGREGATES, SECTION_GROUPS
+
+
+# Эталон: расчёты разделов в том виде, в каком они были в process_deals
+def reference_sections(data):
+    df4 = data.dropna(subset=['Campaign', 'Stage'])
+    leads_by_campaign = df4.groupby('Campaign')['Id'].count().reset_index(name='Leads')
+    successful_deals = df4[df4['Months of study'].notnull()]
+    successful_by_campaign = successful_deals.groupby('Campaign')['Id'].count().reset_index(name='Successful Deals')
+    campaign_performance = pd.merge(leads_by_campaign, successful_by_campaign, on='Campaign', how='left')
+    campaign_performance['Successful Deals'] = campaign_performance['Successful Deals'].fillna(0)
+    campaign_performance['Conversion Rate (%)'] = (campaign_performance['Successful Deals'] / campaign_performance['Leads']) * 100
+    campaign_performance = campaign_performance.sort_values(by=['Leads', 'Conversion Rate (%)'], ascending=False)
+
+    df5 = data.copy()
+    df5['Target Quality'] = df5['Quality'].map({
+        'A - High': 'High',
+        'B - Medium': 'Medium',
+        'C - Low': 'Non-Target',
+        'D - Non Target': 'Non-Target',
+        'E - Non Qualified': 'Non-Target',
+        'F': 'Non-Target'
+    })
+    source_total = df5['Source'].value_counts()
+    high_deals = df5[df5['Target Quality'] == 'High']['Source'].value_counts()
+    medium_deals = df5[df5['Target Quality'] == 'Medium']['Source'].value_counts()
+    closed_won = df5[df5['Months of study'].notnull()]['Source'].value_counts()
+    source_quality = pd.DataFrame({
+        'Total Deals': source_total,
+        'High Deals': high_deals,
+        'Medium Deals': medium_deals,
+        'High Percent (%)': (high_deals / source_total) * 100,
+        'Medium Percent (%)': (medium_deals / source_total) * 100,
+        'Payment Done Deals': closed_won,
+        'Conversion Rate (%)': (closed_won / source_total) * 100
+    }).fillna(0).sort_values(by=['Conversion Rate (%)'], ascending=False)
+
+    df = data.copy()
+    df['is_successful'] = (df['Months of study'].notnull()).astype(int)
+    payment_summary = df.groupby('Payment Type').agg(
+        total_deals=('is_successful', 'size'),
+        successful_deals=('is_successful', 'sum'),
+        avg_initial_payment=('Initial Amount Paid', 'mean'),
+        avg_offer_amount=('Offer Total Amount', 'mean'),
+        avg_study_months=('Months of study', 'mean')
+    ).round(2)
+    payment_summary['conversion_rate'] = (payment_summary['successful_deals'] / payment_summary['total_deals']).round(2)
+    df['creation_to_closing_days'] = (pd.to_datetime(df['Closing Date']) - pd.to_datetime(df['Created Time'])).dt.days
+    payment_time = df.groupby('Payment Type').agg(
+        avg_days_to_close=('creation_to_closing_days', 'mean'),
+        median_days_to_close=('creation_to_closing_days', 'median')
+    ).round(2)
+
+    def success(columns, rate_column='conversion_rate'):
+        result = df.groupby(columns).agg(
+            total_deals=('is_successful', 'size'),
+            successful_deals=('is_successful', 'sum')
+        )
+        result[rate_column] = (result['successful_deals'] / result['total_deals']).round(2)
+        return result
+
+    return {
+        "campaign_performance": campaign_performance,
+        "source_quality": source_quality,
+        "payment_summary": payment_summary,
+        "payment_time": payment_time,
+        "product_success": success('Product').sort_values(by='total_deals', ascending=False).reset_index(),
+        "education_success": success('Education Type').sort_values(by='total_deals', ascending=False).reset_index(),
+        "product_education": success(['Product', 'Education Type']).reset_index(),
+        "city_success": success('City'),
+        "country_success": success('Country'),
+        "level_success": success('Level of Deutsch', rate_column='success_rate'),
+        "city_level_success": df.groupby(['City', 'Level of Deutsch']).agg(
+            is_successful=('is_successful', 'mean'),
+            total_deals=('is_successful', 'size')
+        ).reset_index(),
+    }
+
+
+def assert_sections_equal(results, expected):
+    assert list(results) == list(expected)
+    for name, table in results.items():
+        pd.testing.assert_frame_equal(table, expected[name], obj=name)
+
+
+@pytest.fixture(autouse=True)
+def clear_section_cache():
+    parallel.section_cache.clear()
+    yield
+    parallel.section_cache.clear()
+
+
+def test_section_aggregates_match_baseline_groupbys(deals):
+    names = list(SECTION_AGGREGATES)
+    assert_sections_equal(parallel.section_aggregates(deals, names), reference_sections(deals))
+    # Группы разделов берут те же таблицы из кэша
+    expected = reference_sections(deals)
+    for group in SECTION_GROUPS.values():
+        assert_sections_equal(parallel.section_aggregates(deals, group), {name: expected[name] for name in group})
+
+
+def test_parallel_run_matches_local_run(deals, monkeypatch):
+    monkeypatch.setattr(parallel, "PARALLEL_MIN_ROWS", 0)
+    monkeypatch.setattr(parallel, "PARALLEL_WORKERS", 2)
+    deals.attrs["data_version"] = "parallel"
+    results = parallel.section_aggregates(deals, list(SECTION_AGGREGATES))
+    assert_sections_equal(results, reference_sections(deals))
+
+
+# Два потока (фоновый прогрев и перезапуск скрипта) с одними ключами:
+# каждый агрегат считается один раз
+def test_concurrent_requests_compute_each_key_once(deals, monkeypatch):
+    calls = []
+    builder, columns = SECTION_AGGREGATES["campaign_performance"]
+
+    def slow_campaigns(frame):
+        calls.append(threading.get_ident())
+        time.sleep(0.2)
+        return builder(frame)
+
+    monkeypatch.setitem(SECTION_AGGREGATES, "campaign_performance", (slow_campaigns, columns))
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(parallel.section_aggregates(deals, SECTION_GROUPS["campaigns"])))
+        for _ in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results[0]["campaign_performance"] is results[1]["campaign_performance"]
+    assert parallel.section_cache.get((get_data_version(deals), "campaign_performance")) is not None
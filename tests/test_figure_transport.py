@@ -0,0 +1,88 @@
+import json
+import zlib
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+
+from modules.figure_transport import MIN_TYPED_LENGTH, TransportStats, decode_figure, encode_figure, typed_array
+
+
+def make_figure():
+    rng = np.random.default_rng(0)
+    x = np.arange(200)
+    figure = go.Figure()
+    figure.add_trace(go.Scatter(x=x, y=rng.normal(size=200), mode="lines"))
+    figure.add_trace(go.Scatter(
+        x=[f"cat {i}" for i in range(50)], y=rng.integers(0, 70000, 50), mode="markers",
+        marker=dict(color=rng.random(50), size=rng.integers(1, 20, 50))
+    ))
+    figure.add_trace(go.Scatter(x=pd.date_range("2023-01-01", periods=40), y=np.where(x[:40] % 7, x[:40] * 0.5, np.nan)))
+    figure.add_trace(go.Heatmap(z=rng.integers(-5, 5, (20, 30))))
+    figure.add_trace(go.Scatter(x=[1, 2, 3], y=[0.1, 0.2, 0.3]))
+    return figure
+
+
+# Эталон: значения обычного JSON фигуры; пропуски (null) сравниваются как NaN
+def as_values(value):
+    if isinstance(value, list):
+        array = np.array(value, dtype=object)
+        if all(item is None or isinstance(item, (int, float)) for item in array.ravel()):
+            return array.astype(float)
+    return value
+
+
+def test_typed_arrays_round_trip_to_plain_json():
+    figure = make_figure()
+    expected = json.loads(figure.to_json())
+    decoded = decode_figure(encode_figure(figure))
+    assert decoded["layout"] == expected["layout"]
+    assert len(decoded["data"]) == len(expected["data"])
+    for trace, reference in zip(decoded["data"], expected["data"]):
+        assert set(trace) == set(reference)
+        for key, value in reference.items():
+            if key == "marker":
+                for marker_key, marker_value in value.items():
+                    np.testing.assert_array_equal(as_values(trace[key][marker_key]), as_values(marker_value))
+            else:
+                np.testing.assert_array_equal(as_values(trace[key]), as_values(value))
+
+
+def test_encoding_shrinks_numeric_arrays():
+    figure = make_figure()
+    encoded = json.loads(encode_figure(figure))
+    # Числа уходят типизированными массивами, строки, даты и короткие массивы — текстом
+    assert encoded["data"][0]["y"]["dtype"] == "f8"
+    assert encoded["data"][1]["y"]["dtype"] == "u4"
+    assert isinstance(encoded["data"][1]["x"], list)
+    assert isinstance(encoded["data"][2]["x"], list)
+    assert encoded["data"][3]["z"]["shape"] == "20,30" and encoded["data"][3]["z"]["dtype"] == "i1"
+    assert isinstance(encoded["data"][4]["y"], list)
+    assert len(encode_figure(figure)) < len(figure.to_json().encode("utf-8"))
+
+
+@pytest.mark.parametrize("values, dtype", [
+    ([100 + i for i in range(MIN_TYPED_LENGTH * 4)], "u1"),
+    ([-30000 + 500 * i for i in range(MIN_TYPED_LENGTH * 4)], "i2"),
+    ([0.25 * i for i in range(MIN_TYPED_LENGTH * 4)], "f4"),
+    ([None] + [1.0 / 3 * i for i in range(MIN_TYPED_LENGTH * 4)], "f8"),
+])
+def test_compact_dtype_is_lossless(values, dtype):
+    spec = typed_array(values)
+    assert spec["dtype"] == dtype
+    decoded = decode_figure(json.dumps({"data": [{"y": spec}]}))["data"][0]["y"]
+    np.testing.assert_array_equal(np.array(decoded, dtype=float), np.array(values, dtype=float))
+
+
+def test_transport_stats_sample_sizes():
+    stats = TransportStats(sample_size=2)
+    specs = [encode_figure(make_figure()) for _ in range(3)]
+    for spec in specs:
+        stats.add(spec)
+    count, json_bytes, binary_bytes, compressed_bytes = stats.sample_sizes()
+    assert stats.figures == 3 and stats.binary_bytes == sum(map(len, specs))
+    assert count == 2
+    assert binary_bytes == sum(map(len, specs[1:]))
+    assert compressed_bytes == sum(len(zlib.compress(spec)) for spec in specs[1:])
+    assert binary_bytes < json_bytes
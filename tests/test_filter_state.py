@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.cache import get_data_version
+from modules.filter_state import apply_filters, apply_linked_filters, cached_filter_mask
+
+
+# Эталон: булева маска по isin и по диапазону дат
+def reference_filter(frame, filters, date_column=None, start=None, end=None):
+    mask = pd.Series(True, index=frame.index)
+    for column, values in filters.items():
+        if values:
+            mask &= frame[column].isin(values)
+    if date_column is not None and (start is not None or end is not None):
+        dates = pd.to_datetime(frame[date_column], errors="coerce")
+        mask &= dates.notna()
+        if start is not None:
+            mask &= dates >= pd.Timestamp(start)
+        if end is not None:
+            mask &= dates <= pd.Timestamp(end)
+    return frame[mask]
+
+
+CASES = [
+    ({}, None, None),
+    ({}, "2023-03-01", "2023-05-31 23:59:59"),
+    ({"Deal Owner Name": ["Alice", "Bob"]}, None, None),
+    ({"Deal Owner Name": ["Alice"], "Campaign": ["youtube_DE"]}, "2023-06-01", None),
+    ({"Source": ["Organic"], "City": []}, None, "2023-02-15"),
+    ({"Campaign": ["no such campaign"]}, "2023-01-01", "2023-12-31"),
+]
+
+
+@pytest.mark.parametrize("filters, start, end", CASES)
+def test_apply_filters_matches_boolean_mask(deals, filters, start, end):
+    result = apply_filters(deals, filters, "Created Time", start, end)
+    expected = reference_filter(deals, filters, "Created Time", start, end)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_filtered_view_has_its_own_version(deals):
+    view = apply_filters(deals, {"Deal Owner Name": ["Alice"]})
+    assert get_data_version(view) != get_data_version(deals)
+    assert apply_filters(deals, {}) is deals
+
+
+def test_filter_mask_matches_isin(deals):
+    filters = {"Deal Owner Name": ["Carol"], "Source": ["Google Ads", "Organic"]}
+    expected = deals["Deal Owner Name"].isin(["Carol"]) & deals["Source"].isin(["Google Ads", "Organic"])
+    assert np.array_equal(cached_filter_mask(deals, filters), expected.values)
+
+
+def test_linked_filters_map_owner_and_period(deals, calls):
+    filters = {"Deal Owner Name": ["Dave"], "Campaign": ["youtube_DE"]}
+    result = apply_linked_filters("calls", calls, filters, "2023-04-01", "2023-04-30 23:59:59")
+    expected = reference_filter(
+        calls, {"Call Owner Name": ["Dave"]}, "Call Start Time", "2023-04-01", "2023-04-30 23:59:59"
+    )
+    pd.testing.assert_frame_equal(result, expected)
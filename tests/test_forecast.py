@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.forecast import FORECAST_MODELS, exponential_smoothing, fit_forecasts, lagged_regression, monthly_series, seasonal_naive
+
+
+# Эталон: помесячные счётчики через to_period на общем диапазоне месяцев
+def test_monthly_series_matches_to_period_counts(deals, calls):
+    deal_months = pd.to_datetime(deals["Created Time"]).dt.to_period("M")
+    call_months = pd.to_datetime(calls["Call Start Time"]).dt.to_period("M")
+    months = pd.period_range(min(deal_months.min(), call_months.min()), max(deal_months.max(), call_months.max()))
+    expected = pd.DataFrame({
+        "Calls": call_months.value_counts(),
+        "Deals": deal_months.value_counts(),
+        "Won": deal_months[deals["Months of study"].notnull()].value_counts(),
+    }).reindex(months, fill_value=0).fillna(0)
+    expected.index = expected.index.astype(str)
+    pd.testing.assert_frame_equal(monthly_series(deals, calls), expected, check_dtype=False, check_names=False)
+
+
+def test_seasonal_naive_repeats_last_season():
+    y = np.arange(30) % 12 * 10
+    forecast, lower, upper = seasonal_naive(y, 3)
+    assert np.array_equal(forecast, y[-12:-9])
+    assert (lower <= forecast).all() and (forecast <= upper).all()
+
+
+def test_exponential_smoothing_continues_linear_trend():
+    y = 5 + 2 * np.arange(24)
+    forecast, _, _ = exponential_smoothing(y, 4)
+    assert np.allclose(forecast, 5 + 2 * np.arange(24, 28))
+
+
+def test_lagged_regression_matches_polyfit():
+    rng = np.random.default_rng(0)
+    calls = rng.integers(100, 200, 24).astype(float)
+    y = 3 + 0.5 * np.concatenate([[150], calls[:-1]]) + rng.normal(0, 1, 24)
+    forecast, _, _ = lagged_regression(y, calls, 3)
+    slope, intercept = np.polyfit(calls[:-1], y[1:], 1)
+    assert forecast[0] == pytest.approx(intercept + slope * calls[-1])
+
+
+def test_fit_forecasts_index_and_bounds(deals, calls):
+    series = monthly_series(deals, calls)
+    results = fit_forecasts(series, "Won", 3)
+    assert list(results) == FORECAST_MODELS
+    last = pd.Period(series.index[-1], freq="M")
+    for table in results.values():
+        assert list(table.index) == [str(last + step) for step in (1, 2, 3)]
+        assert (table >= 0).all().all()
+        assert (table["Lower"] <= table["Forecast"]).all() and (table["Forecast"] <= table["Upper"]).all()
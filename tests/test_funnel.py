@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.funnel import FUNNEL_DIMENSIONS, FUNNEL_STAGES, LOST_STAGE, PAID_STAGE, FunnelCube, time_in_funnel
+
+
+def valid_rows(deals, dimension=None):
+    valid = deals["Stage"].notna() & pd.to_datetime(deals["Created Time"]).notna()
+    if dimension is not None:
+        valid &= deals[dimension].notna()
+    return deals[valid]
+
+
+# Эталон: сделка, остановившаяся на этапе k, прошла все этапы до него
+def reference_reached(deals, stages):
+    active = deals[deals["Stage"] != LOST_STAGE]
+    positions = active["Stage"].map({stage: position for position, stage in enumerate(stages)})
+    return pd.Series([(positions >= k).sum() for k in range(len(stages))], index=stages)
+
+
+@pytest.mark.parametrize("dimension", [None] + FUNNEL_DIMENSIONS)
+def test_reached_and_conversion_match_pandas(deals, dimension):
+    cube = FunnelCube(deals, dimension)
+    rows = valid_rows(deals, dimension)
+    stages = [stage for stage in FUNNEL_STAGES if stage in set(rows["Stage"])]
+    assert cube.stages == stages
+
+    values = [None] if dimension is None else list(rows[dimension].unique())
+    for value in values:
+        subset = rows if value is None else rows[rows[dimension] == value]
+        reached = reference_reached(subset, stages)
+        pd.testing.assert_series_equal(cube.reached(value), reached, check_dtype=False)
+
+        table = cube.conversion_to_payment(value)
+        expected_rate = (reached[PAID_STAGE] / reached).where(reached > 0) * 100
+        assert np.allclose(table["To Payment (%)"], expected_rate, equal_nan=True)
+        assert np.allclose(table["Share of All Deals (%)"], reached / len(subset) * 100)
+
+
+def test_unknown_value_gives_empty_funnel(deals):
+    cube = FunnelCube(deals, "Campaign")
+    assert cube.reached("no such campaign").sum() == 0
+
+
+def test_monthly_distribution_matches_crosstab(deals):
+    cube = FunnelCube(deals)
+    rows = valid_rows(deals)
+    months = pd.to_datetime(rows["Created Time"]).dt.to_period("M").astype(str)
+    expected = pd.crosstab(months, rows["Stage"]).reindex(columns=cube.stages + [LOST_STAGE], fill_value=0)
+    result = cube.monthly_distribution()
+    pd.testing.assert_frame_equal(result, expected.reindex(result.index, fill_value=0), check_dtype=False, check_names=False)
+
+
+def test_time_in_funnel_matches_pandas(deals):
+    created = pd.to_datetime(deals["Created Time"])
+    days = (pd.to_datetime(deals["Closing Date"]) - created).dt.days
+    outcome = deals["Stage"].map({PAID_STAGE: "Оплата", LOST_STAGE: "Потеря"})
+    frame = pd.DataFrame({
+        "Месяц": created.dt.to_period("M").astype(str),
+        "Исход": outcome,
+        "Интервал": pd.cut(days, [0, 8, 31, 91, np.inf], right=False, labels=False),
+    }).dropna()
+    expected = frame.groupby(["Месяц", "Исход", "Интервал"]).size()
+
+    result = time_in_funnel(deals).stack()
+    result.index = result.index.set_levels(range(4), level=2)
+    result = result[result > 0]
+    assert result.to_dict() == expected.to_dict()
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.histogram import binned_histogram, bin_centers
+
+
+# Эталон: равные интервалы pd.cut по [min, max] и подсчёт value_counts
+def reference_histogram(values, bins):
+    values = pd.Series(values, dtype=float).replace([np.inf, -np.inf], np.nan).dropna()
+    edges = np.linspace(values.min(), values.max(), bins + 1)
+    counts = pd.cut(values, edges, include_lowest=True).value_counts(sort=False)
+    return edges, counts.values
+
+
+@pytest.mark.parametrize("bins", [1, 10, 30])
+def test_histogram_matches_pandas_cut(bins):
+    rng = np.random.default_rng(bins)
+    values = np.concatenate([rng.exponential(100, 5000), [np.nan, np.inf]])
+    edges, counts = binned_histogram(values, bins=bins)
+    expected_edges, expected_counts = reference_histogram(values, bins)
+    assert np.allclose(edges, expected_edges)
+    assert counts.tolist() == expected_counts.tolist()
+    assert counts.sum() == 5000
+
+
+def test_histogram_probability_and_range():
+    values = pd.Series([0.5, 1.5, 1.5, 2.5, 9.0])
+    edges, counts = binned_histogram(values, bins=3, value_range=(0, 3), histnorm="probability")
+    inside = values[(values >= 0) & (values <= 3)]
+    expected = pd.cut(inside, [0, 1, 2, 3], include_lowest=True).value_counts(sort=False, normalize=True)
+    assert np.allclose(counts, expected.values)
+    assert np.allclose(bin_centers(edges), [0.5, 1.5, 2.5])
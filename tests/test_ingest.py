@@ -0,0 +1,31 @@
+import io
+
+import pandas as pd
+import pytest
+
+import modules.ingest as ingest
+from modules.ingest import finish_ingest, start_ingest
+
+
+def test_chunked_parse_matches_read_csv(deals, monkeypatch):
+    monkeypatch.setattr(ingest, "CHUNK_ROWS", 300)
+    content = deals.to_csv(index=False).encode()
+    job = start_ingest("test-chunked", content)
+    # Сессии, загрузившие тот же файл, получают тот же разбор
+    assert start_ingest("test-chunked", content) is job
+    result = job.result()
+    finish_ingest("test-chunked")
+    assert job.done and job.progress == 1.0
+    assert job.rows == len(deals)
+    assert job.columns == list(deals.columns)
+    assert len(job.preview) == ingest.PREVIEW_ROWS
+    pd.testing.assert_frame_equal(result, pd.read_csv(io.BytesIO(content)))
+    assert start_ingest("test-chunked", content) is not job
+    finish_ingest("test-chunked")
+
+
+def test_parse_error_reaches_caller():
+    job = start_ingest("test-broken", b'a,b\n1,"unclosed\n')
+    with pytest.raises(ValueError):
+        job.result()
+    finish_ingest("test-broken")
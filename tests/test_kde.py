@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from modules.kde import binned_kde, scott_bandwidth
+
+
+# Точная гауссова KDE: сумма ядер по всем точкам в каждом узле сетки
+def reference_kde(values, grid, h):
+    z = (grid[:, None] - values[None, :]) / h
+    return np.exp(-0.5 * z ** 2).sum(axis=1) / (len(values) * h * np.sqrt(2 * np.pi))
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_binned_kde_matches_exact_kde(seed):
+    rng = np.random.default_rng(seed)
+    values = np.concatenate([rng.normal(0, 1, 3000), rng.normal(6, 0.5, 1000)])
+    grid, density = binned_kde(values)
+    expected = reference_kde(values, grid, scott_bandwidth(values))
+    assert np.allclose(density, expected, atol=1e-3 * expected.max())
+    assert density.sum() * (grid[1] - grid[0]) == pytest.approx(1, abs=1e-3)
+
+
+def test_binned_kde_ignores_missing_values():
+    values = np.array([1.0, 2.0, np.nan, 3.0, np.inf, 4.0])
+    grid, density = binned_kde(values)
+    finite = values[np.isfinite(values)]
+    expected = reference_kde(finite, grid, scott_bandwidth(finite))
+    assert np.allclose(density, expected, atol=1e-2 * expected.max())
+
+
+def test_binned_kde_too_few_values():
+    grid, density = binned_kde([1.0, np.nan])
+    assert len(grid) == 0 and len(density) == 0
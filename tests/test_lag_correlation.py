@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.lag_correlation import LAG_SERIES, build_lag_correlation
+
+
+# Эталон: счётчики по дням или неделям (с понедельника) через to_period,
+# общий диапазон корзин с нулями и прямая сумма произведений для каждого лага
+def reference_series(deals, calls, freq, name):
+    source, column, subset = LAG_SERIES[name]
+    frame = deals if source == "deals" else calls
+    if subset is not None:
+        frame = frame[frame[subset].notnull()]
+    return pd.to_datetime(frame[column]).dropna().dt.to_period("D" if freq == "D" else "W-SUN").value_counts()
+
+
+def reference_correlation(deals, calls, freq, leading, following, max_lag):
+    x, y = (reference_series(deals, calls, freq, name) for name in (leading, following))
+    periods = pd.period_range(min(x.index.min(), y.index.min()), max(x.index.max(), y.index.max()))
+    x = x.reindex(periods, fill_value=0).values.astype(float)
+    y = y.reindex(periods, fill_value=0).values.astype(float)
+    x, y = x - x.mean(), y - y.mean()
+    norm = np.sqrt((x ** 2).sum() * (y ** 2).sum())
+    n = len(x)
+    max_lag = min(max_lag, n - 1)
+    values = []
+    for lag in range(-max_lag, max_lag + 1):
+        if lag >= 0:
+            values.append(np.dot(x[:n - lag], y[lag:]) / norm)
+        else:
+            values.append(np.dot(x[-lag:], y[:n + lag]) / norm)
+    return pd.Series(values, index=range(-max_lag, max_lag + 1)), 1.96 / np.sqrt(n)
+
+
+@pytest.mark.parametrize("freq", ["D", "W"])
+@pytest.mark.parametrize("leading, following", [
+    ("Звонки", "Созданные сделки"),
+    ("Созданные сделки", "Успешные сделки"),
+])
+def test_lag_correlation_matches_direct_sum(deals, calls, freq, leading, following):
+    table = build_lag_correlation(deals, calls, freq, leading, following, 30)
+    expected, band = reference_correlation(deals, calls, freq, leading, following, 30)
+    assert list(table["Lag"]) == list(expected.index)
+    assert np.allclose(table["Correlation"], expected.values)
+    assert table["Band"].iloc[0] == pytest.approx(band)
+    assert (table["Significant"] == (expected.abs() > band).values).all()
+
+
+def test_max_lag_is_capped_by_series_length(deals, calls):
+    table = build_lag_correlation(deals, calls, "W", "Звонки", "Созданные сделки", 1000)
+    expected, _ = reference_correlation(deals, calls, "W", "Звонки", "Созданные сделки", 1000)
+    assert len(expected) < 2 * 1000 + 1
+    assert list(table["Lag"]) == list(expected.index)
+    assert np.allclose(table["Correlation"], expected.values)
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from modules.owner_activity import owner_productivity
+
+
+# Эталон: groupby по владельцу в звонках и в сделках, внешнее соединение
+def reference_productivity(deals, calls=None):
+    successful = deals[deals["Months of study"].notnull()]
+    table = pd.DataFrame({
+        "Deals": deals.groupby("Deal Owner Name").size(),
+        "Closed Deals": successful.groupby("Deal Owner Name").size(),
+        "Sales": successful.groupby("Deal Owner Name")["Initial Amount Paid"].sum(),
+    }).fillna(0)
+    if calls is not None:
+        groups = calls.groupby("Call Owner Name")
+        call_stats = pd.DataFrame({
+            "Calls": groups.size(),
+            "Total Duration (min)": groups["Call Duration (in seconds)"].sum() / 60,
+            "Avg Duration (sec)": groups["Call Duration (in seconds)"].mean(),
+            "Scheduled in CRM (%)": groups["Scheduled in CRM"].mean() * 100,
+        })
+        table = call_stats.join(table, how="outer").fillna(0)
+    # Владелец без сделок получает конверсию 0
+    table["Conversion Rate (%)"] = (table["Closed Deals"] / table["Deals"] * 100).fillna(0)
+    if calls is not None:
+        table["Calls per Closed Deal"] = (table["Calls"] / table["Closed Deals"]).where(table["Closed Deals"] > 0)
+    return table
+
+
+def compare(result, expected):
+    assert result["Sales"].is_monotonic_decreasing
+    pd.testing.assert_frame_equal(
+        result.sort_index(), expected[result.columns].sort_index(), check_dtype=False, check_names=False
+    )
+
+
+def test_owner_productivity_with_calls(deals, calls):
+    # Владелец звонков без сделок тоже попадает в таблицу
+    calls.loc[calls.index[:25], "Call Owner Name"] = "Eve"
+    result = owner_productivity(deals, calls)
+    expected = reference_productivity(deals, calls)
+    assert set(result.columns) == set(expected.columns)
+    compare(result, expected)
+    assert result.loc["Eve", "Deals"] == 0 and np.isnan(result.loc["Eve", "Calls per Closed Deal"])
+
+
+def test_owner_productivity_without_calls(deals):
+    result = owner_productivity(deals, None)
+    expected = reference_productivity(deals)
+    assert "Calls" not in result.columns
+    assert set(result.columns) == set(expected.columns)
+    compare(result, expected)
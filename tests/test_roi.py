@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.roi import ALL_TIME, ROI_DIMENSIONS, ROI_PERIODS, build_roi_table, roi_totals
+
+
+def period_labels(dates, freq):
+    dates = pd.to_datetime(dates, errors="coerce")
+    if freq is None:
+        return pd.Series(ALL_TIME, index=dates.index).where(dates.notna())
+    return dates.dt.to_period(freq).astype(str).where(dates.notna())
+
+
+# Эталон: groupby обеих сторон по (измерение, период) и внешнее соединение
+def reference_roi(spend, deals, by, freq):
+    spend_side = (
+        spend.assign(Period=period_labels(spend["Date"], freq))
+        .groupby([by, "Period"])[["Spend", "Clicks", "Impressions"]].sum()
+    )
+    won = deals["Months of study"].notnull()
+    deals_side = (
+        deals.assign(
+            Period=period_labels(deals["Created Time"], freq),
+            Leads=1,
+            Customers=won.astype(int),
+            Revenue=deals["Initial Amount Paid"].where(won, 0).fillna(0),
+        )
+        .groupby([by, "Period"])[["Leads", "Customers", "Revenue"]].sum()
+    )
+    table = spend_side.join(deals_side, how="outer").fillna(0)
+    table["CPL"] = (table["Spend"] / table["Leads"]).where(table["Leads"] > 0)
+    table["CAC"] = (table["Spend"] / table["Customers"]).where(table["Customers"] > 0)
+    table["ROAS"] = (table["Revenue"] / table["Spend"]).where(table["Spend"] > 0)
+    table["CTR (%)"] = (table["Clicks"] / table["Impressions"]).where(table["Impressions"] > 0) * 100
+    return table.sort_index()
+
+
+@pytest.mark.parametrize("by", ROI_DIMENSIONS)
+@pytest.mark.parametrize("period", list(ROI_PERIODS))
+def test_roi_table_matches_pandas_join(spend, deals, by, period):
+    result = build_roi_table(spend, deals, by, ROI_PERIODS[period])
+    expected = reference_roi(spend, deals, by, ROI_PERIODS[period])
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_names=False)
+
+
+def test_roi_totals(spend, deals):
+    table = build_roi_table(spend, deals, "Campaign", None)
+    totals = roi_totals(table)
+    won = deals["Months of study"].notnull() & deals["Campaign"].notna() & deals["Created Time"].notna()
+    revenue = deals.loc[won, "Initial Amount Paid"].fillna(0).sum()
+    spent = spend.loc[spend["Campaign"].notna() & spend["Date"].notna(), "Spend"].sum()
+    assert totals["Spend"] == pytest.approx(spent)
+    assert totals["ROAS"] == pytest.approx(revenue / spent)
+    assert totals["CAC"] == pytest.approx(spent / won.sum())
+    assert np.isnan(roi_totals(table.iloc[:0])["CPL"])
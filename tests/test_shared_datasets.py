@@ -0,0 +1,62 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from modules.shared_datasets import STALE_TMP_SECONDS, SharedDatasetStore
+
+
+def fail_on_reload():
+    raise AssertionError("CSV разобран повторно")
+
+
+def test_sessions_share_one_copy(tmp_path, deals):
+    store = SharedDatasetStore(root=str(tmp_path))
+    loads = []
+
+    def load():
+        loads.append(1)
+        return deals.copy()
+
+    first = store.acquire("key", 1, load)
+    second = store.acquire("key", 2, load)
+    assert len(loads) == 1
+    assert first.attrs["data_version"] == second.attrs["data_version"] == "key"
+    pd.testing.assert_frame_equal(first, deals.reset_index(drop=True), check_dtype=False)
+    # Своя колонка сессии не видна другой сессии
+    first["SLA"] = 0
+    assert not np.array_equal(second["SLA"].to_numpy(), first["SLA"].to_numpy())
+    # Числовые колонки без пропусков читаются из файла без копирования
+    assert not first["Id"].to_numpy().flags.writeable
+    assert store.nbytes < int(deals.memory_usage(deep=True, index=False).sum())
+
+
+def test_copy_is_reused_after_eviction(tmp_path, deals):
+    store = SharedDatasetStore(root=str(tmp_path), max_bytes=0)
+    store.acquire("key", 1, lambda: deals)
+    store.release("key", 1)
+    assert store.nbytes == 0 and store.available("key")
+    frame = store.acquire("key", 2, fail_on_reload)
+    assert len(frame) == len(deals)
+
+
+def test_files_of_previous_runs_count_towards_limit(tmp_path, deals):
+    store = SharedDatasetStore(root=str(tmp_path))
+    for number in range(4):
+        store.acquire(f"key{number}", number, lambda: deals.head(10))
+        store.release(f"key{number}", number)
+        os.utime(tmp_path / f"key{number}.arrow", (number, number))
+    stale_tmp = tmp_path / "broken.arrow.tmp"
+    fresh_tmp = tmp_path / "writing.arrow.tmp"
+    stale_tmp.write_bytes(b"")
+    fresh_tmp.write_bytes(b"")
+    old = time.time() - STALE_TMP_SECONDS - 1
+    os.utime(stale_tmp, (old, old))
+
+    # Новый запуск: остаются два самых новых файла, старый недописанный удалён
+    restarted = SharedDatasetStore(root=str(tmp_path), max_files=2)
+    assert sorted(os.listdir(tmp_path)) == ["key2.arrow", "key3.arrow", "writing.arrow.tmp"]
+    assert restarted.available("key3") and not restarted.available("key0")
+    restarted.acquire("key4", 1, lambda: deals.head(10))
+    assert sorted(name for name in os.listdir(tmp_path) if name.endswith(".arrow")) == ["key3.arrow", "key4.arrow"]
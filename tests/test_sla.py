@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.sla import (
+    MISSING_SLA, SLA_DIMENSIONS, SLA_PERCENTILES, build_sla_breakdown, get_sla_seconds, parse_sla_seconds,
+    with_sla_timedelta
+)
+from modules.category_index import CategoryIndex
+
+
+def test_parse_sla_seconds_matches_to_timedelta(deals):
+    seconds = parse_sla_seconds(deals["SLA"])
+    expected = pd.to_timedelta(deals["SLA"]).dt.total_seconds()
+    assert np.array_equal(seconds == MISSING_SLA, expected.isna().values)
+    assert np.array_equal(seconds[expected.notna().values], expected.dropna().astype(np.int64).values)
+    # Колонка уже в timedelta разбирается так же
+    assert np.array_equal(parse_sla_seconds(pd.to_timedelta(deals["SLA"])), seconds)
+
+
+# Эталон: groupby по измерению, квантили и среднее pandas
+def reference_breakdown(deals, by, threshold_hours):
+    hours = pd.to_timedelta(deals["SLA"]).dt.total_seconds() / 3600
+    frame = pd.DataFrame({by: deals[by], "hours": hours}).dropna()
+    groups = frame.groupby(by)["hours"]
+    table = pd.DataFrame({"Deals with SLA": groups.size()})
+    for quantile in SLA_PERCENTILES:
+        table[f"P{int(quantile * 100)} (ч)"] = groups.quantile(quantile)
+    table["Mean (ч)"] = groups.mean()
+    table["Breach Rate (%)"] = groups.apply(lambda values: (values > threshold_hours).mean() * 100)
+    return table
+
+
+@pytest.mark.parametrize("by", SLA_DIMENSIONS)
+@pytest.mark.parametrize("threshold_hours", [1, 24, 72])
+def test_sla_breakdown_matches_pandas_quantiles(deals, by, threshold_hours):
+    result = build_sla_breakdown(parse_sla_seconds(deals["SLA"]), CategoryIndex(deals[by]), threshold_hours)
+    expected = reference_breakdown(deals, by, threshold_hours).reindex(result.index)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_names=False)
+    assert result["Breach Rate (%)"].is_monotonic_decreasing
+
+
+def test_with_sla_timedelta_leaves_source_frame_unchanged(deals):
+    deals.attrs["data_version"] = "deals"
+    frame = with_sla_timedelta(deals)
+    assert deals["SLA"].dtype == object and deals.attrs["data_version"] == "deals"
+    assert frame.attrs["data_version"] != "deals"
+    pd.testing.assert_series_equal(frame["SLA"], pd.to_timedelta(deals["SLA"]), check_names=False)
+    assert np.array_equal(get_sla_seconds(frame), get_sla_seconds(deals))
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.time_index import TimeIndex, get_time_index, period_bounds, month_codes, month_labels
+
+
+def reference_between(frame, column, start, end):
+    dates = pd.to_datetime(frame[column], errors="coerce")
+    mask = dates.notna()
+    if start is not None:
+        mask &= dates >= start
+    if end is not None:
+        mask &= dates <= end
+    return frame[mask]
+
+
+@pytest.mark.parametrize("start, end", [
+    (None, None),
+    ("2023-03-01", "2023-03-31 23:59:59"),
+    ("2023-06-15 12:00", None),
+    (None, "2023-02-01"),
+    ("2030-01-01", "2030-12-31"),
+])
+def test_between_matches_boolean_mask(deals, start, end):
+    index = get_time_index(deals, "Created Time")
+    expected = reference_between(deals, "Created Time", start, end)
+    # between — строки в исходном порядке, positions — в порядке времени
+    assert np.array_equal(index.between(start, end), np.flatnonzero(deals.index.isin(expected.index)))
+    positions = index.positions(start, end)
+    assert sorted(positions) == list(deals.index.get_indexer(expected.index))
+    assert pd.to_datetime(deals["Created Time"].iloc[positions]).is_monotonic_increasing
+
+
+def test_min_max_skip_missing(deals):
+    index = TimeIndex(deals["Created Time"])
+    dates = pd.to_datetime(deals["Created Time"])
+    assert index.min == dates.min()
+    assert index.max == dates.max()
+    assert len(index.rows) == dates.notna().sum()
+
+
+def test_empty_index():
+    index = TimeIndex(pd.Series([None, "not a date"]))
+    assert index.min is None and index.max is None
+    assert len(index.positions()) == 0
+
+
+def test_period_bounds_cover_whole_days(deals):
+    start, end = period_bounds((pd.Timestamp("2023-03-01").date(), pd.Timestamp("2023-03-02").date()))
+    expected = reference_between(deals, "Created Time", "2023-03-01", "2023-03-02 23:59:59.999999999")
+    result = deals.iloc[get_time_index(deals, "Created Time").between(start, end)]
+    assert list(result.index) == list(expected.index)
+    assert period_bounds(()) == (None, None)
+
+
+def test_month_codes_match_to_period(deals):
+    codes = month_codes(deals["Created Time"])
+    periods = pd.to_datetime(deals["Created Time"]).dt.to_period("M")
+    assert (codes == -1).sum() == periods.isna().sum()
+    labels = np.array(month_labels(codes[codes >= 0]))
+    assert labels.tolist() == periods.dropna().astype(str).tolist()